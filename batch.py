@@ -0,0 +1,123 @@
+"""Headless bulk maze generation.
+
+Generates many mazes of one size across a process pool and streams them to a
+file as JSON lines, one maze per line, in index order. Every maze gets its own
+seed derived from the base seed and its index, so the output only depends on
+the arguments, not on the number of workers.
+
+Usage: python batch.py COUNT ROWS COLS [--seed N] [--algorithm NAME] [--workers N] [--chunk-size N] [-o FILE]
+"""
+import argparse
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterator, TextIO
+from generators import GENERATORS
+from maze import Maze
+from seeds import derive_seed
+
+# Chunks in flight per worker. Enough to keep every worker busy while the
+# oldest chunk is being written out, few enough that memory doesn't grow
+# with the batch size.
+CHUNKS_PER_WORKER = 2
+
+def generate_one(index: int, rows: int, cols: int, base_seed: int,
+                 algorithm: str = "backtracker") -> str:
+    """Generates maze number index of a batch with the given generator.
+
+    Returns:
+        str: The maze as a JSON line with its index, seed, size and walls. The
+            walls are the grid's wall bytes (see grid.py) in hex, row-major.
+    """
+    seed = derive_seed(base_seed, index)
+    maze = Maze(0, 0, rows, cols, 1, 1, seed=seed)
+    maze.generate(algorithm)
+    return json.dumps({
+        "index": index,
+        "seed": seed,
+        "rows": rows,
+        "cols": cols,
+        "walls": maze.grid.walls.hex(),
+    })
+
+def _generate_chunk(args: tuple[int, int, int, int, int, str]) -> list[str]:
+    """Worker entry point: generates mazes [start, stop) in one go, which keeps
+    the per-task overhead low when mazes are small."""
+    start, stop, rows, cols, base_seed, algorithm = args
+    return [generate_one(index, rows, cols, base_seed, algorithm) for index in range(start, stop)]
+
+def generate_batch(count: int, rows: int, cols: int, base_seed: int = 0,
+                   workers: int = None, chunk_size: int = 16, # type: ignore
+                   algorithm: str = "backtracker") -> Iterator[str]:
+    """Generates count mazes across a process pool.
+
+    Args:
+        count (int): Number of mazes.
+        rows (int): Rows per maze.
+        cols (int): Columns per maze.
+        base_seed (int, optional): Seed all maze seeds are derived from. Defaults to 0.
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+            With 1, everything runs in this process.
+        chunk_size (int, optional): Mazes per task. Defaults to 16.
+        algorithm (str, optional): Generator to use, see generators.GENERATORS.
+            Defaults to "backtracker".
+
+    Yields:
+        str: One JSON line per maze (see generate_one), in index order. At
+            most CHUNKS_PER_WORKER chunks per worker are queued or waiting to
+            be yielded at any time, so memory stays flat however many mazes
+            there are.
+    """
+    chunks = (
+        (start, min(start + chunk_size, count), rows, cols, base_seed, algorithm)
+        for start in range(0, count, chunk_size)
+    )
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield from _generate_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Unlike map(), which submits every chunk up front, keep a bounded
+        # window: yield the oldest chunk, then submit the next one
+        pending: deque[Future[list[str]]] = deque()
+        for chunk in chunks:
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_generate_chunk, chunk))
+        while pending:
+            yield from pending.popleft().result()
+
+def write_batch(out: TextIO, *args, **kwargs) -> int:
+    """Streams generate_batch(*args, **kwargs) to out. Returns the maze count."""
+    written = 0
+    for line in generate_batch(*args, **kwargs):
+        out.write(line + "\n")
+        written += 1
+    return written
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="Generate mazes in bulk, headless.")
+    parser.add_argument("count", type=int, help="number of mazes")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("cols", type=int)
+    parser.add_argument("--seed", type=int, default=0, help="base seed (default 0)")
+    parser.add_argument("--algorithm", default="backtracker", choices=sorted(GENERATORS),
+                        help="generator to use (default backtracker)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="mazes per task (default 16)")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    kwargs = dict(base_seed=args.seed, workers=args.workers, chunk_size=args.chunk_size,
+                  algorithm=args.algorithm)
+    if args.output == "-":
+        write_batch(sys.stdout, args.count, args.rows, args.cols, **kwargs)
+    else:
+        with open(args.output, "w") as out:
+            write_batch(out, args.count, args.rows, args.cols, **kwargs)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
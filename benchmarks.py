@@ -0,0 +1,200 @@
+"""Benchmark suite for maze construction, generation, solving and drawing.
+
+Run with `python benchmarks.py`, or pick what to measure, e.g.
+`python benchmarks.py --sizes 100 1000 4000 --generators backtracker eller --solvers bfs`.
+The default sizes run in seconds. Add --large for the LARGE_SIZES as well,
+which take minutes.
+
+For every size N (an N x N maze), generator and solver it reports:
+  - construction time of a headless Maze, and throughput in cells/s
+  - generation time and cells carved per second
+  - solve time and cells per second, plus nodes expanded
+  - peak memory of construct + generate + solve, traced separately with tracemalloc
+  - draw calls, line edits and peak canvas items with a counting stand-in
+    window (small sizes only)
+
+Timings are the best of the given seeds. Pass --save-baseline FILE to store the
+results as JSON, and --baseline FILE to compare against a stored run; the exit
+code is 1 if anything regressed by more than --tolerance.
+"""
+import argparse
+import json
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Any
+from maze import Maze
+
+DEFAULT_SIZES = [100, 300, 1000]
+# Opt-in with --large, since each of these takes minutes
+LARGE_SIZES = [4000]
+DEFAULT_SEEDS = [0, 1, 2]
+DRAW_CALL_MAX_SIZE = 300
+
+class CountingWindow:
+    """Stands in for Window, counting draw calls and live canvas items instead
+    of drawing."""
+    def __init__(self) -> None:
+        self.bg_color = "white"
+        self.draw_line_calls = 0
+        self.edit_calls = 0
+        self.lines_drawn = 0
+        self.edits = 0
+        self.items: dict[str, tuple[str, ...]] = {}
+        self.peak_items = 0
+        self.redraws = 0
+
+    def draw_line(self, line: Any, fill_color: str) -> None:
+        self.draw_line_calls += 1
+        self.lines_drawn += 1
+
+    def apply_line_edits(self, edits: list[tuple]) -> None:
+        self.edit_calls += 1
+        self.edits += len(edits)
+        for edit in edits:
+            if edit[0] == "create":
+                self.items[edit[1][0]] = edit[1]
+                self.lines_drawn += 1
+            elif edit[0] == "delete":
+                for name in [name for name, tags in self.items.items() if edit[1] in tags]:
+                    del self.items[name]
+        self.peak_items = max(self.peak_items, len(self.items))
+
+    def redraw(self) -> None:
+        self.redraws += 1
+
+def _timed(fn: Any, *args: Any) -> tuple[float, Any]:
+    start = perf_counter()
+    result = fn(*args)
+    return perf_counter() - start, result
+
+def bench_construct(size: int, seed: int) -> float:
+    """Seconds to build one headless size x size maze."""
+    construct, _ = _timed(Maze, 0, 0, size, size, 10, 10, None, 0.05, seed)
+    return construct
+
+def bench_case(size: int, seed: int, generator: str, solver: str) -> dict[str, float]:
+    """Times generating and solving one size x size maze.
+
+    Returns:
+        dict[str, float]: Seconds for "generate" and "solve", plus the
+            solver's "nodes_expanded".
+    """
+    maze = Maze(0, 0, size, size, 10, 10, None, 0.05, seed)
+    generate, _ = _timed(maze.generate, generator)
+    solve, result = _timed(maze.solve, solver)
+    return {
+        "generate": generate,
+        "solve": solve,
+        "nodes_expanded": result.nodes_expanded,
+    }
+
+def peak_memory(size: int, seed: int, generator: str, solver: str) -> int:
+    """Peak bytes allocated while building, generating and solving one maze."""
+    tracemalloc.start()
+    try:
+        maze = Maze(0, 0, size, size, 10, 10, seed=seed)
+        maze.generate(generator)
+        maze.solve(solver)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def draw_calls(size: int, seed: int, generator: str, solver: str) -> CountingWindow:
+    """Runs a maze against a CountingWindow and returns it with its tallies."""
+    window = CountingWindow()
+    maze = Maze(0, 0, size, size, 10, 10, window, draw_delay=0, seed=seed) # type: ignore
+    maze.generate(generator)
+    maze.solve(solver)
+    return window
+
+def run_suite(sizes: list[int], seeds: list[int], generators: list[str], solvers: list[str],
+              memory: bool = True) -> dict[str, float]:
+    """Runs every combination and returns flat metrics, named like
+    "generate/backtracker/100/cells_per_s"."""
+    metrics: dict[str, float] = {}
+    for size in sizes:
+        cells = size * size
+        # Construction doesn't depend on the algorithms, so it's timed once per size
+        construct = min(bench_construct(size, seed) for seed in seeds)
+        metrics[f"construct/{size}/cells_per_s"] = cells / max(construct, 1e-9)
+        for generator in generators:
+            for solver in solvers:
+                runs = [bench_case(size, seed, generator, solver) for seed in seeds]
+                best = {phase: min(run[phase] for run in runs) for phase in ("generate", "solve")}
+                metrics[f"generate/{generator}/{size}/cells_per_s"] = cells / max(best["generate"], 1e-9)
+                name = f"solve/{generator}+{solver}/{size}"
+                metrics[f"{name}/cells_per_s"] = cells / max(best["solve"], 1e-9)
+                metrics[f"{name}/nodes_expanded"] = sum(run["nodes_expanded"] for run in runs) / len(runs)
+                name = f"{generator}+{solver}/{size}"
+                if memory:
+                    metrics[f"memory/{name}/peak_bytes"] = peak_memory(size, seeds[0], generator, solver)
+                if size <= DRAW_CALL_MAX_SIZE:
+                    window = draw_calls(size, seeds[0], generator, solver)
+                    metrics[f"draw/{name}/calls"] = window.draw_line_calls + window.edit_calls
+                    metrics[f"draw/{name}/lines"] = window.lines_drawn
+                    metrics[f"draw/{name}/edits"] = window.edits
+                    metrics[f"draw/{name}/peak_items"] = window.peak_items
+    return metrics
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("cells_per_s")
+
+def compare(metrics: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Lists every metric that got worse than baseline by more than tolerance
+    (a fraction, so 0.1 is 10%). Metrics missing from either side are skipped."""
+    regressions: list[str] = []
+    for metric, value in metrics.items():
+        old = baseline.get(metric)
+        if old is None or old == 0:
+            continue
+        change = (value - old) / old
+        if higher_is_better(metric):
+            change = -change
+        if change > tolerance:
+            regressions.append(f"{metric}: {old:,.6g} -> {value:,.6g} ({change:+.1%} worse)")
+    return regressions
+
+def print_metrics(metrics: dict[str, float], baseline: dict[str, float] = None) -> None: # type: ignore
+    width = max((len(metric) for metric in metrics), default=0)
+    for metric, value in metrics.items():
+        line = f"{metric:<{width}} {value:>16,.0f}"
+        if baseline and baseline.get(metric):
+            line += f"  ({(value - baseline[metric]) / baseline[metric]:+.1%})"
+        print(line)
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark maze construction, generation, solving and drawing.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--large", action="store_true", help=f"also run the sizes {LARGE_SIZES}")
+    parser.add_argument("--seeds", type=int, nargs="+", default=DEFAULT_SEEDS)
+    parser.add_argument("--generators", nargs="+", default=["backtracker"])
+    parser.add_argument("--solvers", nargs="+", default=["bfs"])
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed regression as a fraction (default 0.1)")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes + [size for size in LARGE_SIZES if args.large and size not in args.sizes]
+    metrics = run_suite(sizes, args.seeds, args.generators, args.solvers, memory=not args.no_memory)
+    baseline: dict[str, float] = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    print_metrics(metrics, baseline)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump(metrics, file, indent=2)
+
+    regressions = compare(metrics, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for regression in regressions:
+            print("  " + regression)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
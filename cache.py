@@ -0,0 +1,175 @@
+"""Caching of generated walls and solver results.
+
+Generating the same (rows, cols, seed, algorithm) maze twice gives the same
+walls, so a MazeCache can hand them back without carving anything. Solver
+results are keyed by the walls themselves (a hash of them) plus the solver,
+so they stay correct however the maze came about.
+
+Entries live in an in-memory LRU and, if a directory is given, in files
+there too: walls in the maze file format (see mazefile.py), solutions as
+JSON. The disk tier survives restarts and can be shared between processes:
+files are written under a temporary name and renamed into place, so readers
+never see half a file, and anything unreadable counts as a miss.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+from collections import OrderedDict
+from typing import Callable, Hashable
+import mazefile
+from grid import Grid
+from solvers import SolveResult
+
+class MazeCache:
+    def __init__(self, max_entries: int = 256, directory: str = None) -> None: # type: ignore
+        """An LRU cache of maze walls and solutions.
+
+        Args:
+            max_entries (int, optional): Entries kept in memory, walls and
+                solutions together. The least recently used go first.
+                Defaults to 256.
+            directory (str, optional): Also keep every entry in files in this
+                directory, which is created if needed. Defaults to None.
+        """
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}")
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups answered from memory or disk"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> None:
+        """Empties the memory tier and resets the counters. Files are kept."""
+        self._entries.clear()
+        self.hits = self.misses = self.disk_hits = 0
+
+    @staticmethod
+    def walls_key(rows: int, cols: int, seed: int, algorithm: str) -> tuple:
+        return ("walls", rows, cols, seed, algorithm)
+
+    @staticmethod
+    def solution_key(grid: Grid, algorithm: str) -> tuple:
+        digest = hashlib.blake2b(bytes(grid.walls), digest_size=16).hexdigest()
+        return ("solution", grid.num_rows, grid.num_cols, digest, algorithm)
+
+    def _file(self, key: tuple, extension: str) -> str:
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, name + extension)
+
+    def _write(self, path: str, write: Callable[[str], None]) -> None:
+        """Calls write with a temporary path next to path, then renames the
+        result to path in one step. Failures leave the disk tier as it was."""
+        try:
+            handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return
+        os.close(handle)
+        try:
+            write(temporary)
+            os.replace(temporary, path)
+        except (OSError, ValueError):
+            # E.g. a full disk, or a seed that doesn't fit in a maze file.
+            # The entry stays in memory only.
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+
+    def _remember(self, key: Hashable, value: object) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _lookup(self, key: Hashable) -> object | None:
+        """Memory only; counts a hit when found."""
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return value
+
+    def get_walls(self, rows: int, cols: int, seed: int, algorithm: str) -> bytes | None:
+        """The walls generated for these parameters, or None."""
+        key = self.walls_key(rows, cols, seed, algorithm)
+        walls = self._lookup(key)
+        if walls is not None:
+            return walls # type: ignore
+        if self.directory is not None:
+            path = self._file(key, ".maze")
+            try:
+                grid, header = mazefile.load(path)
+            except (OSError, ValueError, struct.error):
+                pass # Missing or corrupt, so a miss
+            else:
+                if (header.rows, header.cols, header.seed, header.algorithm) == (rows, cols, seed, algorithm):
+                    walls = bytes(grid.walls)
+                    self._remember(key, walls)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return walls
+        self.misses += 1
+        return None
+
+    def put_walls(self, rows: int, cols: int, seed: int, algorithm: str, walls: bytes | bytearray) -> None:
+        key = self.walls_key(rows, cols, seed, algorithm)
+        walls = bytes(walls)
+        self._remember(key, walls)
+        if self.directory is not None:
+            grid = Grid.from_walls(rows, cols, walls) # type: ignore
+            self._write(self._file(key, ".maze"), lambda path: mazefile.save(path, grid, seed, algorithm))
+
+    def get_solution(self, grid: Grid, algorithm: str) -> SolveResult | None:
+        """What the solver found on these walls, or None. Always a fresh copy."""
+        key = self.solution_key(grid, algorithm)
+        result = self._lookup(key)
+        if result is None and self.directory is not None:
+            try:
+                with open(self._file(key, ".json")) as file:
+                    data = json.load(file)
+                result = SolveResult(algorithm, [(int(row), int(col)) for row, col in data["path"]],
+                                     int(data["nodes_expanded"]))
+            except (OSError, ValueError, KeyError, TypeError):
+                pass # Missing or corrupt, so a miss
+            else:
+                self._remember(key, result)
+                self.hits += 1
+                self.disk_hits += 1
+        if result is None:
+            self.misses += 1
+            return None
+        return SolveResult(result.algorithm, list(result.path), result.nodes_expanded) # type: ignore
+
+    def put_solution(self, grid: Grid, result: SolveResult) -> None:
+        key = self.solution_key(grid, result.algorithm)
+        self._remember(key, SolveResult(result.algorithm, list(result.path), result.nodes_expanded))
+        if self.directory is not None:
+            data = {"path": result.path, "nodes_expanded": result.nodes_expanded}
+            def write(path: str) -> None:
+                with open(path, "w") as file:
+                    json.dump(data, file)
+            self._write(self._file(key, ".json"), write)
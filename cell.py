@@ -1,17 +1,30 @@
-from window import Window
+from typing import TYPE_CHECKING
 from point import Point
-from line import Line
+from events import Move
+from grid import ALL_WALLS, BOTTOM, DIRECTION_NAMES, DIRECTION_ORDER, LEFT, OPPOSITE, RIGHT, TOP, Grid
+
+if TYPE_CHECKING:
+    from renderer import MazeRenderer
+    from window import Window
+
+# Above the wall bits in a standalone cell's _bits
+_VISITED = ALL_WALLS + 1
 
 class Cell:
+    __slots__ = ("_x1", "_y1", "_x2", "_y2", "_win", "_renderer", "_grid", "_index", "_bits")
+
     def __init__(self, 
                  x1: int, y1: int, x2: int, y2: int, 
-                 window: Window = None, # type: ignore
+                 window: "Window" = None, # type: ignore
                  wall_color: str = "black",
                  removed_color: str = None, # type: ignore
                  has_left_wall: bool = True, 
                  has_right_wall: bool = True,
                  has_top_wall: bool = True,
-                 has_bottom_wall: bool = True
+                 has_bottom_wall: bool = True,
+                 grid: Grid = None, # type: ignore
+                 index: int = 0,
+                 renderer: "MazeRenderer" = None # type: ignore
                  ) -> None:
         """This class represents a single cell of a rectangular maze.
 
@@ -21,38 +34,34 @@ class Cell:
             x2 (int): Lower-right X coordinate
             y2 (int): Lower-right Y coordinate
             window (Window): The window this cell is to be painted in. Do not leave empty, the default exists to handle testing.
-            wall_color (str, optional): The color used for the walls. Defaults to "black".
-            removed_color (str, optional): The color used for removed walls. Defaults to the canvas' background color.
+            wall_color (str, optional): Unused, walls are drawn in the renderer's color. Defaults to "black".
+            removed_color (str, optional): Unused, removed walls are deleted, not painted over. Defaults to None.
             has_left_wall (bool, optional): Is the left wall present. Defaults to True.
             has_right_wall (bool, optional): Is the right wall present. Defaults to True.
             has_top_wall (bool, optional): Is the top wall present. Defaults to True.
             has_bottom_wall (bool, optional): Is the bottom wall present. Defaults to True.
+            grid (Grid, optional): The maze grid holding this cell's walls and visited flag.
+                When set, the has_*_wall arguments are ignored and the grid is the source of truth.
+                Defaults to None: the cell keeps its walls and visited flag in a single int.
+            index (int, optional): This cell's flat index in grid. Defaults to 0.
+            renderer (MazeRenderer, optional): The renderer drawing grid, which
+                draw() and draw_move() go through. Without one they do nothing.
+                Defaults to None.
         """
         self._x1 = x1
         self._y1 = y1
         self._x2 = x2
         self._y2 = y2
         self._win = window
-        # Precompute the four corner points
-        self._top_left = Point(x1, y1)
-        self._top_right = Point(x2, y1)
-        self._bottom_left = Point(x1, y2)
-        self._bottom_right = Point(x2, y2)
-        # Precompute potential wall lines
-        self._left_wall = Line(self._top_left, self._bottom_left)
-        self._right_wall = Line(self._top_right, self._bottom_right)
-        self._top_wall = Line(self._top_left, self._top_right)
-        self._bottom_wall = Line(self._bottom_left, self._bottom_right)
-        # Precompute center
-        self._center = Point((x1+x2)//2, (y1+y2)//2)
-        self._wall_color = wall_color
-        self.has_left_wall = has_left_wall
-        self.has_right_wall = has_right_wall
-        self.has_top_wall = has_top_wall
-        self.has_bottom_wall = has_bottom_wall
-        self._removed_color = removed_color or (self._win.bg_color if self._win else "white")
+        self._renderer = renderer
         
-        self.visited = False # For generation/solving
+        # Walls and visited flag live in the grid, so a maze only needs to build
+        # Cell objects when it wants to draw them.
+        self._index = index
+        self._grid = grid
+        # A standalone cell's wall bits (see grid.py) and visited flag
+        self._bits = ((TOP if has_top_wall else 0) | (BOTTOM if has_bottom_wall else 0)
+                      | (LEFT if has_left_wall else 0) | (RIGHT if has_right_wall else 0))
         
     def __repr__(self) -> str:
         return (f"Cell(x1={self._x1}, y1={self._y1}, x2={self._x2}, y2={self._y2}, "
@@ -62,81 +71,124 @@ class Cell:
                 f"B={'Y' if self.has_bottom_wall else 'N'}, "
                 f"visited={'Y' if self.visited else 'N'})")
 
+    @property
+    def _top_left(self) -> Point:
+        return Point(self._x1, self._y1)
+
+    @property
+    def _top_right(self) -> Point:
+        return Point(self._x2, self._y1)
+
+    @property
+    def _bottom_left(self) -> Point:
+        return Point(self._x1, self._y2)
+
+    @property
+    def _bottom_right(self) -> Point:
+        return Point(self._x2, self._y2)
+
+    @property
+    def _center(self) -> Point:
+        return Point((self._x1 + self._x2) // 2, (self._y1 + self._y2) // 2)
+
+    def _get_wall(self, bit: int) -> bool:
+        if self._grid is None:
+            return bool(self._bits & bit)
+        return bool(self._grid.walls[self._index] & bit)
+
+    def _set_wall(self, bit: int, present: bool) -> None:
+        if self._grid is None:
+            self._bits = self._bits | bit if present else self._bits & ~bit
+        elif present:
+            self._grid.walls[self._index] |= bit
+        else:
+            self._grid.walls[self._index] &= ~bit
+
+    @property
+    def has_top_wall(self) -> bool:
+        return self._get_wall(TOP)
+
+    @has_top_wall.setter
+    def has_top_wall(self, present: bool) -> None:
+        self._set_wall(TOP, present)
+
+    @property
+    def has_bottom_wall(self) -> bool:
+        return self._get_wall(BOTTOM)
+
+    @has_bottom_wall.setter
+    def has_bottom_wall(self, present: bool) -> None:
+        self._set_wall(BOTTOM, present)
+
+    @property
+    def has_left_wall(self) -> bool:
+        return self._get_wall(LEFT)
+
+    @has_left_wall.setter
+    def has_left_wall(self, present: bool) -> None:
+        self._set_wall(LEFT, present)
+
+    @property
+    def has_right_wall(self) -> bool:
+        return self._get_wall(RIGHT)
+
+    @has_right_wall.setter
+    def has_right_wall(self, present: bool) -> None:
+        self._set_wall(RIGHT, present)
+
+    @property
+    def visited(self) -> bool:
+        """For generation/solving"""
+        if self._grid is None:
+            return bool(self._bits & _VISITED)
+        return bool(self._grid.visited[self._index])
+
+    @visited.setter
+    def visited(self, value: bool) -> None:
+        if self._grid is None:
+            self._bits = self._bits | _VISITED if value else self._bits & ~_VISITED
+        else:
+            self._grid.visited[self._index] = 1 if value else 0
+
     def draw(self) -> None:
-        """Draws the separate walls of the cell."""
-        if self._win is None:
+        """Brings the canvas items of this cell's walls up to date, through
+        its maze's renderer. Removed walls are taken off the canvas."""
+        if self._renderer is None:
             return # 'Headless' mode for testing purposes.
-        
-        walls = [
-            (self._top_wall, self.has_top_wall),
-            (self._left_wall, self.has_left_wall),
-            (self._bottom_wall, self.has_bottom_wall),
-            (self._right_wall, self.has_right_wall),
-        ]
-
-        # Pass 1: draw removed walls (erase)
-        for wall, exists in walls:
-            if not exists:
-                self._win.draw_line(wall, self._removed_color)
-
-        # Pass 2: draw present walls (overwrite)
-        for wall, exists in walls:
-            if exists:
-                self._win.draw_line(wall, self._wall_color)
-            
+        self._renderer.mark_dirty(self._index)
+        self._renderer.flush()
+
     def draw_move(self, to_cell: 'Cell', undo: bool = False) -> None:
-        """Draws a line between the center of this cell and another.
+        """Draws a line between the center of this cell and a neighbor,
+        reusing the item of an earlier move between the two.
 
         Args:
-            to_cell (Cell): The target cell
+            to_cell (Cell): The target cell, next to this one in the same maze
             undo (bool, optional): Whether this draw operation is an undo.
                 Normal lines are colored red, but undo lines are colored gray.
                 Defaults to False.
         """
-        if self._win is None:
+        if self._renderer is None:
             return # 'Headless' mode for testing purposes.
-        fill_color = "gray" if undo else "red"
-        self._win.draw_line(Line(self._center, to_cell._center), fill_color)
-        
-    def has_wall(self, direction: str) -> bool:
-        """Check for wall based on direction (as a string)"""
-        match (direction):
-            case "up":
-                return self.has_top_wall
-            case "down":
-                return self.has_bottom_wall
-            case "left":
-                return self.has_left_wall
-            case "right":
-                return self.has_right_wall
-            case _:
-                raise ValueError(f"Unknown direction: {direction}")
-
-    def break_wall(self, direction: str, inverse: bool = False) -> None:
+        grid = self._grid
+        for direction in DIRECTION_ORDER:
+            if grid.exits[self._index] & direction and self._index + grid.offsets[direction] == to_cell._index:
+                break
+        else:
+            raise ValueError(f"{to_cell!r} is not next to {self!r}")
+        self._renderer.apply(Move(*divmod(self._index, grid.num_cols), direction, undo))
+        self._renderer.flush()
+
+    def has_wall(self, direction: int) -> bool:
+        """Check for wall based on direction (a code from grid.py)"""
+        if direction not in DIRECTION_NAMES:
+            raise ValueError(f"Unknown direction: {direction}")
+        return self._get_wall(direction)
+
+    def break_wall(self, direction: int, inverse: bool = False) -> None:
         """Break the wall in the indicated direction. If 'inverse' is set,
         break the opposite wall.
         """
-        if not inverse:
-            match (direction):
-                case "up":
-                    self.has_top_wall = False
-                case "down":
-                    self.has_bottom_wall = False
-                case "left":
-                    self.has_left_wall = False
-                case "right":
-                    self.has_right_wall = False
-                case _:
-                    raise ValueError(f"Unknown direction: {direction}")
-        else: # Opposite wall
-            match (direction):
-                case "up":
-                    self.has_bottom_wall = False
-                case "down":
-                    self.has_top_wall = False
-                case "left":
-                    self.has_right_wall = False
-                case "right":
-                    self.has_left_wall = False
-                case _:
-                    raise ValueError(f"Unknown direction: {direction}")
\ No newline at end of file
+        if direction not in DIRECTION_NAMES:
+            raise ValueError(f"Unknown direction: {direction}")
+        self._set_wall(OPPOSITE[direction] if inverse else direction, False)
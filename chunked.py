@@ -0,0 +1,144 @@
+"""Unbounded mazes, generated chunk by chunk as they are explored.
+
+The plane is split into square chunks of chunk_size x chunk_size cells. A
+chunk is an ordinary Grid, carved by one of the generators the first time a
+cell in it is needed, with an rng seeded from (seed, chunk_row, chunk_col).
+On top of that, every border between two chunks gets one door, at a spot
+derived from the seed and the border alone, so both chunks agree on it
+without looking at each other. Each chunk is a perfect maze and connects to
+all four neighbors, so every cell can reach every other one.
+
+Chunks are kept in an LRU cache whose size follows from a memory cap.
+Evicted chunks are regenerated identically when they're needed again, so
+memory depends on the working set, not on how far the maze reaches.
+"""
+import random
+from collections import OrderedDict
+from grid import ALL_WALLS, BOTTOM, D_COL, D_ROW, DIRECTION_NAMES, LEFT, MASK_DIRECTIONS, RIGHT, TOP, Grid
+from generators import BULK_GENERATORS, GENERATORS
+from seeds import derive_seed
+
+# Bytes per cell of a chunk's Grid: walls, visited flags and exits
+_BYTES_PER_CELL = 3
+
+class ChunkedMaze:
+    def __init__(self,
+                 seed: int,
+                 chunk_size: int = 32,
+                 algorithm: str = "backtracker",
+                 max_bytes: int = 64 * 1024 * 1024
+                 ) -> None:
+        """A maze without bounds, in global (row, col) cell coordinates, which
+        may be negative.
+
+        Args:
+            seed (int): Everything is derived from it, so the same seed always
+                gives the same maze.
+            chunk_size (int, optional): Cells along each side of a chunk, at
+                least 2. Defaults to 32.
+            algorithm (str, optional): The generator for each chunk, see
+                generators.GENERATORS. Defaults to "backtracker".
+            max_bytes (int, optional): Roughly how much memory the cached
+                chunks may take. At least one chunk is always kept.
+                Defaults to 64 MiB.
+        """
+        if chunk_size < 2:
+            raise ValueError(f"Chunks need to be at least 2 cells wide, got {chunk_size}")
+        if algorithm not in GENERATORS:
+            raise ValueError(f"Unknown generator: {algorithm}")
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.algorithm = algorithm
+        self.max_chunks = max(1, max_bytes // (_BYTES_PER_CELL * chunk_size * chunk_size))
+        self._chunks: OrderedDict[tuple[int, int], Grid] = OrderedDict()
+        self.chunks_generated = 0
+        self.chunks_evicted = 0
+
+    @property
+    def cached_chunks(self) -> int:
+        return len(self._chunks)
+
+    def door(self, chunk_row: int, chunk_col: int, direction: int) -> int:
+        """Where the door is on the border of a chunk facing direction: the
+        row for LEFT and RIGHT borders, the column for TOP and BOTTOM ones,
+        counted within the chunk. Both chunks on a border get the same answer."""
+        if direction == TOP:
+            chunk_row, direction = chunk_row - 1, BOTTOM
+        elif direction == LEFT:
+            chunk_col, direction = chunk_col - 1, RIGHT
+        return derive_seed(self.seed, chunk_row, chunk_col, direction) % self.chunk_size
+
+    def _generate_chunk(self, chunk_row: int, chunk_col: int) -> Grid:
+        size = self.chunk_size
+        grid = Grid(size, size)
+        rng = random.Random(derive_seed(self.seed, chunk_row, chunk_col))
+        if self.algorithm in BULK_GENERATORS:
+            BULK_GENERATORS[self.algorithm](grid, rng)
+        else:
+            for _ in GENERATORS[self.algorithm](grid, rng):
+                pass
+            grid.reset_visited()
+        walls = grid.walls
+        walls[self.door(chunk_row, chunk_col, TOP)] &= ~TOP
+        walls[(size - 1) * size + self.door(chunk_row, chunk_col, BOTTOM)] &= ~BOTTOM
+        walls[self.door(chunk_row, chunk_col, LEFT) * size] &= ~LEFT
+        walls[self.door(chunk_row, chunk_col, RIGHT) * size + size - 1] &= ~RIGHT
+        self.chunks_generated += 1
+        return grid
+
+    def chunk(self, chunk_row: int, chunk_col: int) -> Grid:
+        """The chunk's grid, generated on first use or after it was evicted.
+        Its walls must not be changed."""
+        key = (chunk_row, chunk_col)
+        chunks = self._chunks
+        grid = chunks.get(key)
+        if grid is not None:
+            chunks.move_to_end(key)
+            return grid
+        grid = chunks[key] = self._generate_chunk(chunk_row, chunk_col)
+        while len(chunks) > self.max_chunks:
+            chunks.popitem(last=False)
+            self.chunks_evicted += 1
+        return grid
+
+    def walls(self, row: int, col: int) -> int:
+        """Wall bitmask of the cell at (row, col), see grid.py"""
+        size = self.chunk_size
+        chunk_row, local_row = divmod(row, size)
+        chunk_col, local_col = divmod(col, size)
+        return self.chunk(chunk_row, chunk_col).walls[local_row * size + local_col]
+
+    def has_wall(self, row: int, col: int, direction: int) -> bool:
+        """Check the wall of (row, col) facing direction."""
+        if direction not in DIRECTION_NAMES:
+            raise ValueError(f"Not a direction: {direction}")
+        return bool(self.walls(row, col) & direction)
+
+    def open_neighbors(self, row: int, col: int) -> list[tuple[int, int]]:
+        """The neighbors of (row, col) with no wall in between, in up, down,
+        left, right order. There is no edge, so all four can qualify."""
+        return [(row + D_ROW[direction], col + D_COL[direction])
+                for direction in MASK_DIRECTIONS[~self.walls(row, col) & ALL_WALLS]]
+
+    def region(self, row: int, col: int, num_rows: int, num_cols: int) -> Grid:
+        """A copy of the num_rows x num_cols cells from (row, col) on, as a
+        Grid that the solvers, renderers and exporters all take. Grid cell
+        (0, 0) is maze cell (row, col).
+
+        Walls leading out of the region are kept as they are, so where the
+        maze continues past the border, the border cells have no wall there.
+        """
+        size = self.chunk_size
+        walls = bytearray(num_rows * num_cols)
+        for chunk_row in range(row // size, (row + num_rows - 1) // size + 1):
+            top = max(row, chunk_row * size)
+            bottom = min(row + num_rows, (chunk_row + 1) * size)
+            for chunk_col in range(col // size, (col + num_cols - 1) // size + 1):
+                left = max(col, chunk_col * size)
+                right = min(col + num_cols, (chunk_col + 1) * size)
+                chunk_walls = self.chunk(chunk_row, chunk_col).walls
+                for cell_row in range(top, bottom):
+                    source = (cell_row - chunk_row * size) * size - chunk_col * size
+                    target = (cell_row - row) * num_cols - col
+                    walls[target + left:target + right] = chunk_walls[source + left:source + right]
+        return Grid.from_walls(num_rows, num_cols, walls)
@@ -0,0 +1,38 @@
+"""Step events streamed by the maze generators and solvers.
+
+Generation and solving are generators yielding these small tuples, so a
+renderer, a recorder or a benchmark can consume them at its own pace, and a
+headless run can simply ignore them.
+"""
+from typing import NamedTuple, Union
+
+class Carve(NamedTuple):
+    """The wall of (row, col) facing direction was removed, along with the
+    matching wall of the neighbor behind it. direction is a code from grid.py."""
+    row: int
+    col: int
+    direction: int
+
+class Visit(NamedTuple):
+    """(row, col) was reached or expanded."""
+    row: int
+    col: int
+
+class Backtrack(NamedTuple):
+    """(row, col) turned out to be a dead end and was left for good."""
+    row: int
+    col: int
+
+class Move(NamedTuple):
+    """The solver stepped from (row, col) to its neighbor in direction, or
+    took that step back again when undo is set."""
+    row: int
+    col: int
+    direction: int
+    undo: bool = False
+
+class Path(NamedTuple):
+    """The finished solution, as (row, col) tuples from start to goal."""
+    cells: list[tuple[int, int]]
+
+Event = Union[Carve, Visit, Backtrack, Move, Path]
@@ -0,0 +1,361 @@
+"""Maze generators working directly on a Grid.
+
+Each generator carves the grid in place and yields a step event for every
+change, see events.py.
+
+Binary Tree and Sidewinder make all their random choices in a few NumPy array
+operations. Besides the usual event generators they come with a bulk version
+in BULK_GENERATORS that writes the whole wall array at once without yielding
+anything, for headless runs where only the result counts. Both need NumPy.
+"""
+import random
+from typing import Any, Callable, Iterator
+from events import Backtrack, Carve, Event
+from grid import ALL_WALLS, BOTTOM, DOWN, LEFT, MASK_DIRECTIONS, RIGHT, TOP, UP, Grid
+from seeds import NumpyRandom
+from numpy_support import numpy
+
+class DisjointSet:
+    def __init__(self, size: int) -> None:
+        """Union-find over the integers 0..size-1, with path compression and
+        union by rank, so every operation is close to constant time."""
+        self._parent = list(range(size))
+        self._rank = bytearray(size)
+
+    def find(self, item: int) -> int:
+        """The representative of item's set"""
+        parent = self._parent
+        while parent[item] != item:
+            # Path halving: point every other node at its grandparent
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a: int, b: int) -> bool:
+        """Merge the sets holding a and b. Returns False if they already were one set."""
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        rank = self._rank
+        if rank[root_a] < rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self._parent[root_b] = root_a
+        if rank[root_a] == rank[root_b]:
+            rank[root_a] += 1
+        return True
+
+def backtracker(grid: Grid, rng: random.Random, start: tuple[int, int] = (0, 0)) -> Iterator[Event]:
+    """An iterative back-tracking maze generator. Uses an explicit stack
+    instead of recursion so large mazes don't hit the recursion limit, but
+    carves in exactly the same order as the old recursive version for a given
+    seed.
+
+    Args:
+        grid (Grid): The grid to carve, which should start with all walls up
+            and nothing visited.
+        rng (random.Random): Source of randomness. Seed it for a repeatable maze.
+        start (tuple[int, int], optional): (row, col) to start from. Defaults to (0, 0).
+
+    Yields:
+        Event: A Carve for every wall removed, a Backtrack for every dead end.
+    """
+    cols = grid.num_cols
+    visited, exits, offsets = grid.visited, grid.exits, grid.offsets
+    start_index = grid.index(*start)
+    visited[start_index] = 1
+    stack = [start_index]
+
+    while stack:
+        index = stack[-1]
+        # Unvisited neighbors as direction codes, in up, down, left, right order
+        unvisited = [direction for direction in MASK_DIRECTIONS[exits[index]]
+                     if not visited[index + offsets[direction]]]
+
+        # Dead end, so start heading home
+        if not unvisited:
+            stack.pop()
+            yield Backtrack(*divmod(index, cols))
+            continue
+
+        direction = rng.choice(unvisited)
+        target = index + offsets[direction]
+        grid.break_wall_at(index, direction)
+        visited[target] = 1
+        stack.append(target)
+        yield Carve(*divmod(index, cols), direction)
+
+def kruskal(grid: Grid, rng: random.Random) -> Iterator[Event]:
+    """Randomized Kruskal's algorithm. Visits every inner wall in random order
+    and removes it if the cells on either side aren't connected yet, tracked
+    with a disjoint-set over flat cell indices.
+
+    Args:
+        grid (Grid): The grid to carve, which should start with all walls up.
+        rng (random.Random): Source of randomness. Seed it for a repeatable maze.
+
+    Yields:
+        Event: A Carve for every wall removed.
+    """
+    rows, cols = grid.num_rows, grid.num_cols
+    # Every inner wall as one int: index * 2 for the right wall, +1 for the bottom one
+    walls = [index * 2 for index in range(rows * cols) if index % cols != cols - 1]
+    walls += [index * 2 + 1 for index in range((rows - 1) * cols)]
+    rng.shuffle(walls)
+    sets = DisjointSet(rows * cols)
+
+    for wall in walls:
+        index, down = divmod(wall, 2)
+        if sets.union(index, index + cols if down else index + 1):
+            direction = DOWN if down else RIGHT
+            grid.break_wall_at(index, direction)
+            yield Carve(*divmod(index, cols), direction)
+
+def _eller_carves(num_rows: int, num_cols: int, rng: random.Random) -> Iterator[list[Carve]]:
+    """The heart of Eller's algorithm: yields the carves for one row at a time.
+    A row's carves only touch that row and the bottom of it, and only O(num_cols)
+    state is kept between rows."""
+    next_set = 0
+    sets: list[int] = [-1] * num_cols
+
+    for row in range(num_rows):
+        carves: list[Carve] = []
+        last_row = row == num_rows - 1
+        # Cells that didn't get carved into from above start their own set
+        members: dict[int, list[int]] = {}
+        for col in range(num_cols):
+            if sets[col] == -1:
+                sets[col] = next_set
+                next_set += 1
+            members.setdefault(sets[col], []).append(col)
+
+        # Randomly join neighbors in different sets; the last row joins them all
+        for col in range(num_cols - 1):
+            a, b = sets[col], sets[col + 1]
+            if a == b or not (last_row or rng.random() < 0.5):
+                continue
+            carves.append(Carve(row, col, RIGHT))
+            # Relabel the smaller set, so each cell moves O(log num_cols) times
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            for member in members[b]:
+                sets[member] = a
+            members[a].extend(members.pop(b))
+
+        if last_row:
+            yield carves
+            return
+
+        # Every set carves down at least once so nothing gets cut off
+        below: list[int] = [-1] * num_cols
+        for set_id, cols in members.items():
+            forced = cols[rng.randrange(len(cols))]
+            for col in cols:
+                if col == forced or rng.random() < 0.5:
+                    carves.append(Carve(row, col, DOWN))
+                    below[col] = set_id
+        sets = below
+        yield carves
+
+def eller(grid: Grid, rng: random.Random) -> Iterator[Event]:
+    """Eller's algorithm, carving the maze one row at a time.
+
+    Args:
+        grid (Grid): The grid to carve, which should start with all walls up.
+        rng (random.Random): Source of randomness. Seed it for a repeatable maze.
+
+    Yields:
+        Event: A Carve for every wall removed.
+    """
+    for carves in _eller_carves(grid.num_rows, grid.num_cols, rng):
+        for carve in carves:
+            grid.break_wall(*carve)
+            yield carve
+
+def eller_rows(num_rows: int, num_cols: int, rng: random.Random,
+               open_ends: bool = False) -> Iterator[bytearray]:
+    """Eller's algorithm without a grid: yields each row's wall bitmasks as soon
+    as the row is finished, keeping only two rows in memory. Combined with
+    mazefile.save_rows() this streams arbitrarily tall mazes straight to disk.
+    Gives the same maze as eller() for the same rng.
+
+    Args:
+        num_rows (int): Number of rows.
+        num_cols (int): Number of columns.
+        rng (random.Random): Source of randomness.
+        open_ends (bool, optional): Also open the entrance (top of the first
+            cell) and exit (bottom of the last cell), like Maze.generate().
+            Defaults to False.
+
+    Yields:
+        bytearray: num_cols wall bitmasks per row, top row first.
+    """
+    current = bytearray([ALL_WALLS]) * num_cols
+    if open_ends and num_rows and num_cols:
+        current[0] &= ~TOP
+    for row, carves in enumerate(_eller_carves(num_rows, num_cols, rng)):
+        below = bytearray([ALL_WALLS]) * num_cols
+        for _, col, direction in carves:
+            if direction == RIGHT:
+                current[col] &= ~RIGHT
+                current[col + 1] &= ~LEFT
+            else:
+                current[col] &= ~BOTTOM
+                below[col] &= ~TOP
+        if open_ends and row == num_rows - 1:
+            current[-1] &= ~BOTTOM
+        yield current
+        current = below
+
+def _numpy_generator(rng: random.Random) -> Any:
+    """A NumPy Generator to make rng's choices with, seeded from rng."""
+    np = numpy()
+    if np is None:
+        raise ImportError("This generator needs NumPy")
+    if isinstance(rng, NumpyRandom):
+        return rng.generator
+    return np.random.default_rng(rng.getrandbits(64))
+
+def _coin_flips(generator: Any, num_rows: int, num_cols: int) -> Any:
+    """A (num_rows, num_cols) boolean array of fair coin flips, eight per random byte."""
+    np = numpy()
+    count = num_rows * num_cols
+    random_bytes = generator.integers(0, 256, size=(count + 7) // 8, dtype=np.uint8)
+    return np.unpackbits(random_bytes)[:count].reshape(num_rows, num_cols).view(bool)
+
+def _binary_tree_choices(num_rows: int, num_cols: int, rng: random.Random) -> tuple[Any, Any]:
+    """Every cell except the top-left one carves up or left at random; the top
+    row can only go left and the left column only up.
+
+    Returns:
+        tuple[ndarray, ndarray]: (up, left) boolean arrays of shape (num_rows, num_cols).
+    """
+    up = _coin_flips(_numpy_generator(rng), num_rows, num_cols)
+    up[0, :] = False
+    up[1:, 0] = True
+    left = ~up
+    left[:, 0] = False
+    return up, left
+
+def _sidewinder_choices(num_rows: int, num_cols: int, rng: random.Random) -> tuple[Any, Any]:
+    """Every row is cut into runs of cells joined to the right. The top row is
+    one long run; below it, every run carves up from one random member.
+
+    Returns:
+        tuple[ndarray, ndarray]: (up, right) boolean arrays of shape (num_rows, num_cols).
+    """
+    np = numpy()
+    generator = _numpy_generator(rng)
+    right = _coin_flips(generator, num_rows, num_cols)
+    right[:, -1] = False
+    right[0, :] = True
+    right[0, -1] = False
+    up = np.zeros((num_rows, num_cols), dtype=bool)
+    if num_rows > 1:
+        # A run ends wherever a cell doesn't carve right. The last column
+        # always ends one, so runs never span rows.
+        ends = np.flatnonzero(~right[1:])
+        lengths = np.diff(ends, prepend=-1)
+        # Pick a member of each run, counting back from its end
+        offsets = generator.random(len(ends))
+        offsets *= lengths
+        chosen = ends - offsets.astype(np.int64)
+        up[1:].reshape(-1)[chosen] = True
+    return up, right
+
+def _wall_array(grid: Grid) -> Any:
+    """grid's walls as a writable (num_rows, num_cols) uint8 array sharing memory with the grid."""
+    np = numpy()
+    if not isinstance(grid.walls, bytearray):
+        grid.walls = bytearray(bytes(grid.walls)) # e.g. memory-mapped walls
+    return np.frombuffer(grid.walls, dtype=np.uint8).reshape(grid.num_rows, grid.num_cols)
+
+def _carve_arrays(grid: Grid, up: Any, side: Any, side_direction: int) -> None:
+    """Clears the walls chosen by up and side (cells carving left or right)
+    in one pass, including the matching walls of the neighbors."""
+    np = numpy()
+    if not len(grid):
+        return
+    walls = _wall_array(grid)
+    side_wall, facing_wall = (LEFT, RIGHT) if side_direction == LEFT else (RIGHT, LEFT)
+    cleared = up * np.uint8(TOP) | side * np.uint8(side_wall)
+    cleared[:-1] |= up[1:] * np.uint8(BOTTOM)
+    if side_direction == LEFT:
+        cleared[:, :-1] |= side[:, 1:] * np.uint8(facing_wall)
+    else:
+        cleared[:, 1:] |= side[:, :-1] * np.uint8(facing_wall)
+    walls &= ~cleared
+
+def _array_carves(grid: Grid, up: Any, side: Any, side_direction: int) -> Iterator[Event]:
+    """Breaks the walls chosen by up and side one at a time, row-major, yielding a Carve for each."""
+    np = numpy()
+    cols = grid.num_cols
+    # A cell can carve both ways, e.g. the cell a Sidewinder run goes up from
+    up_flat, side_flat = up.ravel(), side.ravel()
+    for index in np.flatnonzero(up | side).tolist():
+        row, col = divmod(index, cols)
+        for direction, chosen in ((UP, up_flat), (side_direction, side_flat)):
+            if chosen[index]:
+                grid.break_wall_at(index, direction)
+                yield Carve(row, col, direction)
+
+def binary_tree(grid: Grid, rng: random.Random) -> Iterator[Event]:
+    """Binary Tree: every cell opens up or left at random. Fast, with a
+    telltale long corridor along the top and left edges. Needs NumPy.
+
+    Args:
+        grid (Grid): The grid to carve, which should start with all walls up.
+        rng (random.Random): Source of randomness. Seed it for a repeatable maze.
+
+    Yields:
+        Event: A Carve for every wall removed, row by row.
+    """
+    if not len(grid):
+        return
+    up, left = _binary_tree_choices(grid.num_rows, grid.num_cols, rng)
+    yield from _array_carves(grid, up, left, LEFT)
+
+def carve_binary_tree(grid: Grid, rng: random.Random) -> None:
+    """binary_tree() in a few array operations, without any events. Carves
+    the same maze for the same rng."""
+    if not len(grid):
+        return
+    up, left = _binary_tree_choices(grid.num_rows, grid.num_cols, rng)
+    _carve_arrays(grid, up, left, LEFT)
+
+def sidewinder(grid: Grid, rng: random.Random) -> Iterator[Event]:
+    """Sidewinder: each row is split into horizontal runs and every run opens
+    up from one random cell. Only the top row is a long corridor. Needs NumPy.
+
+    Args:
+        grid (Grid): The grid to carve, which should start with all walls up.
+        rng (random.Random): Source of randomness. Seed it for a repeatable maze.
+
+    Yields:
+        Event: A Carve for every wall removed, row by row.
+    """
+    if not len(grid):
+        return
+    up, right = _sidewinder_choices(grid.num_rows, grid.num_cols, rng)
+    yield from _array_carves(grid, up, right, RIGHT)
+
+def carve_sidewinder(grid: Grid, rng: random.Random) -> None:
+    """sidewinder() in a few array operations, without any events. Carves
+    the same maze for the same rng."""
+    if not len(grid):
+        return
+    up, right = _sidewinder_choices(grid.num_rows, grid.num_cols, rng)
+    _carve_arrays(grid, up, right, RIGHT)
+
+GENERATORS: dict[str, Callable[[Grid, random.Random], Iterator[Event]]] = {
+    "backtracker": backtracker,
+    "kruskal": kruskal,
+    "eller": eller,
+    "binary_tree": binary_tree,
+    "sidewinder": sidewinder,
+}
+
+# Generators that can also carve a whole grid at once, skipping the events
+BULK_GENERATORS: dict[str, Callable[[Grid, random.Random], None]] = {
+    "binary_tree": carve_binary_tree,
+    "sidewinder": carve_sidewinder,
+}
@@ -0,0 +1,140 @@
+"""Compact storage for the state of a rectangular maze.
+
+Walls are packed into a single byte per cell, one bit per wall, and the visited
+flags live in a separate byte map. Cells are stored row-major, so the cell at
+(row, col) lives at index row * num_cols + col.
+
+Directions are small integer codes equal to the wall bit they face, so
+checking or breaking a wall is a single bit operation. Each grid also keeps a
+per-cell mask of the directions that stay in bounds, plus the flat index
+offset of every direction, so walking to a neighbor needs no bounds checks
+or divmod.
+"""
+
+# One bit per wall
+TOP = 0b0001
+BOTTOM = 0b0010
+LEFT = 0b0100
+RIGHT = 0b1000
+ALL_WALLS = TOP | BOTTOM | LEFT | RIGHT
+
+# Direction codes. LEFT and RIGHT double as their own wall bits.
+UP = TOP
+DOWN = BOTTOM
+DIRECTION_ORDER = (UP, DOWN, LEFT, RIGHT)
+
+# Lookup tables indexed by direction code
+OPPOSITE = bytes([0, DOWN, UP, 0, RIGHT, 0, 0, 0, LEFT])
+D_ROW = (0, -1, 1, 0, 0, 0, 0, 0, 0)
+D_COL = (0, 0, 0, 0, -1, 0, 0, 0, 1)
+
+# Mask -> the directions set in it, in up, down, left, right order
+MASK_DIRECTIONS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(direction for direction in DIRECTION_ORDER if mask & direction)
+    for mask in range(16)
+)
+
+DIRECTION_NAMES = {UP: "up", DOWN: "down", LEFT: "left", RIGHT: "right"}
+
+class Grid:
+    def __init__(self, num_rows: int, num_cols: int, walls: int = ALL_WALLS) -> None:
+        """Wall bitmasks and visited flags for a num_rows x num_cols maze.
+
+        Args:
+            num_rows (int): Number of rows.
+            num_cols (int): Number of columns.
+            walls (int, optional): Initial wall bitmask for every cell.
+                Defaults to ALL_WALLS.
+        """
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.walls = bytearray([walls]) * (num_rows * num_cols)
+        self._build_tables()
+
+    @classmethod
+    def from_walls(cls, num_rows: int, num_cols: int, walls: bytearray) -> "Grid":
+        """Wraps existing wall bitmasks, e.g. loaded from a file, without copying.
+        walls can be anything indexable like a bytearray."""
+        grid = cls(0, 0)
+        grid.num_rows = num_rows
+        grid.num_cols = num_cols
+        grid.walls = walls
+        grid._build_tables()
+        return grid
+
+    def _build_tables(self) -> None:
+        cols = self.num_cols
+        # Flat index offset per direction code
+        self.offsets = [0, -cols, cols, 0, -1, 0, 0, 0, 1]
+        # Both per-cell tables are only allocated when first used, so wrapping
+        # memory-mapped walls costs no memory per cell until then
+        self._exits: bytearray | None = None
+        self._visited: bytearray | None = None
+
+    @property
+    def exits(self) -> bytearray:
+        """Per cell, a mask of the directions that lead to another cell"""
+        if self._exits is None:
+            self._exits = self._build_exits()
+        return self._exits
+
+    @property
+    def visited(self) -> bytearray:
+        """One visited flag per cell, for the generators"""
+        if self._visited is None:
+            self._visited = bytearray(len(self))
+        return self._visited
+
+    def _build_exits(self) -> bytearray:
+        rows, cols = self.num_rows, self.num_cols
+        # Per cell, a mask of the directions that lead to another cell.
+        # Built a row at a time with slicing so it stays cheap for huge grids.
+        row = bytearray([ALL_WALLS]) * cols
+        if cols:
+            row[0] &= ~LEFT
+            row[-1] &= ~RIGHT
+        exits = row * rows
+        if rows and cols:
+            exits[:cols] = bytes(value & ~UP for value in row)
+            last = (rows - 1) * cols
+            exits[last:] = bytes(value & ~DOWN for value in exits[last:])
+        return exits
+
+    def __len__(self) -> int:
+        return self.num_rows * self.num_cols
+
+    def index(self, row: int, col: int) -> int:
+        """Flat index of the cell at (row, col)."""
+        return row * self.num_cols + col
+
+    def in_bounds(self, row: int, col: int) -> bool:
+        return 0 <= row < self.num_rows and 0 <= col < self.num_cols
+
+    def has_wall(self, row: int, col: int, direction: int) -> bool:
+        """Check the wall of (row, col) facing direction."""
+        return bool(self.walls[row * self.num_cols + col] & direction)
+
+    def break_wall(self, row: int, col: int, direction: int) -> None:
+        """Break the wall of (row, col) facing direction, along with the matching
+        wall of the neighbor on the other side, if there is one.
+        """
+        self.break_wall_at(row * self.num_cols + col, direction)
+
+    def break_wall_at(self, index: int, direction: int) -> None:
+        """break_wall() for the cell at flat index."""
+        walls = self.walls
+        walls[index] &= ~direction
+        if self.exits[index] & direction:
+            neighbor = index + self.offsets[direction]
+            walls[neighbor] &= ~OPPOSITE[direction]
+
+    def open_neighbors(self, index: int) -> list[int]:
+        """Flat indices of the in-bounds neighbors of index with no wall in
+        between, in up, down, left, right order.
+        """
+        offsets = self.offsets
+        return [index + offsets[direction]
+                for direction in MASK_DIRECTIONS[self.exits[index] & ~self.walls[index]]]
+
+    def reset_visited(self) -> None:
+        self._visited = None
@@ -0,0 +1,195 @@
+"""Headless rendering of a maze grid to SVG or PNG, no Tk or display needed.
+
+SVG output draws every merged wall run (see renderer.wall_runs) into a single
+path and needs nothing but the standard library, though NumPy speeds it up a
+lot on big mazes. PNG output rasterizes the walls with NumPy into a 2-bit
+palette image and encodes it with zlib and struct.
+
+A solution path, as (row, col) tuples like SolveResult.path, can be drawn on
+top of either.
+"""
+import struct
+import zlib
+from typing import Any
+from grid import Grid
+from renderer import line_runs, wall_lines, wall_runs
+from numpy_support import numpy
+
+Color = tuple[int, int, int]
+
+def _digits(values: Any, width: int) -> Any:
+    """values as zero-padded ASCII digits, one row of width bytes each."""
+    np = numpy()
+    values = values.astype(np.int64)
+    digits = np.empty((len(values), width), dtype=np.uint8)
+    for column in range(width - 1, -1, -1):
+        digits[:, column] = values % 10 + ord("0")
+        values //= 10
+    return digits
+
+def _path_commands(x: Any, y: Any, end: Any, command: bytes) -> bytes:
+    """"M{x} {y}{command}{end}" for every run, built as one byte array. Numbers
+    are zero-padded to a fixed width, which SVG allows, so every command has
+    the same length and no per-run Python formatting is needed."""
+    np = numpy()
+    if not len(x):
+        return b""
+    width = len(str(int(max(x.max(), y.max(), end.max()))))
+    commands = np.empty((len(x), 3 + 3 * width), dtype=np.uint8)
+    commands[:, 0] = ord("M")
+    commands[:, 1:1 + width] = _digits(x, width)
+    commands[:, 1 + width] = ord(" ")
+    commands[:, 2 + width:2 + 2 * width] = _digits(y, width)
+    commands[:, 2 + 2 * width] = ord(command)
+    commands[:, 3 + 2 * width:] = _digits(end, width)
+    return commands.tobytes()
+
+def _wall_path(grid: Grid, cell_size_x: int, cell_size_y: int, margin: int) -> str:
+    """SVG path data drawing every wall run of grid."""
+    np = numpy()
+    if np is None or not len(grid):
+        commands = []
+        for row1, col1, row2, col2 in wall_runs(grid):
+            x, y = margin + col1 * cell_size_x, margin + row1 * cell_size_y
+            if row1 == row2:
+                commands.append(f"M{x} {y}H{margin + col2 * cell_size_x}")
+            else:
+                commands.append(f"M{x} {y}V{margin + row2 * cell_size_y}")
+        return "".join(commands)
+
+    horizontal, vertical = wall_lines(grid)
+    row, start, stop = line_runs(horizontal)
+    data = _path_commands(margin + start * cell_size_x, margin + row * cell_size_y,
+                          margin + stop * cell_size_x, b"H")
+    col, start, stop = line_runs(vertical.T)
+    data += _path_commands(margin + col * cell_size_x, margin + start * cell_size_y,
+                           margin + stop * cell_size_y, b"V")
+    return data.decode("ascii")
+
+def to_svg(grid: Grid,
+           cell_size_x: int = 10, cell_size_y: int = 10,
+           solution: list[tuple[int, int]] = None, # type: ignore
+           wall_color: str = "black",
+           path_color: str = "red",
+           background: str = "white",
+           wall_width: int = 2,
+           margin: int = 2) -> str:
+    """Draws grid as an SVG document.
+
+    Args:
+        grid (Grid): The maze.
+        cell_size_x (int, optional): Cell width in pixels. Defaults to 10.
+        cell_size_y (int, optional): Cell height in pixels. Defaults to 10.
+        solution (list[tuple[int, int]], optional): Cells to connect with a line
+            through their centers, e.g. SolveResult.path. Defaults to None.
+        wall_color (str, optional): Any SVG color. Defaults to "black".
+        path_color (str, optional): Any SVG color. Defaults to "red".
+        background (str, optional): Any SVG color. Defaults to "white".
+        wall_width (int, optional): Stroke width of the walls. Defaults to 2.
+        margin (int, optional): Space around the maze, so the outer walls
+            aren't clipped. Defaults to 2.
+
+    Returns:
+        str: The SVG document.
+    """
+    width = grid.num_cols * cell_size_x + 2 * margin
+    height = grid.num_rows * cell_size_y + 2 * margin
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">\n',
+        f'<rect width="100%" height="100%" fill="{background}"/>\n',
+        f'<path fill="none" stroke="{wall_color}" stroke-width="{wall_width}" '
+        f'stroke-linecap="square" d="{_wall_path(grid, cell_size_x, cell_size_y, margin)}"/>\n',
+    ]
+    if solution:
+        points = " ".join(
+            f"{margin + col * cell_size_x + cell_size_x // 2},{margin + row * cell_size_y + cell_size_y // 2}"
+            for row, col in solution
+        )
+        parts.append(f'<polyline fill="none" stroke="{path_color}" stroke-width="{wall_width}" '
+                     f'points="{points}"/>\n')
+    parts.append("</svg>\n")
+    return "".join(parts)
+
+def rasterize(grid: Grid, cell_size: int = 4,
+              solution: list[tuple[int, int]] = None) -> Any: # type: ignore
+    """Draws grid into a NumPy image of palette indices: 0 for background, 1 for
+    walls and 2 for the solution. Walls are one pixel wide.
+
+    Returns:
+        ndarray: uint8 array of shape (num_rows * cell_size + 1, num_cols * cell_size + 1).
+    """
+    np = numpy()
+    if np is None:
+        raise ImportError("Raster output needs NumPy")
+    if cell_size < 2:
+        raise ValueError(f"Cells need to be at least 2 pixels wide, got {cell_size}")
+    rows, cols = grid.num_rows, grid.num_cols
+    image = np.zeros((rows * cell_size + 1, cols * cell_size + 1), dtype=np.uint8)
+    if not len(grid):
+        return image
+    horizontal, vertical = wall_lines(grid)
+    # Each segment covers cell_size pixels from its start corner, and the
+    # far corner pixel is covered separately.
+    image[::cell_size, :-1] |= np.repeat(horizontal, cell_size, axis=1)
+    image[::cell_size, cell_size::cell_size] |= horizontal
+    image[:-1, ::cell_size] |= np.repeat(vertical, cell_size, axis=0)
+    image[cell_size::cell_size, ::cell_size] |= vertical
+
+    if solution:
+        centers = np.asarray(solution, dtype=np.int64).reshape(-1, 2) * cell_size + cell_size // 2
+        image[centers[:, 0], centers[:, 1]] = 2
+        if len(centers) > 1:
+            # Every pixel from one center to the next
+            steps = np.arange(cell_size + 1)
+            d_row = np.sign(centers[1:, 0] - centers[:-1, 0])
+            d_col = np.sign(centers[1:, 1] - centers[:-1, 1])
+            image[centers[:-1, 0, None] + d_row[:, None] * steps,
+                  centers[:-1, 1, None] + d_col[:, None] * steps] = 2
+    return image
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+def encode_png(image: Any, palette: list[Color], level: int = 1) -> bytes:
+    """Encodes a 2D array of palette indices (at most 4 colors) as a 2-bit
+    palette PNG. level is the zlib level; higher levels barely shrink maze
+    images but take several times longer."""
+    np = numpy()
+    height, width = image.shape
+    # Four pixels per byte, first pixel in the high bits. Rows are padded to
+    # whole bytes and each one starts with filter type 0.
+    padded = np.zeros((height, -(-width // 4) * 4), dtype=np.uint8)
+    padded[:, :width] = image
+    quads = padded.reshape(height, -1, 4)
+    raw = np.zeros((height, quads.shape[1] + 1), dtype=np.uint8)
+    raw[:, 1:] = quads[:, :, 0] << 6 | quads[:, :, 1] << 4 | quads[:, :, 2] << 2 | quads[:, :, 3]
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 2, 3, 0, 0, 0)),
+        _chunk(b"PLTE", b"".join(bytes(color) for color in palette)),
+        _chunk(b"IDAT", zlib.compress(raw.tobytes(), level)),
+        _chunk(b"IEND", b""),
+    ])
+
+def to_png(grid: Grid, cell_size: int = 4,
+           solution: list[tuple[int, int]] = None, # type: ignore
+           wall_color: Color = (0, 0, 0),
+           path_color: Color = (255, 0, 0),
+           background: Color = (255, 255, 255)) -> bytes:
+    """Draws grid as a PNG image. Needs NumPy.
+
+    Args:
+        grid (Grid): The maze.
+        cell_size (int, optional): Cell size in pixels, at least 2. Defaults to 4.
+        solution (list[tuple[int, int]], optional): Cells to connect with a line
+            through their centers, e.g. SolveResult.path. Defaults to None.
+        wall_color (Color, optional): RGB. Defaults to black.
+        path_color (Color, optional): RGB. Defaults to red.
+        background (Color, optional): RGB. Defaults to white.
+
+    Returns:
+        bytes: The PNG file.
+    """
+    image = rasterize(grid, cell_size, solution)
+    return encode_png(image, [background, wall_color, path_color])
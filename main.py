@@ -1,14 +1,47 @@
+from itertools import chain
+from typing import Iterator
 from maze import Maze
+from numpy_support import numpy
+from viewport import Viewport
 from window import Window
 
+WIDTH, HEIGHT = 800, 600
+MARGIN = 10
+# Bigger mazes, or ones whose cells would get smaller than MIN_CELL_SIZE
+# pixels on the canvas, are generated in one go and browsed with scrolling
+# and zooming instead of animated
+ANIMATE_MAX_CELLS = 50 * 50
+MAX_CELL_SIZE = 20
+MIN_CELL_SIZE = 4
+# Carves the whole grid at once (see generators.BULK_GENERATORS), which takes
+# about half a second for 5000 x 5000 cells instead of minutes for the
+# backtracker. It needs NumPy; without it the backtracker is used, still on
+# the worker thread. Browsed mazes aren't solved, the Viewport only shows
+# the walls.
+BROWSE_ALGORITHM = "sidewinder"
+
 def main() -> None:
-    window = Window(800, 600)
+    window = Window(WIDTH, HEIGHT)
+
+    def show(maze: Maze) -> None:
+        viewport = Viewport(window, maze.grid, WIDTH, HEIGHT)
+        viewport.fit()
+        window.set_viewport(viewport)
+
+    def carve(maze: Maze) -> Iterator[Maze]:
+        # A single step, computed on the worker thread so Tk stays responsive
+        maze.generate(BROWSE_ALGORITHM if numpy() is not None else "backtracker")
+        yield maze
 
     def generate(rows: int, cols: int) -> None:
-        window.get_canvas().delete("all")
-        maze = Maze(10, 10, rows, cols, 20, 20, window, draw_delay=window.get_delay())
-        maze.generate()
-        maze.solve()
+        cell_size = min(MAX_CELL_SIZE, (WIDTH - 2 * MARGIN) // max(cols, 1),
+                        (HEIGHT - 2 * MARGIN) // max(rows, 1))
+        if rows * cols > ANIMATE_MAX_CELLS or cell_size < MIN_CELL_SIZE:
+            window.run_steps(carve(Maze(0, 0, rows, cols, 1, 1)), on_step=show)
+            return
+        maze = Maze(MARGIN, MARGIN, rows, cols, cell_size, cell_size, window)
+        window.run_steps(chain(maze.generate_steps(), maze.solve_steps()),
+                         on_step=maze.draw_step, on_frame=maze.draw_pending)
 
     window.set_generate_callback(generate)
     # Uncomment for immediate generation
@@ -16,4 +49,4 @@ def main() -> None:
     window.wait_for_close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
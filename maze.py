@@ -1,8 +1,25 @@
 
 import random
-from time import sleep
+from array import array
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Generator, Iterator, TypeVar
+from cache import MazeCache
 from cell import Cell
-from window import Window
+from events import Carve, Event
+from generators import BULK_GENERATORS, GENERATORS
+from grid import DOWN, UP, Grid
+import images
+import mazefile
+from pathindex import PathIndex
+from renderer import MazeRenderer
+from seeds import NumpyRandom
+from solvers import SOLVERS, SolveResult, distance_map, path_events
+from stats import InstrumentedWindow, MazeStats
+
+if TYPE_CHECKING:
+    from window import Window
+
+T = TypeVar("T")
 
 class Maze:
     def __init__(
@@ -13,22 +30,57 @@ class Maze:
         num_cols: int,
         cell_size_x: int,
         cell_size_y: int,
-        win: Window = None, # type: ignore
+        win: "Window" = None, # type: ignore
         draw_delay: float = 0.05,
-        seed: int = None # type: ignore
+        seed: int = None, # type: ignore
+        rng: random.Random = None, # type: ignore
+        grid: Grid = None, # type: ignore
+        cache: MazeCache = None, # type: ignore
+        instrument: bool = False
     ) -> None:
         """ The maze class, handles creating the entire maze. Do not leave Window unset,
-        the default is there to facilitate testing."""
+        the default is there to facilitate testing.
+        
+        Every maze owns its random number generator, so the same seed always gives
+        the same maze, whatever else runs in the process (other mazes, threads, or
+        code using the random module). Pass rng to supply the generator yourself:
+        a random.Random, or a numpy.random.Generator for batched draws.
+
+        Pass grid to wrap existing walls, e.g. a loaded maze, instead of starting
+        from a fresh grid with every wall up.
+
+        Pass a MazeCache to reuse earlier results: generate() looks up seeded
+        mazes by size, seed and algorithm, and solve() looks up the walls and
+        solver. Mazes with a custom rng or grid are never looked up.
+
+        Pass instrument=True to collect step counts and timings in stats, see
+        stats.py. Without it, none of that bookkeeping runs.
+        """
         self._x1 = x1
         self._y1 = y1
         self._num_rows = num_rows
         self._num_cols = num_cols
         self._cell_size_x = cell_size_x
         self._cell_size_y = cell_size_y
+        self._stats: MazeStats | None = None
+        if instrument:
+            self._stats = MazeStats()
+            if win is not None:
+                win = InstrumentedWindow(win, self._stats) # type: ignore
         self._win = win
         self._draw_delay = draw_delay
         
-        random.seed(a=seed)
+        self._seed = seed
+        self._algorithm = ""
+        self._grid = grid
+        self._cache = cache
+        # Only a fresh seeded maze is fully described by its cache key
+        self._cacheable = seed is not None and rng is None and grid is None
+        if rng is None:
+            rng = random.Random(seed)
+        elif not isinstance(rng, random.Random):
+            rng = NumpyRandom(rng)
+        self._rng = rng
         self._create_cells()
 
     # def __repr__(self) -> str:
@@ -44,141 +96,308 @@ class Maze:
     #         output += "\n"
     #     return output
     
-    def generate(self) -> None:
+    def generate(self, algorithm: str = "backtracker") -> None:
+        """Carves the maze.
+
+        Args:
+            algorithm (str, optional): One of the generators in generators.GENERATORS:
+                "backtracker", "kruskal", "eller", "binary_tree" or "sidewinder".
+                Defaults to "backtracker".
+        """
+        cacheable = self._cache is not None and self._cacheable and algorithm in GENERATORS
+        if cacheable:
+            walls = self._cache.get_walls(self._num_rows, self._num_cols, self._seed, algorithm) # type: ignore
+            if walls is not None:
+                self._use_walls(walls, algorithm)
+                return
+        self._generate(algorithm)
+        if cacheable:
+            self._cache.put_walls(self._num_rows, self._num_cols, self._seed, algorithm, self._grid.walls) # type: ignore
+
+    def _generate(self, algorithm: str) -> None:
+        if self._win is None and algorithm in BULK_GENERATORS:
+            # Nothing to draw, so carve the whole grid in one go
+            self._algorithm = algorithm
+            self._break_entrance_and_exit()
+            start = perf_counter()
+            BULK_GENERATORS[algorithm](self._grid, self._rng)
+            if self._stats is not None:
+                # A perfect maze: every cell but one, plus entrance and exit
+                self._stats.cells_carved += len(self._grid) + 1
+                self._stats.generate_time += perf_counter() - start
+            self._cacheable = False
+            return
+        self._run(self.generate_steps(algorithm))
+
+    def _use_walls(self, walls: bytes, algorithm: str) -> None:
+        """Takes over cached walls as if algorithm had just carved them."""
+        self._grid.walls[:] = walls
+        self._algorithm = algorithm
         self._break_entrance_and_exit()
-        self._break_walls_r(0, 0)
+        self._cacheable = False
+        if self._renderer is not None:
+            self._renderer.draw_all()
+            self._animate()
+
+    def generate_steps(self, algorithm: str = "backtracker") -> Iterator[Event]:
+        """Generates the maze lazily, yielding a step event (see events.py)
+        for every change. Nothing is drawn here; pass the events to draw_step(),
+        or use Window.run_steps to animate them without blocking the window.
+        """
+        steps = self._generate_steps(algorithm)
+        if self._stats is None:
+            return steps
+        return self._stats.timed_steps(steps, self._grid, "generate")
+
+    def _generate_steps(self, algorithm: str) -> Generator[Event, None, None]:
+        if algorithm not in GENERATORS:
+            raise ValueError(f"Unknown generator: {algorithm}")
+        self._algorithm = algorithm
+        self._cacheable = False
+        self._break_entrance_and_exit()
+        yield Carve(*self._entrance_position, UP)
+        yield Carve(*self._exit_position, DOWN)
+        yield from GENERATORS[algorithm](self._grid, self._rng)
         self._reset_cells_visited()
+
+    def _run(self, steps: Generator[Event, None, T]) -> T:
+        """Runs steps to completion right away, returning the generator's result.
+        With a window, every step is drawn and followed by a draw_delay sleep.
+        """
+        if self._win is None:
+            # 'Headless' mode, skip drawing altogether
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as done:
+                    return done.value
+        while True:
+            try:
+                event = next(steps)
+            except StopIteration as done:
+                self._animate()
+                return done.value
+            self.draw_step(event)
+            self._animate()
     
     def _create_cells(self) -> None:
-        self._cells: list[list[Cell]] = []
-        for i in range(self._num_cols):  # Columns first
-            column: list[Cell] = []
-            for j in range(self._num_rows):  # Then rows
-                cell = Cell(self._x1 + i*self._cell_size_x,  # i for column (x)
-                            self._y1 + j*self._cell_size_y,  # j for row (y)
-                            self._x1 + (i+1)*self._cell_size_x,
-                            self._y1 + (j+1)*self._cell_size_y,
-                            self._win)
-                column.append(cell)
-            self._cells.append(column)
-        
-        # Draw cells after all are created
-        for i in range(self._num_cols):
-            for j in range(self._num_rows):
-                self._draw_cell(j, i)
-                
-    def _get_cell(self, row: int, col: int) -> Cell:
-        """We store our grid as [column][row]. Instead of breaking my brain every time
-        I need to look up a cell, as coordinates are usually given as [row][column], 
-        have a helper function.
+        """Sets up the wall grid, unless one was passed in. Cell objects are only built on demand when
+        something needs to be drawn, so headless mazes never create any.
         """
-        return self._cells[col][row]
-    
-    def _in_bounds(self, row: int, col: int) -> bool:
-        """Helper function to check if a given coordinate can exist in our maze"""
-        return 0 <= row < self._num_rows and 0 <= col < self._num_cols
+        if self._grid is None:
+            self._grid = Grid(self._num_rows, self._num_cols)
+        self._renderer: MazeRenderer | None = None
         
-    def _get_neighbors(self, row: int, col: int) -> list[tuple[Cell, str, int, int]]:
-        """Generates and returns a list of (Cell, direction, new_row, new_col) 
-        tuples for the cell at the given coordinates.
+        # Draw all walls in one go after the grid is set up
+        if self._win is None:
+            return
+        self._renderer = MazeRenderer(self._win, self._grid, self._x1, self._y1,
+                                      self._cell_size_x, self._cell_size_y)
+        self._renderer.draw_all()
+        self._animate()
+
+    @property
+    def _cells(self) -> list[list[Cell]]:
+        """The grid as [column][row] Cell objects. Each access builds fresh
+        Cells backed by the grid, so this is meant for debugging and tests.
+        """
+        return [
+            [self._get_cell(row, col) for row in range(self._num_rows)]
+            for col in range(self._num_cols)
+        ]
+                
+    @property
+    def seed(self) -> int | None:
+        """The seed this maze was created with, if any"""
+        return self._seed
+
+    @property
+    def stats(self) -> MazeStats | None:
+        """Counters and timings of everything this maze ran, when it was built
+        with instrument=True, otherwise None"""
+        return self._stats
+
+    @property
+    def algorithm(self) -> str:
+        """The generator that carved this maze, empty if it hasn't been generated"""
+        return self._algorithm
+
+    def save(self, path: str) -> None:
+        """Saves the walls, seed and algorithm in the compact maze file format,
+        see mazefile.py."""
+        mazefile.save(path, self._grid, self._seed, self._algorithm)
+
+    @classmethod
+    def load(cls, path: str, win: "Window" = None, # type: ignore
+             x1: int = 0, y1: int = 0, cell_size_x: int = 10, cell_size_y: int = 10,
+             memory_map: bool = False) -> "Maze":
+        """Loads a maze saved with save().
 
         Args:
-            row (int): Cell row coordinate.
-            col (int): Cell column coordinate
+            path (str): The maze file.
+            win (Window, optional): The window to draw in. Defaults to headless.
+            x1, y1, cell_size_x, cell_size_y (int, optional): Where and how big to
+                draw, as for the constructor. Default to 0, 0, 10 and 10.
+            memory_map (bool, optional): Map the file and decode walls on access
+                instead of reading it all in, so huge mazes open instantly.
+                Defaults to False.
 
         Returns:
-            list[tuple[Cell, str, int, int]]: 
-                A list of tuples with (Cell, direction, new_row, new_col).
+            Maze: The loaded maze, with the saved seed and algorithm.
         """
-        neighbors: list[tuple[Cell, str, int, int]] = []
-        directions = [
-            (-1, 0, "up"),
-            (1, 0, "down"),
-            (0, -1, "left"),
-            (0, 1, "right"),
-        ]
+        grid, header = mazefile.load(path, memory_map=memory_map)
+        maze = cls(x1, y1, header.rows, header.cols, cell_size_x, cell_size_y, win,
+                   seed=header.seed, grid=grid)
+        maze._algorithm = header.algorithm
+        return maze
+
+    def to_ascii(self) -> str:
+        """The maze as ASCII art, handy for debugging and diffing"""
+        return "\n".join(mazefile.iter_ascii(self._grid))
+
+    def save_ascii(self, path: str) -> None:
+        """Streams the ASCII art from to_ascii() to a file, line by line"""
+        with open(path, "w") as out:
+            mazefile.write_ascii(self._grid, out)
+
+    def to_svg(self, solution: list[tuple[int, int]] = None, **options) -> str: # type: ignore
+        """The maze as an SVG document, drawn with this maze's cell size. No
+        window needed. Pass e.g. solve().path as solution to draw it too.
+        Other options go to images.to_svg."""
+        options.setdefault("cell_size_x", self._cell_size_x)
+        options.setdefault("cell_size_y", self._cell_size_y)
+        return images.to_svg(self._grid, solution=solution, **options)
+
+    def save_svg(self, path: str, solution: list[tuple[int, int]] = None, **options) -> None: # type: ignore
+        """Writes to_svg() to a file"""
+        with open(path, "w") as out:
+            out.write(self.to_svg(solution, **options))
+
+    def to_png(self, solution: list[tuple[int, int]] = None, cell_size: int = 4, **options) -> bytes: # type: ignore
+        """The maze as a PNG image with cell_size pixel cells, drawn without a
+        window. Needs NumPy. Other options go to images.to_png."""
+        return images.to_png(self._grid, cell_size, solution, **options)
+
+    def save_png(self, path: str, solution: list[tuple[int, int]] = None, cell_size: int = 4, **options) -> None: # type: ignore
+        """Writes to_png() to a file"""
+        with open(path, "wb") as out:
+            out.write(self.to_png(solution, cell_size, **options))
 
-        for d_row, d_col, direction in directions:
-            new_row, new_col = row + d_row, col + d_col
-            if self._in_bounds(new_row, new_col):
-                neighbor = self._get_cell(new_row, new_col)
-                neighbors.append((neighbor, direction, new_row, new_col))
+    @property
+    def grid(self) -> Grid:
+        """The wall grid, e.g. to save or hand off a generated maze"""
+        return self._grid
 
-        return neighbors
+    def _get_cell(self, row: int, col: int) -> Cell:
+        """Builds the Cell at the given coordinates. It reads and writes its
+        walls straight from the maze grid.
+        """
+        return Cell(self._x1 + col*self._cell_size_x,  # col for x
+                    self._y1 + row*self._cell_size_y,  # row for y
+                    self._x1 + (col+1)*self._cell_size_x,
+                    self._y1 + (row+1)*self._cell_size_y,
+                    self._win,
+                    grid=self._grid,
+                    index=self._grid.index(row, col),
+                    renderer=self._renderer) # type: ignore
+    
+    def _in_bounds(self, row: int, col: int) -> bool:
+        """Helper function to check if a given coordinate can exist in our maze"""
+        return 0 <= row < self._num_rows and 0 <= col < self._num_cols
        
     def _draw_cell(self, row: int, col: int) -> None:
-        cell = self._get_cell(row, col)
-        cell.draw()
+        self._mark_dirty(row, col)
         self._animate()
+
+    def _mark_dirty(self, row: int, col: int) -> None:
+        """Queue a cell for redrawing on the next draw_pending()"""
+        if self._renderer is not None:
+            self._renderer.mark_dirty(self._grid.index(row, col))
+
+    def draw_step(self, event: Event) -> None:
+        """Draws a single step event from generate_steps() or solve_steps()"""
+        if self._renderer is not None:
+            self._renderer.apply(event)
+
+    def draw_pending(self) -> None:
+        """Draws every cell changed since the last call. Meant to be called once
+        per animation frame."""
+        if self._renderer is not None:
+            self._renderer.flush()
     
     def _animate(self) -> None:
         if self._win is None:
             return # 'Headless' mode for testing
+        self.draw_pending()
         self._win.redraw()
+        if self._stats is None:
+            sleep(self._draw_delay)
+            return
+        start = perf_counter()
         sleep(self._draw_delay)
+        self._stats.sleep_time += perf_counter() - start
         
     def _break_entrance_and_exit(self):
-        entrance = self._get_cell(0, 0)
-        entrance.has_top_wall = False
+        self._grid.break_wall(0, 0, UP)
         self._entrance_position = (0, 0)
-        entrance.draw()
-        exit = self._get_cell(self._num_rows - 1, self._num_cols - 1)
-        exit.has_bottom_wall = False
+        self._grid.break_wall(self._num_rows - 1, self._num_cols - 1, DOWN)
         self._exit_position = (self._num_rows - 1, self._num_cols - 1)
-        exit.draw()
     
-    def _break_walls_r(self, i: int, j: int) -> None:
-        """A recursive back-tracking maze generator.
+    def _reset_cells_visited(self) -> None:
+        self._grid.reset_visited()
+
+    def solve(self, algorithm: str = "dfs") -> SolveResult:
+        """Solves the maze from the entrance (top-left) to the exit (bottom-right).
 
         Args:
-            i (int): Cell row coordinate
-            j (int): Cell column coordinate
+            algorithm (str, optional): One of the solvers in solvers.SOLVERS: "dfs",
+                "bfs", "astar", "bidirectional" or "dead_end_filling". Defaults to "dfs".
+
+        Returns:
+            SolveResult: The path as (row, col) tuples and the number of nodes expanded.
+                Empty path if there is no way through. Truthy when solved.
         """
-        current = self._get_cell(i, j)
-        current.visited = True
-        
-        while True:
-            # Generate list of tuples of unvisited neighboring cells, refreshed
-            # after recursion
-            neighbors = [
-                (cell, direction, n_row, n_col) 
-                for cell, direction, n_row, n_col in self._get_neighbors(i,j) 
-                if not cell.visited
-            ]
-                    
-            # Dead end, so start heading home
-            if not neighbors:
-                current.draw()
-                return
+        if self._cache is None:
+            return self._run(self.solve_steps(algorithm))
+        result = self._cache.get_solution(self._grid, algorithm)
+        if result is not None:
+            # Nothing to search, just show the path
+            if self._win is not None:
+                for event in path_events(result.path):
+                    self.draw_step(event)
+                self._animate()
+            return result
+        result = self._run(self.solve_steps(algorithm))
+        self._cache.put_solution(self._grid, result)
+        return result
 
-            target, direction, new_i, new_j = random.choice(neighbors)
-            current.break_wall(direction)
-            target.break_wall(direction, inverse=True)
-            
-            self._break_walls_r(new_i, new_j)
-        
-    def _reset_cells_visited(self) -> None:
-        for col in self._cells:
-            for cell in col:
-                cell.visited = False
+    def solve_steps(self, algorithm: str = "dfs") -> Generator[Event, None, SolveResult]:
+        """Like solve(), but yields a step event (see events.py) as it goes.
+        The SolveResult is the generator's return value.
+        """
+        steps = self._solve_steps(algorithm)
+        if self._stats is None:
+            return steps
+        return self._stats.timed_steps(steps, self._grid, "solve")
 
-    def solve(self) -> bool:
-        return self._solve_r(0, 0)
-    
-    def _solve_r(self, row: int, col: int) -> bool:
-        if (row, col) == self._exit_position:
-            return True
-        self._animate()
-        current = self._get_cell(row, col)
-        current.visited = True
-        neighbors = self._get_neighbors(row, col)
-        for cell, direction, new_row, new_col in neighbors:
-            if not current.has_wall(direction) and not cell.visited:
-                current.draw_move(cell)
-                result = self._solve_r(new_row, new_col)
-                if result:
-                    return True
-                else:
-                    current.draw_move(cell, undo=True)
-        
-        return False
\ No newline at end of file
+    def _solve_steps(self, algorithm: str) -> Generator[Event, None, SolveResult]:
+        if algorithm not in SOLVERS:
+            raise ValueError(f"Unknown solver: {algorithm}")
+        start = (0, 0)
+        goal = (self._num_rows - 1, self._num_cols - 1)
+        return (yield from SOLVERS[algorithm](self._grid, start, goal))
+
+    def distance_map(self, start: tuple[int, int] = (0, 0)) -> array:
+        """Breadth-first distance from start (the entrance by default) to every
+        cell, e.g. for difficulty ratings or heatmaps. See solvers.distance_map.
+
+        Returns:
+            array: One int per cell, row-major, -1 where start can't be reached.
+        """
+        return distance_map(self._grid, start)
+
+    def path_index(self) -> PathIndex:
+        """An index answering distance, path and next step queries between any
+        two cells in O(log n), for a generated (perfect) maze. Build it once
+        and reuse it, see pathindex.py."""
+        return PathIndex(self._grid)
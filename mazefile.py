@@ -0,0 +1,219 @@
+"""Compact on-disk format for generated mazes, plus an ASCII export.
+
+Layout, little-endian:
+
+    magic      4 bytes   b"MAZE"
+    version    u8        1
+    flags      u8        bit 0: a seed is stored
+    alg_len    u16       length of the algorithm name
+    rows       u32
+    cols       u32
+    seed       u64       0 when there is no seed
+    algorithm  alg_len bytes of UTF-8
+    walls      ceil(rows * cols / 2) bytes, two cells per byte
+
+Walls use the bitmask from grid.py, row-major. The cell with an even index
+goes in the low nibble of its byte, the next one in the high nibble.
+"""
+import mmap
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Iterator, TextIO
+from grid import BOTTOM, LEFT, RIGHT, TOP, Grid
+
+MAGIC = b"MAZE"
+VERSION = 1
+_HEADER = struct.Struct("<4sBBHIIQ")
+_HAS_SEED = 0b1
+
+# Byte -> nibble lookup tables, so packing and unpacking run in C via translate()
+_LOW_NIBBLE = bytes(value & 0x0F for value in range(256))
+_HIGH_NIBBLE = bytes(value >> 4 for value in range(256))
+_TO_HIGH_NIBBLE = bytes((value & 0x0F) << 4 for value in range(256))
+
+@dataclass(frozen=True)
+class MazeHeader:
+    rows: int
+    cols: int
+    seed: int | None
+    algorithm: str
+
+    @property
+    def data_offset(self) -> int:
+        """Where the packed walls start in the file"""
+        return _HEADER.size + len(self.algorithm.encode())
+
+    def pack(self) -> bytes:
+        if self.seed is not None and not 0 <= self.seed < 2**64:
+            raise ValueError(f"Seed must fit in 64 unsigned bits to be saved: {self.seed}")
+        algorithm = self.algorithm.encode()
+        flags = _HAS_SEED if self.seed is not None else 0
+        return _HEADER.pack(MAGIC, VERSION, flags, len(algorithm),
+                            self.rows, self.cols, self.seed or 0) + algorithm
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "MazeHeader":
+        if len(data) < _HEADER.size:
+            raise ValueError("Maze file has a truncated header")
+        magic, version, flags, alg_len, rows, cols, seed = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a maze file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported maze file version: {version}")
+        if len(data) < _HEADER.size + alg_len:
+            raise ValueError("Maze file has a truncated header")
+        algorithm = bytes(data[_HEADER.size:_HEADER.size + alg_len]).decode()
+        return cls(rows, cols, seed if flags & _HAS_SEED else None, algorithm)
+
+def pack_walls(walls: bytes | bytearray) -> bytes:
+    """Packs one wall bitmask per byte into two per byte."""
+    even = bytes(walls[0::2]).translate(_LOW_NIBBLE)
+    odd = bytes(walls[1::2]).translate(_TO_HIGH_NIBBLE)
+    # The nibbles don't overlap, so OR-ing them as two big integers merges
+    # every byte pair in one go.
+    merged = int.from_bytes(even, "little") | int.from_bytes(odd, "little")
+    return merged.to_bytes(len(even), "little")
+
+def unpack_walls(packed: bytes | bytearray | memoryview, count: int) -> bytearray:
+    """Reverses pack_walls(), giving count wall bitmasks one per byte."""
+    packed = bytes(packed[:(count + 1) // 2])
+    walls = bytearray(len(packed) * 2)
+    walls[0::2] = packed.translate(_LOW_NIBBLE)
+    walls[1::2] = packed.translate(_HIGH_NIBBLE)
+    del walls[count:]
+    return walls
+
+class MappedWalls:
+    def __init__(self, buffer: mmap.mmap, offset: int, count: int) -> None:
+        """Wall bitmasks read straight out of a memory-mapped maze file, one
+        nibble at a time. Behaves like the bytearray in Grid.walls, so a Grid
+        can use it as is.
+
+        Args:
+            buffer (mmap.mmap): The mapped file.
+            offset (int): Where the packed walls start.
+            count (int): Number of cells.
+        """
+        self._buffer = buffer
+        self._offset = offset
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> int:
+        if not 0 <= index < self._count:
+            raise IndexError("cell index out of range")
+        value = self._buffer[self._offset + (index >> 1)]
+        return value >> 4 if index & 1 else value & 0x0F
+
+    def __setitem__(self, index: int, walls: int) -> None:
+        if not 0 <= index < self._count:
+            raise IndexError("cell index out of range")
+        position = self._offset + (index >> 1)
+        value = self._buffer[position]
+        if index & 1:
+            value = (value & 0x0F) | ((walls & 0x0F) << 4)
+        else:
+            value = (value & 0xF0) | (walls & 0x0F)
+        self._buffer[position] = value
+
+    def __iter__(self) -> Iterator[int]:
+        for index in range(self._count):
+            yield self[index]
+
+    def __bytes__(self) -> bytes:
+        return bytes(unpack_walls(memoryview(self._buffer)[self._offset:], self._count))
+
+    def hex(self) -> str:
+        return bytes(self).hex()
+
+def save(path: str, grid: Grid, seed: int | None = None, algorithm: str = "") -> None:
+    """Writes grid to path in the maze file format."""
+    header = MazeHeader(grid.num_rows, grid.num_cols, seed, algorithm)
+    with open(path, "wb") as out:
+        out.write(header.pack())
+        out.write(pack_walls(bytes(grid.walls)))
+
+def save_rows(path: str, num_rows: int, num_cols: int, rows: Iterable[bytes | bytearray],
+              seed: int | None = None, algorithm: str = "") -> None:
+    """Writes a maze to path one row at a time, without ever holding the whole
+    grid in memory. rows must give num_rows rows of num_cols wall bitmasks.
+    """
+    header = MazeHeader(num_rows, num_cols, seed, algorithm)
+    pending = bytearray()
+    written = 0
+    with open(path, "wb") as out:
+        out.write(header.pack())
+        for row in rows:
+            if len(row) != num_cols:
+                raise ValueError(f"Expected rows of {num_cols} cells, got {len(row)}")
+            pending += row
+            written += 1
+            # Pack whole byte pairs, carrying an odd cell over to the next row
+            even = len(pending) & ~1
+            out.write(pack_walls(pending[:even]))
+            del pending[:even]
+        out.write(pack_walls(pending))
+    if written != num_rows:
+        raise ValueError(f"Expected {num_rows} rows, got {written}")
+
+def load(path: str, memory_map: bool = False) -> tuple[Grid, MazeHeader]:
+    """Reads a maze file.
+
+    Args:
+        path (str): The file to read.
+        memory_map (bool, optional): Map the file instead of reading it. The walls
+            are then decoded on access, so even huge mazes open instantly.
+            Changes stay in memory and never reach the file. Defaults to False.
+            The grid still builds its one-byte-per-cell exits table (see
+            grid.py) in memory once anything walks the maze, e.g. a solver,
+            and visited flags if a generator runs on it; loading alone
+            allocates nothing per cell.
+
+    Raises:
+        ValueError: path isn't a maze file, or it's truncated.
+
+    Returns:
+        tuple[Grid, MazeHeader]: The grid and the file's header.
+    """
+    with open(path, "rb") as file:
+        if memory_map:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+            header = MazeHeader.unpack(buffer[:_HEADER.size + 0xFFFF])
+            size = len(buffer)
+        else:
+            data = file.read()
+            header = MazeHeader.unpack(data)
+            size = len(data)
+    count = header.rows * header.cols
+    if size < header.data_offset + (count + 1) // 2:
+        raise ValueError(f"Maze file is truncated: {path}")
+    if memory_map:
+        walls = MappedWalls(buffer, header.data_offset, count)
+    else:
+        walls = unpack_walls(memoryview(data)[header.data_offset:], count)
+    return Grid.from_walls(header.rows, header.cols, walls), header
+
+def iter_ascii(grid: Grid) -> Iterator[str]:
+    """Draws grid as ASCII art, one line at a time, e.g.
+
+        +  +--+
+        |     |
+        +--+  +
+    """
+    rows, cols, walls = grid.num_rows, grid.num_cols, grid.walls
+    yield "+" + "".join("--+" if walls[col] & TOP else "  +" for col in range(cols))
+    for row in range(rows):
+        start = row * cols
+        line = "|" if walls[start] & LEFT else " "
+        for index in range(start, start + cols):
+            line += "  |" if walls[index] & RIGHT else "   "
+        yield line
+        yield "+" + "".join("--+" if walls[index] & BOTTOM else "  +"
+                            for index in range(start, start + cols))
+
+def write_ascii(grid: Grid, out: TextIO) -> None:
+    """Streams iter_ascii(grid) to out."""
+    for line in iter_ascii(grid):
+        out.write(line + "\n")
@@ -0,0 +1,18 @@
+"""NumPy, imported the first time something needs it.
+
+NumPy is optional, and importing it takes several times longer than
+importing everything else here. So modules call numpy() in the functions
+that use it instead of importing it at the top, and `import maze` doesn't
+load it at all.
+"""
+from functools import cache
+from typing import Any
+
+@cache
+def numpy() -> Any:
+    """The numpy module, or None when it isn't installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -0,0 +1,227 @@
+"""Logarithmic-time shortest path queries between any two cells of a perfect maze.
+
+A perfect maze (every generator here makes one) is a tree: there is exactly
+one path between any two cells. Rooting that tree anywhere, the path from a
+to b goes up from a to their lowest common ancestor, then down to b. So
+PathIndex does one breadth-first search to get every cell's parent and
+depth, then builds a binary lifting table, the 2**k-th ancestor of every
+cell for every k. From then on:
+  - distance(a, b) and next_step(a, b) take O(log n)
+  - path(a, b) takes O(log n + path length)
+  - distances() and next_steps() answer whole arrays of queries with NumPy
+The table takes n * log2(depth) ints, e.g. about 70 MB for 1000 x 1000 cells.
+"""
+from array import array
+from typing import Any
+from grid import MASK_DIRECTIONS, Grid
+from numpy_support import numpy
+
+Cell = tuple[int, int]
+
+class PathIndex:
+    def __init__(self, grid: Grid, root: Cell = (0, 0)) -> None:
+        """Indexes the passages of grid for path queries. The walls must not
+        change afterwards.
+
+        Args:
+            grid (Grid): A perfect maze, or at least a tree on the part of it
+                that root can reach. Cells it can't reach get no answers.
+            root (Cell, optional): Where the tree is rooted. Any cell gives the
+                same answers. Defaults to (0, 0).
+
+        Raises:
+            ValueError: The passages reachable from root form a loop, so paths
+                aren't unique and the tree answers could be wrong.
+        """
+        np = numpy()
+        self._grid = grid
+        count = len(grid)
+        cols, walls, exits, offsets = grid.num_cols, grid.walls, grid.exits, grid.offsets
+        root_index = grid.index(*root)
+        # Every cell is its own parent until reached, and the root stays so
+        parents = array("i", range(count))
+        depths = array("i", [-1]) * count
+        depths[root_index] = 0
+        frontier = [root_index]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                parent = parents[current]
+                for direction in MASK_DIRECTIONS[exits[current] & ~walls[current]]:
+                    neighbor = current + offsets[direction]
+                    if depths[neighbor] == -1:
+                        depths[neighbor] = depth
+                        parents[neighbor] = current
+                        next_frontier.append(neighbor)
+                    elif neighbor != parent:
+                        row, col = divmod(neighbor, cols)
+                        raise ValueError(f"Not a perfect maze: ({row}, {col}) closes a loop")
+            frontier = next_frontier
+        self.root = root
+        self.depths = depths
+        self.parents = parents
+
+        # up[k][i] is the 2**k-th ancestor of cell i, or the root
+        levels = max(1, (depth - 1).bit_length())
+        if np is not None:
+            up = np.empty((levels, count), dtype=np.intc)
+            up[0] = np.frombuffer(parents, dtype=np.intc)
+            for level in range(1, levels):
+                up[level] = up[level - 1][up[level - 1]]
+            self._up_array = up
+            self._depth_array = np.frombuffer(depths, dtype=np.intc)
+            # Single queries index memoryviews, which hand out plain ints
+            # much faster than NumPy scalars
+            self._up: list[Any] = [memoryview(row) for row in up]
+        else:
+            self._up = [parents]
+            for level in range(1, levels):
+                previous = self._up[-1]
+                self._up.append(array("i", [previous[ancestor] for ancestor in previous]))
+
+    def _index(self, cell: Cell) -> int:
+        row, col = cell
+        if not self._grid.in_bounds(row, col):
+            raise ValueError(f"{cell} is outside the maze")
+        return row * self._grid.num_cols + col
+
+    def _ancestor(self, index: int, steps: int) -> int:
+        """The cell steps levels above index"""
+        up, level = self._up, 0
+        while steps:
+            if steps & 1:
+                index = up[level][index]
+            steps >>= 1
+            level += 1
+        return index
+
+    def _lca(self, a: int, b: int) -> int:
+        depths, up = self.depths, self._up
+        if depths[a] < depths[b]:
+            a, b = b, a
+        a = self._ancestor(a, depths[a] - depths[b])
+        if a == b:
+            return a
+        for level in range(len(up) - 1, -1, -1):
+            if up[level][a] != up[level][b]:
+                a, b = up[level][a], up[level][b]
+        return up[0][a]
+
+    def _connected(self, a: int, b: int) -> bool:
+        return self.depths[a] != -1 and self.depths[b] != -1
+
+    def lca(self, a: Cell, b: Cell) -> Cell | None:
+        """Where the paths from a and b to the root meet, or None when either
+        can't be reached."""
+        a_index, b_index = self._index(a), self._index(b)
+        if not self._connected(a_index, b_index):
+            return None
+        return divmod(self._lca(a_index, b_index), self._grid.num_cols)
+
+    def distance(self, a: Cell, b: Cell) -> int:
+        """Steps on the path from a to b, -1 when there is none."""
+        a_index, b_index = self._index(a), self._index(b)
+        if not self._connected(a_index, b_index):
+            return -1
+        depths = self.depths
+        return depths[a_index] + depths[b_index] - 2 * depths[self._lca(a_index, b_index)]
+
+    def next_step(self, a: Cell, b: Cell) -> Cell | None:
+        """The cell to go to from a to get closer to b: a itself when a is b,
+        None when there is no path."""
+        a_index, b_index = self._index(a), self._index(b)
+        if not self._connected(a_index, b_index):
+            return None
+        if a_index == b_index:
+            return a
+        lca = self._lca(a_index, b_index)
+        if lca != a_index:
+            step = self.parents[a_index]
+        else:
+            # a is above b, so go down towards b
+            step = self._ancestor(b_index, self.depths[b_index] - self.depths[a_index] - 1)
+        return divmod(step, self._grid.num_cols)
+
+    def path(self, a: Cell, b: Cell) -> list[Cell]:
+        """The cells from a to b, both included, like SolveResult.path. Empty
+        when there is no path."""
+        a_index, b_index = self._index(a), self._index(b)
+        if not self._connected(a_index, b_index):
+            return []
+        lca, parents = self._lca(a_index, b_index), self.parents
+        up_part, down_part = [a_index], []
+        while up_part[-1] != lca:
+            up_part.append(parents[up_part[-1]])
+        while b_index != lca:
+            down_part.append(b_index)
+            b_index = parents[b_index]
+        cols = self._grid.num_cols
+        return [divmod(index, cols) for index in up_part + down_part[::-1]]
+
+    def _flat(self, cells: Any) -> Any:
+        np = numpy()
+        cells = np.asarray(cells, dtype=np.int64).reshape(-1, 2)
+        rows, cols = cells[:, 0], cells[:, 1]
+        if ((rows < 0) | (rows >= self._grid.num_rows) | (cols < 0) | (cols >= self._grid.num_cols)).any():
+            raise ValueError("Some cells are outside the maze")
+        return rows * self._grid.num_cols + cols
+
+    def _ancestors(self, indices: Any, steps: Any) -> Any:
+        """_ancestor() for arrays"""
+        np = numpy()
+        for level in range(len(self._up_array)):
+            move = (steps >> level) & 1 != 0
+            indices = np.where(move, self._up_array[level][indices], indices)
+        return indices
+
+    def _lcas(self, a: Any, b: Any) -> Any:
+        """_lca() for arrays"""
+        np = numpy()
+        depths, up = self._depth_array, self._up_array
+        swap = depths[a] < depths[b]
+        a, b = np.where(swap, b, a), np.where(swap, a, b)
+        a = self._ancestors(a, depths[a] - depths[b])
+        for level in range(len(up) - 1, -1, -1):
+            a_up, b_up = up[level][a], up[level][b]
+            differ = a_up != b_up
+            a, b = np.where(differ, a_up, a), np.where(differ, b_up, b)
+        return np.where(a == b, a, up[0][a])
+
+    def distances(self, starts: Any, goals: Any) -> Any:
+        """distance() for many pairs at once, with NumPy.
+
+        Args:
+            starts (array-like): (M, 2) (row, col) cells.
+            goals (array-like): (M, 2) (row, col) cells.
+
+        Returns:
+            ndarray: M distances, -1 where there is no path.
+        """
+        np = numpy()
+        if np is None:
+            return array("i", [self.distance(tuple(a), tuple(b)) for a, b in zip(starts, goals)])
+        a, b = self._flat(starts), self._flat(goals)
+        depths = self._depth_array
+        result = depths[a] + depths[b] - 2 * depths[self._lcas(a, b)]
+        return np.where((depths[a] == -1) | (depths[b] == -1), -1, result)
+
+    def next_steps(self, starts: Any, goals: Any) -> Any:
+        """next_step() for many pairs at once, with NumPy.
+
+        Returns:
+            ndarray: (M, 2) (row, col) cells, (-1, -1) where there is no path.
+        """
+        np = numpy()
+        if np is None:
+            return [self.next_step(tuple(a), tuple(b)) for a, b in zip(starts, goals)]
+        a, b = self._flat(starts), self._flat(goals)
+        depths, parents = self._depth_array, self._up_array[0]
+        lca = self._lcas(a, b)
+        below = self._ancestors(b, np.maximum(depths[b] - depths[a] - 1, 0))
+        step = np.where(lca != a, parents[a], below)
+        step = np.where(a == b, a, step)
+        step = np.where((depths[a] == -1) | (depths[b] == -1), -1, step)
+        rows, cols = np.divmod(step, self._grid.num_cols)
+        return np.where(step[:, None] == -1, -1, np.stack([rows, cols], axis=-1))
@@ -0,0 +1,306 @@
+"""Bulk rendering for a maze grid.
+
+Instead of every cell drawing its own four walls, the renderer merges
+collinear wall segments into long runs and keeps one canvas item per run.
+After that it follows the step events from generation and solving (see
+events.py). A broken wall shortens, splits or deletes the item of its run,
+and every solver move owns one item that gets recolored when the move is
+undone or retaken. So the number of canvas items never grows past what is
+actually on screen, and each frame's changes reach the window as one batch
+of edits (see Window.apply_line_edits).
+"""
+from array import array
+from typing import TYPE_CHECKING, Any
+from events import Carve, Event, Move
+from grid import BOTTOM, D_COL, D_ROW, LEFT, RIGHT, TOP, Grid
+from line import Line
+from numpy_support import numpy
+from point import Point
+
+if TYPE_CHECKING:
+    from window import Window
+
+def wall_runs(grid: Grid) -> list[tuple[int, int, int, int]]:
+    """Merges the walls of grid into maximal straight runs.
+
+    Returns:
+        list[tuple[int, int, int, int]]: (row1, col1, row2, col2) runs in grid
+            corner coordinates, so (0, 0) is the top-left corner of the maze and
+            (num_rows, num_cols) the bottom-right one. Horizontal runs come first.
+    """
+    if numpy() is not None and len(grid):
+        return _wall_runs_numpy(grid)
+    rows, cols, walls = grid.num_rows, grid.num_cols, grid.walls
+    runs: list[tuple[int, int, int, int]] = []
+
+    # Horizontal line r runs along the top of row r (and the bottom of row r-1)
+    for r in range(rows + 1):
+        start = -1
+        for c in range(cols):
+            present = ((r < rows and walls[r * cols + c] & TOP)
+                       or (r > 0 and walls[(r - 1) * cols + c] & BOTTOM))
+            if present and start == -1:
+                start = c
+            elif not present and start != -1:
+                runs.append((r, start, r, c))
+                start = -1
+        if start != -1:
+            runs.append((r, start, r, cols))
+
+    # Vertical line c runs along the left of column c (and the right of column c-1)
+    for c in range(cols + 1):
+        start = -1
+        for r in range(rows):
+            present = ((c < cols and walls[r * cols + c] & LEFT)
+                       or (c > 0 and walls[r * cols + c - 1] & RIGHT))
+            if present and start == -1:
+                start = r
+            elif not present and start != -1:
+                runs.append((start, c, r, c))
+                start = -1
+        if start != -1:
+            runs.append((start, c, rows, c))
+
+    return runs
+
+def wall_lines(grid: Grid) -> tuple[Any, Any]:
+    """Which wall segments of grid are up, as NumPy boolean arrays: horizontal
+    segments of shape (num_rows + 1, num_cols), one row per horizontal grid
+    line, and vertical ones of shape (num_rows, num_cols + 1)."""
+    np = numpy()
+    rows, cols = grid.num_rows, grid.num_cols
+    walls = np.frombuffer(bytes(grid.walls), dtype=np.uint8).reshape(rows, cols)
+    horizontal = np.zeros((rows + 1, cols), dtype=bool)
+    horizontal[:-1] |= (walls & TOP) != 0
+    horizontal[1:] |= (walls & BOTTOM) != 0
+    vertical = np.zeros((rows, cols + 1), dtype=bool)
+    vertical[:, :-1] |= (walls & LEFT) != 0
+    vertical[:, 1:] |= (walls & RIGHT) != 0
+    return horizontal, vertical
+
+def line_runs(lines: Any) -> tuple[Any, Any, Any]:
+    """(line, start, stop) of every run of True in each row of lines."""
+    np = numpy()
+    width = lines.shape[1] + 1
+    # One False between rows, so runs can't wrap around, then scan it flat
+    padded = np.zeros((lines.shape[0], width), dtype=bool)
+    padded[:, 1:] = lines
+    flat = padded.ravel()
+    starts = np.flatnonzero(flat[1:] & ~flat[:-1])
+    stops = np.flatnonzero(flat[:-1] & ~flat[1:])
+    stops = np.append(stops, len(flat) - 1) if flat[-1] else stops
+    line = starts // width
+    return line, starts - line * width, stops - line * width
+
+def _wall_runs_numpy(grid: Grid) -> list[tuple[int, int, int, int]]:
+    """wall_runs(), with the scanning done by NumPy. Same runs, same order."""
+    horizontal, vertical = wall_lines(grid)
+    row, start, stop = line_runs(horizontal)
+    runs = list(zip(row.tolist(), start.tolist(), row.tolist(), stop.tolist()))
+    col, start, stop = line_runs(vertical.T)
+    runs += zip(start.tolist(), col.tolist(), stop.tolist(), col.tolist())
+    return runs
+
+# Edits handed to Window.apply_line_edits, applied in order:
+#   ("create", tags, line, color)  new line item; tags[0] names it
+#   ("coords", tag, line)          move an item's end points
+#   ("color", tag, color)          recolor items
+#   ("delete", tag)                delete items
+LineEdit = tuple
+
+# Tags shared by every item of a kind, so a new maze can clear the old one
+WALL_TAG = "wall"
+MOVE_TAG = "move"
+
+class MazeRenderer:
+    def __init__(self,
+                 win: "Window",
+                 grid: Grid,
+                 x1: int, y1: int,
+                 cell_size_x: int, cell_size_y: int,
+                 wall_color: str = "black"
+                 ) -> None:
+        """Draws the walls of grid onto win, plus the solver's moves, keeping
+        one canvas item per wall run and per move.
+
+        Args:
+            win (Window): The window to draw in.
+            grid (Grid): The grid holding the walls.
+            x1 (int): X coordinate of the maze's top-left corner.
+            y1 (int): Y coordinate of the maze's top-left corner.
+            cell_size_x (int): Cell width in pixels.
+            cell_size_y (int): Cell height in pixels.
+            wall_color (str, optional): The color used for the walls. Defaults to "black".
+        """
+        self._win = win
+        self._grid = grid
+        self._x1 = x1
+        self._y1 = y1
+        self._cell_size_x = cell_size_x
+        self._cell_size_y = cell_size_y
+        self._wall_color = wall_color
+        self._dirty: set[int] = set()
+        self._edits: list[LineEdit] = []
+        self._reset_items()
+
+    def _reset_items(self) -> None:
+        rows, cols = self._grid.num_rows, self._grid.num_cols
+        # Run id of every unit wall segment, 0 where there is no wall.
+        # Horizontal line r, segment c is at r * cols + c; vertical line c,
+        # segment r at c * rows + r.
+        self._horizontal = array("i", [0]) * ((rows + 1) * cols)
+        self._vertical = array("i", [0]) * ((cols + 1) * rows)
+        # Run id -> [vertical, line, start, stop]
+        self._runs: dict[int, list[int]] = {}
+        self._next_run = 1
+        # Move items by edge, see _edge()
+        self._moves: set[int] = set()
+
+    def _corner(self, row: int, col: int) -> Point:
+        return Point(self._x1 + col * self._cell_size_x, self._y1 + row * self._cell_size_y)
+
+    def _center(self, row: int, col: int) -> Point:
+        return Point(self._x1 + col * self._cell_size_x + self._cell_size_x // 2,
+                     self._y1 + row * self._cell_size_y + self._cell_size_y // 2)
+
+    def _run_line(self, vertical: int, line: int, start: int, stop: int) -> Line:
+        if vertical:
+            return Line(self._corner(start, line), self._corner(stop, line))
+        return Line(self._corner(line, start), self._corner(line, stop))
+
+    def _segments(self, vertical: int) -> tuple[array, int]:
+        """The segment array for one orientation and its stride per line"""
+        if vertical:
+            return self._vertical, self._grid.num_rows
+        return self._horizontal, self._grid.num_cols
+
+    def _create_run(self, vertical: int, line: int, start: int, stop: int) -> None:
+        run = self._next_run
+        self._next_run += 1
+        self._runs[run] = [vertical, line, start, stop]
+        segments, stride = self._segments(vertical)
+        for segment in range(line * stride + start, line * stride + stop):
+            segments[segment] = run
+        self._edits.append(("create", (f"w{run}", WALL_TAG),
+                            self._run_line(vertical, line, start, stop), self._wall_color))
+
+    def _add_segment(self, vertical: int, line: int, segment: int) -> None:
+        segments, stride = self._segments(vertical)
+        if not segments[line * stride + segment]:
+            self._create_run(vertical, line, segment, segment + 1)
+
+    def _remove_segment(self, vertical: int, line: int, segment: int) -> None:
+        """Takes one unit segment out of its run, shortening or splitting the
+        run's item, or deleting it when nothing is left."""
+        segments, stride = self._segments(vertical)
+        run = segments[line * stride + segment]
+        if not run:
+            return
+        segments[line * stride + segment] = 0
+        _, _, start, stop = self._runs[run]
+        before, after = segment - start, stop - segment - 1
+        if not before and not after:
+            del self._runs[run]
+            self._edits.append(("delete", f"w{run}"))
+            return
+        # The run keeps its item for the longer part, the shorter part gets
+        # a new one, so relabeling segments stays cheap overall.
+        if before >= after:
+            kept, split = (start, segment), (segment + 1, stop)
+        else:
+            kept, split = (segment + 1, stop), (start, segment)
+        self._runs[run][2:] = kept
+        self._edits.append(("coords", f"w{run}", self._run_line(vertical, line, *kept)))
+        if split[0] < split[1]:
+            self._create_run(vertical, line, *split)
+
+    def _sync_cell(self, index: int) -> None:
+        """Makes the four wall items around the cell at index match the grid.
+        A wall between two cells is up if either cell has it."""
+        grid = self._grid
+        cols, walls, exits = grid.num_cols, grid.walls, grid.exits
+        row, col = divmod(index, cols)
+        cell_walls, cell_exits = walls[index], exits[index]
+        segments = (
+            (0, row, col, cell_walls & TOP or (cell_exits & TOP and walls[index - cols] & BOTTOM)),
+            (0, row + 1, col, cell_walls & BOTTOM or (cell_exits & BOTTOM and walls[index + cols] & TOP)),
+            (1, col, row, cell_walls & LEFT or (cell_exits & LEFT and walls[index - 1] & RIGHT)),
+            (1, col + 1, row, cell_walls & RIGHT or (cell_exits & RIGHT and walls[index + 1] & LEFT)),
+        )
+        for vertical, line, segment, present in segments:
+            if present:
+                self._add_segment(vertical, line, segment)
+            else:
+                self._remove_segment(vertical, line, segment)
+
+    def _edge(self, index: int, direction: int) -> int:
+        """A number for the edge between the cell at index and its neighbor
+        in direction, the same from both sides."""
+        neighbor = index + self._grid.offsets[direction]
+        low = min(index, neighbor)
+        return low * 2 + (abs(neighbor - index) != 1)
+
+    def apply(self, event: Event) -> None:
+        """Draw a step event. Carved walls and moves are queued for the next
+        flush(), everything else is ignored. Only reads the grid's size, so
+        it's safe while another thread is still changing the walls.
+        """
+        if isinstance(event, Carve):
+            # Taken from the event alone, never the grid, which may already be
+            # further along when the steps come from a worker thread
+            row, col, direction = event
+            if direction == TOP:
+                self._remove_segment(0, row, col)
+            elif direction == BOTTOM:
+                self._remove_segment(0, row + 1, col)
+            elif direction == LEFT:
+                self._remove_segment(1, col, row)
+            else:
+                self._remove_segment(1, col + 1, row)
+        elif isinstance(event, Move):
+            row, col, direction, undo = event
+            edge = self._edge(self._grid.index(row, col), direction)
+            color = "gray" if undo else "red"
+            if edge in self._moves:
+                self._edits.append(("color", f"m{edge}", color))
+            else:
+                self._moves.add(edge)
+                line = Line(self._center(row, col),
+                            self._center(row + D_ROW[direction], col + D_COL[direction]))
+                self._edits.append(("create", (f"m{edge}", MOVE_TAG), line, color))
+
+    def draw_all(self) -> None:
+        """Replaces whatever maze the window showed with every wall of this
+        one, one item per merged run."""
+        self._edits = [("delete", WALL_TAG), ("delete", MOVE_TAG)]
+        self._reset_items()
+        for row1, col1, row2, col2 in wall_runs(self._grid):
+            if row1 == row2:
+                self._create_run(0, row1, col1, col2)
+            else:
+                self._create_run(1, col1, row1, row2)
+        self._dirty.clear()
+        self._send()
+
+    @property
+    def item_count(self) -> int:
+        """Canvas items this renderer has on screen, walls and moves"""
+        return len(self._runs) + len(self._moves)
+
+    def mark_dirty(self, index: int) -> None:
+        """Queue the cell at flat index for a redraw on the next flush()."""
+        self._dirty.add(index)
+
+    def flush(self) -> None:
+        """Brings the items of every dirty cell up to date and sends all
+        queued edits to the window in one batch.
+        """
+        for index in self._dirty:
+            self._sync_cell(index)
+        self._dirty.clear()
+        self._send()
+
+    def _send(self) -> None:
+        if self._edits:
+            edits, self._edits = self._edits, []
+            self._win.apply_line_edits(edits)
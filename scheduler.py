@@ -0,0 +1,216 @@
+"""Frame-budgeted animation on top of the Tk event loop.
+
+Rather than sleeping after every step, the scheduler wakes up once per frame
+through Tk's after(), applies as many pending steps as the speed setting and
+the frame budget allow, and then hands control back to Tk so the window
+stays responsive.
+
+The steps themselves can be computed on a worker thread with BackgroundSteps,
+so even a slow generator or solver never holds up the event loop.
+"""
+import queue
+import threading
+from time import perf_counter
+from typing import TYPE_CHECKING, Callable, Generic, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    from tkinter import Misc
+
+T = TypeVar("T")
+
+# Returned by a step iterator that has nothing ready yet. The scheduler ends
+# the frame early and asks again on the next one.
+PENDING = object()
+
+_DONE = object()
+
+class BackgroundSteps(Generic[T]):
+    def __init__(self, steps: Iterator[T], batch_size: int = 256, max_batches: int = 8) -> None:
+        """Runs steps on a daemon thread, which posts them in batches through
+        a bounded queue. Iterating over this never blocks: next() hands out the
+        steps in order, or PENDING when the worker hasn't caught up. If steps
+        raises, the error is raised again from next().
+
+        The worker must not touch Tk. Anything it shares with the UI thread,
+        like a maze grid, should only be read there through the steps.
+
+        Args:
+            steps (Iterator[T]): The steps to run on the worker.
+            batch_size (int, optional): Steps per queue entry. Defaults to 256.
+            max_batches (int, optional): Batches the worker may run ahead
+                before it waits. Defaults to 8.
+        """
+        self._batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(max_batches)
+        self._cancelled = threading.Event()
+        self._batch: list[T] = []
+        self._position = 0
+        self._finished = False
+        self._thread = threading.Thread(target=self._produce, args=(steps,), daemon=True)
+        self._thread.start()
+
+    def _produce(self, steps: Iterator[T]) -> None:
+        batch: list[T] = []
+        try:
+            for step in steps:
+                if self._cancelled.is_set():
+                    return
+                batch.append(step)
+                if len(batch) >= self._batch_size:
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if self._put(batch):
+                self._put(_DONE)
+        except BaseException as error:
+            self._put(error)
+
+    def _put(self, item: object) -> bool:
+        """Queue item, waiting for room unless cancelled. False if cancelled."""
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self) -> "BackgroundSteps[T]":
+        return self
+
+    def __next__(self) -> T:
+        while self._position >= len(self._batch):
+            if self._finished:
+                raise StopIteration
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return PENDING # type: ignore
+            if item is _DONE:
+                self._finished = True
+                raise StopIteration
+            if isinstance(item, BaseException):
+                self._finished = True
+                raise item
+            self._batch, self._position = item, 0
+        step = self._batch[self._position]
+        self._position += 1
+        return step
+
+    def cancel(self) -> None:
+        """Stop the worker after its current step and drop everything queued."""
+        self._cancelled.set()
+        self._finished = True
+        self._batch = []
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+class FrameScheduler:
+    def __init__(self, widget: "Misc", fps: int = 60, budget: float = 0.75) -> None:
+        """Runs step iterators on widget's event loop.
+
+        Args:
+            widget (Misc): Any Tk widget, used for after()/after_cancel().
+            fps (int, optional): Target frame rate. Defaults to 60.
+            budget (float, optional): Fraction of each frame that may be spent
+                running steps; the rest is left to Tk for drawing. Defaults to 0.75.
+        """
+        self._widget = widget
+        self._frame_ms = max(1, round(1000 / fps))
+        self._budget = self._frame_ms / 1000 * budget
+        self._steps: Iterator[object] | None = None
+        self._on_step: Callable[[object], None] | None = None
+        self._job: str | None = None
+        self._credit = 0.0
+        self._on_frame: Callable[[], None] | None = None
+        self._on_done: Callable[[], None] | None = None
+        self.steps_per_frame = 1.0
+
+    @property
+    def running(self) -> bool:
+        return self._steps is not None
+
+    def start(self,
+              steps: Iterator[T],
+              steps_per_frame: float,
+              on_step: Callable[[T], None] = None, # type: ignore
+              on_frame: Callable[[], None] = None, # type: ignore
+              on_done: Callable[[], None] = None # type: ignore
+              ) -> None:
+        """Start animating steps, replacing anything already running.
+
+        Args:
+            steps (Iterator[T]): The steps to run. Each next() is one step.
+            steps_per_frame (float): How many steps to run per frame. Values
+                below 1 spread a single step over several frames.
+            on_step (Callable[[T], None], optional): Called with every step, e.g.
+                to draw it.
+            on_frame (Callable[[], None], optional): Called after every frame's
+                steps, e.g. to draw whatever they changed.
+            on_done (Callable[[], None], optional): Called once steps runs out,
+                or after steps, on_step or on_frame raised. In that case a
+                BackgroundSteps worker is cancelled first, and the error is
+                raised again afterwards.
+        """
+        self.cancel()
+        self._steps = steps
+        self.steps_per_frame = steps_per_frame
+        self._credit = 0.0
+        self._on_step = on_step # type: ignore
+        self._on_frame = on_frame
+        self._on_done = on_done
+        self._job = self._widget.after(0, self._tick)
+
+    def cancel(self) -> None:
+        """Stop the running animation, if any, without calling on_done."""
+        if self._job is not None:
+            self._widget.after_cancel(self._job)
+        self._job = None
+        self._steps = None
+
+    def _tick(self) -> None:
+        self._job = None
+        steps = self._steps
+        if steps is None:
+            return
+        failed = True
+        try:
+            finished = self._run_frame(steps)
+            failed = False
+        finally:
+            # Unless cancelled or restarted while running steps
+            if self._steps is steps:
+                if failed and isinstance(steps, BackgroundSteps):
+                    steps.cancel()
+                if failed or finished:
+                    self._steps = None
+                    if self._on_done is not None:
+                        self._on_done()
+                else:
+                    self._job = self._widget.after(self._frame_ms, self._tick)
+
+    def _run_frame(self, steps: Iterator[object]) -> bool:
+        """Runs one frame's steps, then on_frame. True once steps ran out."""
+        deadline = perf_counter() + self._budget
+        self._credit += self.steps_per_frame
+        finished = False
+        try:
+            on_step = self._on_step
+            while self._credit >= 1 and perf_counter() < deadline:
+                step = next(steps)
+                if step is PENDING:
+                    break # Nothing ready yet, try again next frame
+                if on_step is not None:
+                    on_step(step)
+                self._credit -= 1
+        except StopIteration:
+            finished = True
+        # Don't let unspent steps pile up when a frame runs out of time
+        self._credit = min(self._credit, max(1.0, self.steps_per_frame))
+
+        if self._on_frame is not None:
+            self._on_frame()
+        return finished
@@ -0,0 +1,54 @@
+"""Deterministic seeds and random number sources.
+
+Derived seeds depend only on the base seed and the keys, never on process,
+worker or call order, so work can be split up any way we like and still
+produce the same mazes.
+"""
+import hashlib
+import random
+from typing import Any
+
+def derive_seed(base_seed: int, *keys: int) -> int:
+    """Derives a 64-bit seed from base_seed and any number of integer keys,
+    e.g. a maze's index in a batch.
+
+    Args:
+        base_seed (int): The seed everything is derived from.
+        *keys (int): Whatever identifies the thing being seeded.
+
+    Returns:
+        int: A seed in the range [0, 2**64).
+    """
+    data = ":".join(str(part) for part in (base_seed, *keys)).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+class NumpyRandom(random.Random):
+    def __init__(self, generator: Any, batch_size: int = 4096) -> None:
+        """A random.Random that draws from a NumPy Generator, pulling floats in
+        batches so each draw costs a list lookup instead of a NumPy call.
+        Everything built on random() (choice, randrange, shuffle, ...) works.
+
+        Args:
+            generator (numpy.random.Generator): Where the numbers come from.
+            batch_size (int, optional): Floats drawn per NumPy call. Defaults to 4096.
+        """
+        self._generator = generator
+        self._batch_size = batch_size
+        self._batch: list[float] = []
+        super().__init__()
+
+    @property
+    def generator(self) -> Any:
+        """The wrapped NumPy Generator"""
+        return self._generator
+
+    def seed(self, *args: Any, **kwargs: Any) -> None:
+        """Seeding happens on the NumPy side, so this only drops any
+        numbers drawn so far."""
+        self._batch = []
+
+    def random(self) -> float:
+        if not self._batch:
+            # Reversed, so pop() hands them out in the order they were drawn
+            self._batch = self._generator.random(self._batch_size).tolist()[::-1]
+        return self._batch.pop()
@@ -0,0 +1,486 @@
+"""Iterative maze solvers working directly on a Grid.
+
+Every solver is a generator taking the grid plus start and goal coordinates.
+It yields step events (see events.py) as it goes and returns a SolveResult
+with the path as (row, col) tuples and the number of nodes it expanded, so
+different algorithms can be compared on the same maze.
+"""
+import heapq
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Generator, Iterable, Iterator
+from events import Backtrack, Event, Move, Path, Visit
+from grid import DIRECTION_ORDER, DOWN, LEFT, MASK_DIRECTIONS, RIGHT, UP, Grid
+from numpy_support import numpy
+
+# Frontiers at least this big are expanded with NumPy, when it's available
+NUMPY_FRONTIER = 256
+
+@dataclass
+class SolveResult:
+    algorithm: str
+    path: list[tuple[int, int]] = field(default_factory=list)
+    nodes_expanded: int = 0
+
+    @property
+    def found(self) -> bool:
+        return bool(self.path)
+
+    def __bool__(self) -> bool:
+        return self.found
+
+Solver = Generator[Event, None, SolveResult]
+
+def _to_path(grid: Grid, indices: list[int]) -> list[tuple[int, int]]:
+    return [divmod(index, grid.num_cols) for index in indices]
+
+def _walk_parents(parents: list[int], index: int) -> list[int]:
+    """Follow parent links from index back to the root (parent -1)."""
+    path = [index]
+    while parents[index] != -1:
+        index = parents[index]
+        path.append(index)
+    path.reverse()
+    return path
+
+def _direction(from_cell: tuple[int, int], to_cell: tuple[int, int]) -> int:
+    d_row, d_col = to_cell[0] - from_cell[0], to_cell[1] - from_cell[1]
+    if d_row:
+        return DOWN if d_row > 0 else UP
+    return RIGHT if d_col > 0 else LEFT
+
+def path_events(path: list[tuple[int, int]]) -> Iterator[Event]:
+    """A Move for every step along path, then the Path itself."""
+    for from_cell, to_cell in zip(path, path[1:]):
+        yield Move(*from_cell, _direction(from_cell, to_cell))
+    yield Path(path)
+
+def dfs(grid: Grid, start: tuple[int, int], goal: tuple[int, int]) -> Solver:
+    """Depth-first search with an explicit stack. Yields a Move for every step
+    and an undo Move for every step taken back, so the whole search can be
+    animated. The path found is not necessarily the shortest one.
+    """
+    result = SolveResult("dfs")
+    cols = grid.num_cols
+    walls, exits, offsets = grid.walls, grid.exits, grid.offsets
+    goal_index = grid.index(*goal)
+    visited = bytearray(len(grid))
+    # The cells on the current path, and for each one a mask of the open
+    # directions still left to try from it.
+    stack: list[int] = []
+    untried: list[int] = []
+
+    current = grid.index(*start)
+    while current != goal_index:
+        yield Visit(*divmod(current, cols))
+        result.nodes_expanded += 1
+        visited[current] = 1
+        stack.append(current)
+        untried.append(exits[current] & ~walls[current])
+
+        # Find the next unvisited open neighbor, backing up as needed
+        while stack:
+            index = stack[-1]
+            mask = untried[-1]
+            while mask:
+                direction = mask & -mask # Lowest bit, so up, down, left, right
+                mask ^= direction
+                neighbor = index + offsets[direction]
+                if not visited[neighbor]:
+                    break
+            else:
+                stack.pop()
+                untried.pop()
+                row, col = divmod(index, cols)
+                yield Backtrack(row, col)
+                if stack:
+                    parent = divmod(stack[-1], cols)
+                    yield Move(*parent, _direction(parent, (row, col)), undo=True)
+                continue
+            untried[-1] = mask
+            break
+        else:
+            return result # Ran out of cells to try
+
+        yield Move(*divmod(index, cols), direction)
+        current = neighbor
+
+    result.path = _to_path(grid, stack + [current])
+    yield Path(result.path)
+    return result
+
+def bfs(grid: Grid, start: tuple[int, int], goal: tuple[int, int]) -> Solver:
+    """Breadth-first search. Always finds a shortest path."""
+    result = SolveResult("bfs")
+    cols = grid.num_cols
+    start_index, goal_index = grid.index(*start), grid.index(*goal)
+    walls, exits, offsets = grid.walls, grid.exits, grid.offsets
+    parents = [-1] * len(grid)
+    seen = bytearray(len(grid))
+    seen[start_index] = 1
+    queue = deque([start_index])
+
+    while queue:
+        current = queue.popleft()
+        result.nodes_expanded += 1
+        yield Visit(*divmod(current, cols))
+        if current == goal_index:
+            result.path = _to_path(grid, _walk_parents(parents, current))
+            yield from path_events(result.path)
+            break
+        for direction in MASK_DIRECTIONS[exits[current] & ~walls[current]]:
+            neighbor = current + offsets[direction]
+            if not seen[neighbor]:
+                seen[neighbor] = 1
+                parents[neighbor] = current
+                queue.append(neighbor)
+
+    return result
+
+def astar(grid: Grid, start: tuple[int, int], goal: tuple[int, int]) -> Solver:
+    """A* search with a Manhattan distance heuristic. Finds a shortest path
+    while usually expanding fewer nodes than plain BFS.
+    """
+    result = SolveResult("astar")
+    cols = grid.num_cols
+    start_index, goal_index = grid.index(*start), grid.index(*goal)
+    goal_row, goal_col = goal
+    walls, exits, offsets = grid.walls, grid.exits, grid.offsets
+    parents = [-1] * len(grid)
+    costs = [-1] * len(grid)
+    costs[start_index] = 0
+    closed = bytearray(len(grid))
+    # (estimated total, tie breaker, index). The tie breaker keeps the heap
+    # ordering stable and prefers nodes that were pushed first.
+    heap = [(abs(goal_row - start[0]) + abs(goal_col - start[1]), 0, start_index)]
+    pushed = 1
+
+    while heap:
+        _, _, current = heapq.heappop(heap)
+        if closed[current]:
+            continue # Stale entry, already expanded with a lower cost
+        closed[current] = 1
+        result.nodes_expanded += 1
+        yield Visit(*divmod(current, cols))
+        if current == goal_index:
+            result.path = _to_path(grid, _walk_parents(parents, current))
+            yield from path_events(result.path)
+            break
+        cost = costs[current] + 1
+        for direction in MASK_DIRECTIONS[exits[current] & ~walls[current]]:
+            neighbor = current + offsets[direction]
+            if closed[neighbor] or (costs[neighbor] != -1 and costs[neighbor] <= cost):
+                continue
+            costs[neighbor] = cost
+            parents[neighbor] = current
+            row, col = divmod(neighbor, cols)
+            estimate = cost + abs(goal_row - row) + abs(goal_col - col)
+            heapq.heappush(heap, (estimate, pushed, neighbor))
+            pushed += 1
+
+    return result
+
+def bidirectional(grid: Grid, start: tuple[int, int], goal: tuple[int, int]) -> Solver:
+    """Breadth-first search from both ends at once, always growing the smaller
+    frontier by one level. Stops as soon as the two searches meet.
+    """
+    result = SolveResult("bidirectional")
+    cols = grid.num_cols
+    start_index, goal_index = grid.index(*start), grid.index(*goal)
+    if start_index == goal_index:
+        result.path = [start]
+        result.nodes_expanded = 1
+        yield Visit(*start)
+        yield from path_events(result.path)
+        return result
+
+    walls, exits, offsets = grid.walls, grid.exits, grid.offsets
+    forward_parents = {start_index: -1}
+    backward_parents = {goal_index: -1}
+    forward, backward = [start_index], [goal_index]
+    meeting = -1
+
+    while forward and backward and meeting == -1:
+        # Expand whichever side has less work queued up
+        if len(forward) <= len(backward):
+            frontier, parents, others = forward, forward_parents, backward_parents
+        else:
+            frontier, parents, others = backward, backward_parents, forward_parents
+        next_frontier: list[int] = []
+        for current in frontier:
+            result.nodes_expanded += 1
+            yield Visit(*divmod(current, cols))
+            for direction in MASK_DIRECTIONS[exits[current] & ~walls[current]]:
+                neighbor = current + offsets[direction]
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = current
+                if neighbor in others:
+                    meeting = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting != -1:
+                break
+        if frontier is forward:
+            forward = next_frontier
+        else:
+            backward = next_frontier
+
+    if meeting == -1:
+        return result
+
+    path = [meeting]
+    index = forward_parents[meeting]
+    while index != -1:
+        path.append(index)
+        index = forward_parents[index]
+    path.reverse()
+    index = backward_parents[meeting]
+    while index != -1:
+        path.append(index)
+        index = backward_parents[index]
+    result.path = _to_path(grid, path)
+    yield from path_events(result.path)
+    return result
+
+def dead_end_filling(grid: Grid, start: tuple[int, int], goal: tuple[int, int]) -> Solver:
+    """Fills in every dead end until only the corridors between start and goal
+    are left, then walks what remains. On a perfect maze that is exactly the
+    solution path. Every filled cell is reported as a Backtrack.
+    """
+    result = SolveResult("dead_end_filling")
+    cols = grid.num_cols
+    start_index, goal_index = grid.index(*start), grid.index(*goal)
+    neighbors = [grid.open_neighbors(index) for index in range(len(grid))]
+    degrees = [len(open_cells) for open_cells in neighbors]
+    filled = bytearray(len(grid))
+
+    dead_ends = [
+        index for index, degree in enumerate(degrees)
+        if degree <= 1 and index != start_index and index != goal_index
+    ]
+    while dead_ends:
+        current = dead_ends.pop()
+        filled[current] = 1
+        result.nodes_expanded += 1
+        yield Backtrack(*divmod(current, cols))
+        for neighbor in neighbors[current]:
+            if filled[neighbor]:
+                continue
+            degrees[neighbor] -= 1
+            if degrees[neighbor] == 1 and neighbor != start_index and neighbor != goal_index:
+                dead_ends.append(neighbor)
+
+    # Whatever is left is the solution, plus any loops on imperfect mazes, so
+    # finish with a breadth-first walk that only uses unfilled cells.
+    parents = [-1] * len(grid)
+    filled[start_index] = 1
+    queue = deque([start_index])
+    while queue:
+        current = queue.popleft()
+        result.nodes_expanded += 1
+        yield Visit(*divmod(current, cols))
+        if current == goal_index:
+            result.path = _to_path(grid, _walk_parents(parents, current))
+            yield from path_events(result.path)
+            break
+        for neighbor in neighbors[current]:
+            if not filled[neighbor]:
+                filled[neighbor] = 1
+                parents[neighbor] = current
+                queue.append(neighbor)
+
+    return result
+
+def distance_map(grid: Grid, start: tuple[int, int]) -> array:
+    """Breadth-first distance from start to every cell, a whole frontier at a
+    time. Small frontiers are expanded in plain Python, big ones (e.g. on
+    Binary Tree or Sidewinder mazes) with NumPy array operations if it's
+    installed. No step events, no Cells.
+
+    Args:
+        grid (Grid): The maze.
+        start (tuple[int, int]): (row, col) to measure from.
+
+    Returns:
+        array: One signed int per cell, row-major, -1 where start can't be
+            reached. With NumPy, np.frombuffer(distances, dtype=np.intc)
+            .reshape(grid.num_rows, grid.num_cols) views it as a 2D array.
+    """
+    np = numpy()
+    count = len(grid)
+    distances = array("i", [-1]) * count
+    walls, exits, offsets = grid.walls, grid.exits, grid.offsets
+    frontier: list[int] = [grid.index(*start)]
+    distances[frontier[0]] = 0
+    arrays = None
+    level = 0
+
+    while len(frontier):
+        level += 1
+        if np is not None and len(frontier) >= NUMPY_FRONTIER:
+            if arrays is None:
+                # Views sharing memory with the grid and distances
+                wall_bytes = walls if isinstance(walls, bytearray) else bytes(walls)
+                arrays = (np.frombuffer(wall_bytes, dtype=np.uint8),
+                          np.frombuffer(exits, dtype=np.uint8),
+                          np.frombuffer(distances, dtype=np.intc))
+            wall_array, exit_array, distance_array = arrays
+            sources = np.asarray(frontier)
+            open_directions = exit_array[sources] & ~wall_array[sources]
+            reached = []
+            for direction in DIRECTION_ORDER:
+                neighbors = sources[(open_directions & direction) != 0] + offsets[direction]
+                # Checked per direction, so a cell reached twice is only kept once
+                neighbors = neighbors[distance_array[neighbors] == -1]
+                distance_array[neighbors] = level
+                reached.append(neighbors)
+            frontier = np.concatenate(reached)
+            continue
+
+        if not isinstance(frontier, list):
+            frontier = frontier.tolist()
+        next_frontier: list[int] = []
+        for current in frontier:
+            for direction in MASK_DIRECTIONS[exits[current] & ~walls[current]]:
+                neighbor = current + offsets[direction]
+                if distances[neighbor] == -1:
+                    distances[neighbor] = level
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+
+    return distances
+
+@dataclass
+class BatchSolveResult:
+    """What solve_batch() found, one entry per maze."""
+    # Cells on each shortest path, start and goal included, so the same as
+    # len(SolveResult.path). 0 where the goal can't be reached.
+    lengths: Any
+    # The paths, if they were asked for, each as a (length, 2) int array of
+    # (row, col) pairs. Arrays rather than lists of tuples, which would take
+    # longer to build than the search itself.
+    paths: list[Any] | None = None
+
+def stack_walls(grids: Iterable[Grid]) -> Any:
+    """The walls of same-size grids as one (N, rows, cols) uint8 array, the
+    input for solve_batch()."""
+    np = numpy()
+    grids = list(grids)
+    if not grids:
+        return np.zeros((0, 0, 0), dtype=np.uint8)
+    rows, cols = grids[0].num_rows, grids[0].num_cols
+    if any((grid.num_rows, grid.num_cols) != (rows, cols) for grid in grids):
+        raise ValueError("All grids need to be the same size")
+    return np.frombuffer(b"".join(bytes(grid.walls) for grid in grids),
+                         dtype=np.uint8).reshape(len(grids), rows, cols)
+
+def solve_batch(walls: Any,
+                start: tuple[int, int] = (0, 0),
+                goal: tuple[int, int] = None, # type: ignore
+                paths: bool = False) -> BatchSolveResult:
+    """Shortest paths through many same-size mazes at once. One breadth-first
+    search runs over all of them in lock step: each round expands every
+    maze's frontier with a handful of NumPy operations, so the per-maze
+    Python overhead of solving them one by one disappears. A maze drops out
+    as soon as its goal is reached. Needs NumPy.
+
+    Args:
+        walls (ndarray): (N, rows, cols) wall bitmasks as in grid.py, e.g.
+            from stack_walls().
+        start (tuple[int, int], optional): (row, col) to start from in every
+            maze. Defaults to the entrance, (0, 0).
+        goal (tuple[int, int], optional): (row, col) to reach in every maze.
+            Defaults to the exit, the bottom-right cell.
+        paths (bool, optional): Also return the paths. Defaults to False.
+
+    Returns:
+        BatchSolveResult: Path lengths as an int array, plus the paths if
+            asked for.
+    """
+    np = numpy()
+    if np is None:
+        raise ImportError("Batched solving needs NumPy")
+    walls = np.ascontiguousarray(walls, dtype=np.uint8)
+    if walls.ndim != 3:
+        raise ValueError(f"Expected walls of shape (N, rows, cols), got {walls.shape}")
+    count, rows, cols = walls.shape
+    if goal is None:
+        goal = (rows - 1, cols - 1)
+    cells = rows * cols
+    grid = Grid(rows, cols)
+    if count == 0 or not grid.in_bounds(*start) or not grid.in_bounds(*goal):
+        if count and cells:
+            raise ValueError(f"Start {start} or goal {goal} is outside the {rows}x{cols} mazes")
+        return BatchSolveResult(np.zeros(count, dtype=np.int64),
+                                [np.zeros((0, 2), dtype=np.int64)] * count if paths else None)
+
+    flat_walls = walls.reshape(-1)
+    exits = np.frombuffer(grid.exits, dtype=np.uint8)
+    offsets = grid.offsets
+    bases = np.arange(count, dtype=np.int64) * cells
+    goals = bases + grid.index(*goal)
+    distances = np.full(count * cells, -1, dtype=np.int32)
+    # The direction each cell was entered from its parent, for the paths
+    came_from = np.zeros(count * cells, dtype=np.uint8) if paths else None
+
+    # The frontier as flat indices into all mazes, plus the same cells'
+    # indices within their own maze, to look up which exits they have
+    frontier = bases + grid.index(*start)
+    local = np.full(count, grid.index(*start), dtype=np.int64)
+    distances[frontier] = 0
+    solved = distances[goals] != -1 # Start and goal the same
+    frontier, local = frontier[~solved], local[~solved]
+    level = 0
+    while len(frontier):
+        level += 1
+        open_directions = exits[local] & ~flat_walls[frontier]
+        reached, reached_local = [], []
+        for direction in DIRECTION_ORDER:
+            moving = (open_directions & direction) != 0
+            neighbors = frontier[moving] + offsets[direction]
+            new = distances[neighbors] == -1
+            neighbors = neighbors[new]
+            distances[neighbors] = level
+            if came_from is not None:
+                came_from[neighbors] = direction
+            reached.append(neighbors)
+            reached_local.append(local[moving][new] + offsets[direction])
+        frontier = np.concatenate(reached)
+        local = np.concatenate(reached_local)
+        newly_solved = (distances[goals] != -1) & ~solved
+        if newly_solved.any():
+            solved |= newly_solved
+            keep = ~solved[frontier // cells]
+            frontier, local = frontier[keep], local[keep]
+
+    goal_distances = distances[goals].astype(np.int64)
+    result = BatchSolveResult(goal_distances + 1)
+    if came_from is None:
+        return result
+
+    # Walk every maze's path back from its goal, all mazes in step. Once a
+    # maze is past its start, its cells go to a spare last column.
+    longest = int(goal_distances.max())
+    trail = np.zeros((count, longest + 2), dtype=np.int64)
+    current = goals.copy()
+    mazes = np.arange(count)
+    direction_offsets = np.array(offsets, dtype=np.int64)
+    for back in range(longest + 1):
+        position = goal_distances - back
+        position[position < 0] = longest + 1
+        trail[mazes, position] = current
+        current -= direction_offsets[came_from[current]]
+    trail -= bases[:, None]
+    cells_on_path = np.stack(np.divmod(trail, cols), axis=-1)
+    result.paths = [cells_on_path[maze, :length] for maze, length in enumerate(result.lengths.tolist())]
+    return result
+
+SOLVERS: dict[str, Callable[[Grid, tuple[int, int], tuple[int, int]], Solver]] = {
+    "dfs": dfs,
+    "bfs": bfs,
+    "astar": astar,
+    "bidirectional": bidirectional,
+    "dead_end_filling": dead_end_filling,
+}
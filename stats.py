@@ -0,0 +1,116 @@
+"""Opt-in instrumentation for Maze: step counters and where the time goes.
+
+A maze built with instrument=True keeps a MazeStats. Its generate and solve
+steps are counted and timed as they are pulled, and its window is wrapped in
+an InstrumentedWindow, which counts and times every call into Tk. Mazes
+without it take none of these paths, so instrumentation costs nothing
+unless asked for.
+"""
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from typing import Any, Generator, TypeVar
+from events import Backtrack, Carve, Event, Move, Visit
+from grid import Grid
+
+T = TypeVar("T")
+
+# In-bounds neighbor count per exits mask
+_NEIGHBOR_COUNTS = bytes(bin(mask).count("1") for mask in range(16))
+
+@dataclass
+class MazeStats:
+    """Counters and timings, accumulated over every run of one maze.
+
+    Step counters come from the step events, so bulk generation (see
+    generators.BULK_GENERATORS), which yields none, only adds to cells_carved
+    and generate_time. neighbors_examined counts the in-bounds neighbors of
+    every cell a Carve, Backtrack or Visit happened at, which is what the
+    backtracker and the solvers look at for each of those steps.
+    """
+    cells_carved: int = 0
+    backtracks: int = 0
+    nodes_expanded: int = 0
+    moves: int = 0
+    neighbors_examined: int = 0
+    draw_calls: int = 0
+    line_edits: int = 0
+    redraws: int = 0
+    generate_time: float = 0.0
+    solve_time: float = 0.0
+    draw_time: float = 0.0
+    sleep_time: float = 0.0
+
+    @property
+    def compute_time(self) -> float:
+        """Seconds spent generating and solving, drawing and sleeping excluded"""
+        return self.generate_time + self.solve_time
+
+    def as_dict(self) -> dict[str, float]:
+        return asdict(self) | {"compute_time": self.compute_time}
+
+    def reset(self) -> None:
+        for name, value in asdict(MazeStats()).items():
+            setattr(self, name, value)
+
+    def count(self, event: Event, grid: Grid) -> None:
+        """Adds one step event to the counters."""
+        match event:
+            case Carve(row, col, _):
+                self.cells_carved += 1
+            case Backtrack(row, col):
+                self.backtracks += 1
+            case Visit(row, col):
+                self.nodes_expanded += 1
+            case Move():
+                self.moves += 1
+                return
+            case _:
+                return
+        self.neighbors_examined += _NEIGHBOR_COUNTS[grid.exits[row * grid.num_cols + col]]
+
+    def timed_steps(self, steps: Generator[Event, None, T], grid: Grid,
+                    phase: str) -> Generator[Event, None, T]:
+        """Passes steps through, counting every event and adding the time
+        spent inside steps to the phase's timer ("generate" or "solve").
+        Returns what steps returns."""
+        attribute = f"{phase}_time"
+        clock = perf_counter
+        while True:
+            start = clock()
+            try:
+                event = next(steps)
+            except StopIteration as done:
+                setattr(self, attribute, getattr(self, attribute) + clock() - start)
+                return done.value
+            setattr(self, attribute, getattr(self, attribute) + clock() - start)
+            self.count(event, grid)
+            yield event
+
+class InstrumentedWindow:
+    """Wraps a Window, counting and timing the calls that draw. Everything
+    else is passed straight through."""
+    def __init__(self, win: Any, stats: MazeStats) -> None:
+        self._win = win
+        self._stats = stats
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._win, name)
+
+    def draw_line(self, line: Any, fill_color: str) -> None:
+        start = perf_counter()
+        self._win.draw_line(line, fill_color)
+        self._stats.draw_calls += 1
+        self._stats.draw_time += perf_counter() - start
+
+    def apply_line_edits(self, edits: list[tuple]) -> None:
+        start = perf_counter()
+        self._win.apply_line_edits(edits)
+        self._stats.draw_calls += 1
+        self._stats.line_edits += len(edits)
+        self._stats.draw_time += perf_counter() - start
+
+    def redraw(self) -> None:
+        start = perf_counter()
+        self._win.redraw()
+        self._stats.redraws += 1
+        self._stats.draw_time += perf_counter() - start
@@ -1,6 +1,102 @@
+import itertools
+import json
+import os
+import random
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import time
 import unittest
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+import batch
+from batch import generate_batch
+from cache import MazeCache
+from benchmarks import compare, run_suite
 from cell import Cell
+from chunked import ChunkedMaze
+from events import Backtrack, Carve, Move, Path, Visit
+from generators import BULK_GENERATORS, GENERATORS, DisjointSet, backtracker, eller, eller_rows
+import images
+from grid import (ALL_WALLS, BOTTOM, D_COL, D_ROW, DIRECTION_ORDER, DOWN, LEFT,
+                  MASK_DIRECTIONS, OPPOSITE, RIGHT, TOP, UP, Grid)
 from maze import Maze
+from mazefile import MappedWalls, pack_walls, save_rows, unpack_walls
+import pathindex
+from pathindex import PathIndex
+from seeds import NumpyRandom, derive_seed
+import renderer
+from renderer import MazeRenderer, wall_runs
+from scheduler import PENDING, BackgroundSteps, FrameScheduler
+import solvers
+from solvers import SOLVERS
+import viewport
+from viewport import Viewport, sub_grid
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class FakeWindow:
+    """Records drawing calls instead of talking to Tk."""
+    def __init__(self) -> None:
+        self.bg_color = "white"
+        self.lines: list[tuple[object, str]] = []
+        self.items: dict[str, list] = {}
+        self.batches = 0
+        self.redraws = 0
+        self.image: tuple[bytes, int, int] | None = None
+
+    def draw_line(self, line, fill_color: str) -> None:
+        self.lines.append((line, fill_color))
+
+    def apply_line_edits(self, edits) -> None:
+        """Keeps the tagged items a canvas would end up with."""
+        self.batches += 1
+        for kind, tag, *rest in edits:
+            if kind == "create":
+                self.items[tag[0]] = [tag, *rest]
+                continue
+            for item in [item for item in self.items.values() if tag in item[0]]:
+                if kind == "coords":
+                    item[1] = rest[0]
+                elif kind == "color":
+                    item[2] = rest[0]
+                else:
+                    del self.items[item[0][0]]
+
+    def show_image(self, data: bytes, x: int, y: int) -> None:
+        self.image = (data, x, y)
+
+    def clear_image(self) -> None:
+        self.image = None
+
+    def redraw(self) -> None:
+        self.redraws += 1
+
+class FakeTk:
+    """Stands in for a Tk widget's after()/after_cancel() timers."""
+    def __init__(self) -> None:
+        self.jobs: dict[str, object] = {}
+        self._next_id = 0
+
+    def after(self, ms: int, fn) -> str:
+        self._next_id += 1
+        job = f"after#{self._next_id}"
+        self.jobs[job] = fn
+        return job
+
+    def after_cancel(self, job: str) -> None:
+        self.jobs.pop(job, None)
+
+    def run_frame(self) -> None:
+        jobs, self.jobs = self.jobs, {}
+        for fn in jobs.values():
+            fn() # type: ignore
 
 class Tests(unittest.TestCase):
     #region Maze tests
@@ -134,7 +230,1232 @@ class Tests(unittest.TestCase):
                 self.assertFalse(cell.visited)
 
     #endregion
-            
+
+    #region Generation tests
+    def _wall_signature(self, m: Maze) -> str:
+        """One hex digit per cell (row-major) encoding T=1, B=2, L=4, R=8."""
+        signature = ""
+        for row in range(m._num_rows):
+            for col in range(m._num_cols):
+                cell = m._get_cell(row, col)
+                signature += "%x" % (cell.has_top_wall * 1 + cell.has_bottom_wall * 2
+                                     + cell.has_left_wall * 4 + cell.has_right_wall * 8)
+        return signature
+
+    def test_generate_matches_recursive_carve_order(self):
+        # Recorded from the original recursive _break_walls_r with the same seed
+        m = Maze(0, 0, 6, 7, 10, 10, seed=42)
+        m.generate()
+        self.assertEqual(
+            self._wall_signature(m),
+            "c59595bccccc696a6ac5853196accdce53a6a63239",
+        )
+
+    def test_generate_long_corridor(self):
+        # A single row is one long corridor, which used to blow the recursion limit
+        m = Maze(0, 0, 1, 5000, 10, 10, seed=1)
+        m.generate()
+        for col in range(4999):
+            self.assertFalse(m._get_cell(0, col).has_right_wall)
+
+    def test_generate_visits_every_cell(self):
+        m = Maze(0, 0, 20, 30, 10, 10, seed=3)
+        for _ in backtracker(m._grid, random.Random(3)):
+            pass
+        for col in m._cells:
+            for cell in col:
+                self.assertTrue(cell.visited)
+
+    def _assert_perfect(self, g: Grid):
+        """Every cell reachable from (0, 0), with exactly one path between any two."""
+        seen = {0}
+        stack = [0]
+        edges = 0
+        while stack:
+            for neighbor in g.open_neighbors(stack.pop()):
+                edges += 1
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    stack.append(neighbor)
+        self.assertEqual(len(seen), len(g))
+        self.assertEqual(edges // 2, len(g) - 1)
+
+    def test_all_generators_make_perfect_mazes(self):
+        for algorithm in GENERATORS:
+            if np is None and algorithm in BULK_GENERATORS:
+                continue # These need NumPy
+            for rows, cols in ((1, 1), (1, 9), (9, 1), (17, 23)):
+                m = Maze(0, 0, rows, cols, 10, 10, seed=4)
+                m.generate(algorithm)
+                self.assertEqual(m.algorithm, algorithm)
+                self._assert_perfect(m.grid)
+                self.assertTrue(m.solve("bfs"))
+
+    def test_generators_are_seeded(self):
+        for algorithm in ("kruskal", "eller"):
+            walls = []
+            for _ in range(2):
+                m = Maze(0, 0, 12, 12, 10, 10, seed=21)
+                m.generate(algorithm)
+                walls.append(m.grid.walls)
+            self.assertEqual(walls[0], walls[1])
+
+    def test_generate_unknown_algorithm(self):
+        m = Maze(0, 0, 3, 3, 10, 10)
+        with self.assertRaises(ValueError):
+            m.generate("prim")
+
+    def test_eller_rows_match_grid(self):
+        g = Grid(15, 11)
+        for _ in eller(g, random.Random(3)):
+            pass
+        rows = b"".join(eller_rows(15, 11, random.Random(3)))
+        self.assertEqual(rows, bytes(g.walls))
+
+    def test_eller_rows_stream_to_file(self):
+        path = self._temp_path("tall.bin")
+        save_rows(path, 201, 7, eller_rows(201, 7, random.Random(1), open_ends=True),
+                  seed=1, algorithm="eller")
+        m = Maze.load(path)
+        self.assertEqual(m.algorithm, "eller")
+        self._assert_perfect(m.grid)
+        self.assertFalse(m.grid.has_wall(0, 0, UP))
+        self.assertFalse(m.grid.has_wall(200, 6, DOWN))
+        self.assertTrue(m.solve("bfs"))
+
+    def test_disjoint_set(self):
+        sets = DisjointSet(6)
+        self.assertTrue(sets.union(0, 1))
+        self.assertTrue(sets.union(2, 3))
+        self.assertTrue(sets.union(1, 3))
+        self.assertFalse(sets.union(0, 2))
+        self.assertEqual(sets.find(0), sets.find(3))
+        self.assertNotEqual(sets.find(0), sets.find(4))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_bulk_generators_match_their_events(self):
+        for algorithm in BULK_GENERATORS:
+            for rows, cols in ((1, 1), (1, 9), (9, 1), (40, 33)):
+                bulk = Maze(0, 0, rows, cols, 10, 10, seed=8)
+                bulk.generate(algorithm)
+                stepped = Maze(0, 0, rows, cols, 10, 10, seed=8)
+                carves = [event for event in stepped.generate_steps(algorithm)]
+                self.assertEqual(bulk.grid.walls, stepped.grid.walls)
+                self.assertEqual(len(carves), rows * cols - 1 + 2) # A tree, plus entrance and exit
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_bulk_generator_corridors(self):
+        m = Maze(0, 0, 6, 8, 10, 10, seed=2)
+        m.generate("binary_tree")
+        # Binary Tree leaves the top row and left column fully open
+        for col in range(7):
+            self.assertFalse(m.grid.has_wall(0, col, RIGHT))
+        for row in range(5):
+            self.assertFalse(m.grid.has_wall(row, 0, DOWN))
+        m = Maze(0, 0, 6, 8, 10, 10, seed=2)
+        m.generate("sidewinder")
+        for col in range(7):
+            self.assertFalse(m.grid.has_wall(0, col, RIGHT))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_bulk_generator_with_window_and_numpy_rng(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 5, 5, 10, 10, win, draw_delay=0, rng=np.random.default_rng(1)) # type: ignore
+        m.generate("sidewinder")
+        self._assert_perfect(m.grid)
+        self.assertTrue(m.solve("astar"))
+        self.assertGreater(win.batches, 1)
+
+    #endregion
+
+    #region Batch and RNG tests
+    def test_derive_seed(self):
+        self.assertEqual(derive_seed(1, 2), derive_seed(1, 2))
+        self.assertNotEqual(derive_seed(1, 2), derive_seed(1, 3))
+        self.assertNotEqual(derive_seed(1, 2), derive_seed(2, 1))
+        self.assertLess(derive_seed(7), 2**64)
+
+    def test_headless_import_without_tkinter(self):
+        # A None entry makes any import of tkinter fail, as without Tcl/Tk
+        script = (
+            "import sys\n"
+            "sys.modules['tkinter'] = None\n"
+            "import batch, benchmarks, cache, cell, images, maze, renderer, scheduler, stats, viewport, window\n"
+            "m = maze.Maze(0, 0, 8, 8, 10, 10, seed=1)\n"
+            "m.generate()\n"
+            "assert m.solve('bfs')\n"
+            "assert not [name for name in sys.modules if name.startswith('tkinter.') or name == '_tkinter']\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_import_does_not_load_numpy(self):
+        script = (
+            "import sys\n"
+            "import batch, cache, chunked, images, maze, pathindex, renderer, solvers, viewport\n"
+            "assert 'numpy' not in sys.modules\n"
+            "m = maze.Maze(0, 0, 8, 8, 10, 10, seed=1)\n"
+            "m.generate()\n"
+            "assert m.solve('bfs')\n"
+            "assert 'numpy' not in sys.modules\n"
+        )
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+    def test_batch_independent_of_workers(self):
+        single = list(generate_batch(10, 6, 5, base_seed=3, workers=1, chunk_size=3))
+        pooled = list(generate_batch(10, 6, 5, base_seed=3, workers=2, chunk_size=3))
+        self.assertEqual(single, pooled)
+        self.assertEqual(len(single), 10)
+
+    def test_batch_bounds_chunks_in_flight(self):
+        submitted: list[int] = []
+        class CountingExecutor(ThreadPoolExecutor):
+            def submit(self, fn, *args, **kwargs):
+                submitted.append(args[0][0])
+                return super().submit(fn, *args, **kwargs)
+        old, batch.ProcessPoolExecutor = batch.ProcessPoolExecutor, CountingExecutor
+        try:
+            lines = generate_batch(100, 3, 3, base_seed=1, workers=2, chunk_size=1)
+            first = [next(lines) for _ in range(3)]
+            self.assertLessEqual(len(submitted), 3 + 2 * batch.CHUNKS_PER_WORKER)
+            rest = list(lines)
+        finally:
+            batch.ProcessPoolExecutor = old
+        self.assertEqual(first + rest, list(generate_batch(100, 3, 3, base_seed=1, workers=1)))
+
+    def test_batch_maze_matches_seed(self):
+        record = json.loads(next(generate_batch(1, 4, 4, base_seed=9, workers=1)))
+        m = Maze(0, 0, 4, 4, 10, 10, seed=record["seed"])
+        m.generate()
+        self.assertEqual(record["walls"], m.grid.walls.hex())
+
+    def test_maze_ignores_global_random(self):
+        m1 = Maze(0, 0, 8, 8, 10, 10, seed=5)
+        m1.generate()
+        m2 = Maze(0, 0, 8, 8, 10, 10, seed=5)
+        random.seed(123)
+        steps = m2.generate_steps()
+        next(steps)
+        random.random()
+        for _ in steps:
+            pass
+        self.assertEqual(m1.grid.walls, m2.grid.walls)
+
+    def test_thread_pool_generation_is_deterministic(self):
+        def build(seed: int) -> bytes:
+            m = Maze(0, 0, 30, 30, 10, 10, seed=seed)
+            m.generate()
+            return bytes(m.grid.walls)
+
+        seeds = [1, 2, 3, 1, 2, 3, 1, 2]
+        expected = [build(seed) for seed in seeds]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            self.assertEqual(list(pool.map(build, seeds)), expected)
+
+    def test_interleaved_generators(self):
+        a = Maze(0, 0, 10, 10, 10, 10, seed=8)
+        b = Maze(0, 0, 10, 10, 10, 10, seed=8)
+        for _ in zip(a.generate_steps(), b.generate_steps()):
+            pass
+        self.assertEqual(a.grid.walls, b.grid.walls)
+        self.assertEqual(a.seed, 8)
+
+    def test_maze_accepts_random_instance(self):
+        a = Maze(0, 0, 10, 10, 10, 10, rng=random.Random(4))
+        a.generate()
+        b = Maze(0, 0, 10, 10, 10, 10, seed=4)
+        b.generate()
+        self.assertEqual(a.grid.walls, b.grid.walls)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_maze_accepts_numpy_generator(self):
+        walls = []
+        for _ in range(2):
+            m = Maze(0, 0, 12, 12, 10, 10, rng=np.random.default_rng(6)) # type: ignore
+            self.assertIsInstance(m._rng, NumpyRandom)
+            m.generate()
+            self.assertTrue(m.solve("bfs"))
+            walls.append(m.grid.walls)
+        self.assertEqual(walls[0], walls[1])
+
+    #endregion
+
+    #region Benchmark tests
+    def test_run_suite_metrics(self):
+        metrics = run_suite([6], [0, 1], ["backtracker", "kruskal"], ["bfs"])
+        self.assertIn("construct/6/cells_per_s", metrics)
+        self.assertIn("generate/kruskal/6/cells_per_s", metrics)
+        self.assertIn("solve/backtracker+bfs/6/nodes_expanded", metrics)
+        self.assertGreater(metrics["memory/backtracker+bfs/6/peak_bytes"], 0)
+        self.assertGreater(metrics["draw/backtracker+bfs/6/lines"], 0)
+        self.assertGreater(metrics["draw/backtracker+bfs/6/peak_items"], 0)
+
+    def test_compare_flags_regressions(self):
+        baseline = {"generate/x/1/cells_per_s": 100.0, "memory/x/1/peak_bytes": 100.0, "gone": 1.0}
+        self.assertEqual(compare({"generate/x/1/cells_per_s": 95.0, "memory/x/1/peak_bytes": 105.0},
+                                 baseline, 0.1), [])
+        regressions = compare({"generate/x/1/cells_per_s": 80.0, "memory/x/1/peak_bytes": 150.0,
+                               "new": 5.0}, baseline, 0.1)
+        self.assertEqual(len(regressions), 2)
+
+    #endregion
+
+    #region Maze file tests
+    def _temp_path(self, name: str) -> str:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return os.path.join(directory.name, name)
+
+    def test_pack_unpack_walls(self):
+        for walls in (bytearray(), bytearray([5]), bytearray(range(16)), bytearray([15, 0, 9])):
+            packed = pack_walls(walls)
+            self.assertEqual(len(packed), (len(walls) + 1) // 2)
+            self.assertEqual(unpack_walls(packed, len(walls)), walls)
+        self.assertEqual(pack_walls(bytearray([0x1, 0x2, 0xF])), bytes([0x21, 0x0F]))
+
+    def test_save_load_roundtrip(self):
+        m = Maze(0, 0, 9, 13, 10, 10, seed=derive_seed(1, 2))
+        m.generate()
+        path = self._temp_path("maze.bin")
+        m.save(path)
+        self.assertEqual(os.path.getsize(path), 24 + len("backtracker") + (9 * 13 + 1) // 2)
+        loaded = Maze.load(path)
+        self.assertEqual(loaded.grid.walls, m.grid.walls)
+        self.assertEqual(loaded.seed, m.seed)
+        self.assertEqual(loaded.algorithm, "backtracker")
+        self.assertEqual(loaded.solve("bfs").path, m.solve("bfs").path)
+
+    def test_load_memory_mapped(self):
+        m = Maze(0, 0, 7, 7, 10, 10)
+        m.generate()
+        path = self._temp_path("maze.bin")
+        m.save(path)
+        loaded = Maze.load(path, memory_map=True)
+        self.assertIsInstance(loaded.grid.walls, MappedWalls)
+        # No per-cell tables until something needs them
+        self.assertIsNone(loaded.grid._exits)
+        self.assertIsNone(loaded.grid._visited)
+        self.assertIsNone(loaded.seed)
+        self.assertEqual(bytes(loaded.grid.walls), bytes(m.grid.walls))
+        self.assertEqual(loaded.solve("astar").path, m.solve("astar").path)
+        # Changes stay in memory
+        loaded.grid.break_wall(3, 3, UP)
+        self.assertFalse(loaded.grid.has_wall(3, 3, UP))
+        self.assertEqual(bytes(Maze.load(path).grid.walls), bytes(m.grid.walls))
+
+    def test_load_rejects_bad_files(self):
+        path = self._temp_path("bad.bin")
+        with open(path, "wb") as out:
+            out.write(b"NOPE" + bytes(40))
+        with self.assertRaises(ValueError):
+            Maze.load(path)
+        m = Maze(0, 0, 10, 10, 10, 10)
+        m.save(path)
+        with open(path, "r+b") as out:
+            out.truncate(30)
+        with self.assertRaises(ValueError):
+            Maze.load(path)
+        # Too short for the header
+        for data in (b"", b"MAZE"):
+            with open(path, "wb") as out:
+                out.write(data)
+            for memory_map in (False, True):
+                with self.subTest(data=data, memory_map=memory_map):
+                    with self.assertRaises(ValueError):
+                        Maze.load(path, memory_map=memory_map)
+
+    def test_ascii_export(self):
+        m = Maze(0, 0, 2, 2, 10, 10)
+        m._break_entrance_and_exit()
+        m.grid.break_wall(0, 0, RIGHT)
+        m.grid.break_wall(0, 1, DOWN)
+        self.assertEqual(m.to_ascii(), "\n".join([
+            "+  +--+",
+            "|     |",
+            "+--+  +",
+            "|  |  |",
+            "+--+  +",
+        ]))
+        path = self._temp_path("maze.txt")
+        m.save_ascii(path)
+        with open(path) as text:
+            self.assertEqual(text.read(), m.to_ascii() + "\n")
+
+    #endregion
+
+    #region Instrumentation tests
+    def test_stats_disabled_by_default(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 4, 4, 10, 10, win, draw_delay=0)
+        self.assertIsNone(m.stats)
+        self.assertIs(m._win, win)
+
+    def test_stats_headless(self):
+        m = Maze(0, 0, 12, 9, 10, 10, seed=4, instrument=True)
+        m.generate()
+        stats = m.stats
+        assert stats is not None
+        # Every cell but the first is carved into, plus entrance and exit
+        self.assertEqual(stats.cells_carved, 12 * 9 + 1)
+        self.assertEqual(stats.backtracks, 12 * 9)
+        self.assertGreater(stats.neighbors_examined, stats.cells_carved)
+        self.assertGreater(stats.generate_time, 0)
+        result = m.solve("bfs")
+        self.assertEqual(stats.nodes_expanded, result.nodes_expanded)
+        self.assertEqual(stats.moves, len(result.path) - 1)
+        self.assertEqual(stats.compute_time, stats.generate_time + stats.solve_time)
+        self.assertEqual((stats.draw_calls, stats.sleep_time), (0, 0))
+        # Bulk generation yields no steps but still counts its carves
+        bulk = Maze(0, 0, 12, 9, 10, 10, seed=4, instrument=True)
+        bulk.generate("binary_tree")
+        self.assertEqual(bulk.stats.cells_carved, 12 * 9 + 1) # type: ignore
+        stats.reset()
+        self.assertEqual(stats.as_dict(), dict.fromkeys(stats.as_dict(), 0))
+
+    def test_stats_window(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 5, 5, 10, 10, win, draw_delay=0, seed=1, instrument=True)
+        m.generate()
+        stats = m.stats
+        assert stats is not None
+        self.assertEqual(stats.draw_calls, win.batches)
+        self.assertEqual(stats.redraws, win.redraws)
+        self.assertGreater(stats.line_edits, 0)
+        self.assertGreater(stats.draw_time, 0)
+        self.assertGreater(stats.sleep_time, 0)
+        self.assertEqual(m._win.bg_color, "white")
+
+    #endregion
+
+    #region Chunked maze tests
+    def test_chunked_deterministic(self):
+        a = ChunkedMaze(seed=5, chunk_size=8)
+        b = ChunkedMaze(seed=5, chunk_size=8)
+        cells = list(itertools.product(range(-20, 20, 3), range(-13, 30, 4)))
+        self.assertEqual([a.walls(*cell) for cell in reversed(cells)][::-1],
+                         [b.walls(*cell) for cell in cells])
+        self.assertNotEqual(a.region(0, 0, 8, 8).walls, ChunkedMaze(seed=6, chunk_size=8).region(0, 0, 8, 8).walls)
+
+    def test_chunked_borders_and_connectivity(self):
+        for algorithm in ("backtracker", "kruskal", "sidewinder"):
+            with self.subTest(algorithm=algorithm):
+                m = ChunkedMaze(seed=1, chunk_size=6, algorithm=algorithm)
+                # 3x3 chunks from chunk (-1, -1)
+                g = m.region(-6, -6, 18, 18)
+                for row, col in itertools.product(range(18), range(18)):
+                    walls = g.walls[g.index(row, col)]
+                    if col < 17:
+                        self.assertEqual(bool(walls & RIGHT), g.has_wall(row, col + 1, LEFT))
+                    if row < 17:
+                        self.assertEqual(bool(walls & BOTTOM), g.has_wall(row + 1, col, TOP))
+                # One door in every border between two chunks
+                for line in (6, 12):
+                    for start in (0, 6, 12):
+                        doors = [i for i in range(start, start + 6) if not g.has_wall(line - 1, i, BOTTOM)]
+                        self.assertEqual(len(doors), 1)
+                        doors = [i for i in range(start, start + 6) if not g.has_wall(i, line - 1, RIGHT)]
+                        self.assertEqual(len(doors), 1)
+                self.assertNotIn(-1, solvers.distance_map(g, (0, 0)))
+                for row, col in ((1, 1), (5, 6), (11, 12), (16, 3)):
+                    expected = [divmod(index, 18) for index in g.open_neighbors(g.index(row, col))]
+                    self.assertEqual(m.open_neighbors(row - 6, col - 6),
+                                     [(r - 6, c - 6) for r, c in expected])
+
+    def test_chunked_eviction(self):
+        m = ChunkedMaze(seed=2, chunk_size=4, max_bytes=3 * 16 * 3)
+        self.assertEqual(m.max_chunks, 3)
+        first = bytes(m.chunk(0, 0).walls)
+        for col in range(1, 6):
+            m.chunk(0, col)
+        self.assertEqual(m.cached_chunks, 3)
+        self.assertEqual(m.chunks_evicted, 3)
+        # Evicted chunks come back the same
+        self.assertEqual(bytes(m.chunk(0, 0).walls), first)
+        self.assertEqual(m.chunks_generated, 7)
+        m.chunk(0, 0)
+        self.assertEqual(m.chunks_generated, 7)
+        with self.assertRaises(ValueError):
+            ChunkedMaze(seed=1, chunk_size=1)
+
+    #endregion
+
+    #region Cache tests
+    def test_cache_generate_hit(self):
+        cache = MazeCache()
+        for algorithm in ("backtracker", "sidewinder"):
+            first = Maze(0, 0, 12, 15, 10, 10, seed=7, cache=cache)
+            first.generate(algorithm)
+            second = Maze(0, 0, 12, 15, 10, 10, seed=7, cache=cache)
+            second.generate(algorithm)
+            self.assertEqual(second.grid.walls, first.grid.walls)
+            self.assertEqual(second.algorithm, algorithm)
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+        self.assertEqual(cache.hit_rate, 0.5)
+        # A different seed is a different maze
+        Maze(0, 0, 12, 15, 10, 10, seed=8, cache=cache).generate()
+        self.assertEqual(cache.misses, 3)
+
+    def test_cache_skips_unseeded_mazes(self):
+        cache = MazeCache()
+        Maze(0, 0, 5, 5, 10, 10, cache=cache).generate()
+        Maze(0, 0, 5, 5, 10, 10, rng=random.Random(1), cache=cache).generate()
+        self.assertEqual((cache.hits, cache.misses, len(cache)), (0, 0, 0))
+
+    def test_cache_lru_eviction(self):
+        cache = MazeCache(max_entries=2)
+        for seed in (1, 2, 1, 3):
+            Maze(0, 0, 4, 4, 10, 10, seed=seed, cache=cache).generate()
+        self.assertEqual(len(cache), 2)
+        # 1 was used more recently than 2, so 2 went first
+        self.assertIsNotNone(cache.get_walls(4, 4, 1, "backtracker"))
+        self.assertIsNone(cache.get_walls(4, 4, 2, "backtracker"))
+        with self.assertRaises(ValueError):
+            MazeCache(max_entries=0)
+
+    def test_cache_solve(self):
+        cache = MazeCache()
+        m = Maze(0, 0, 10, 10, 10, 10, seed=3, cache=cache)
+        m.generate()
+        expected = Maze(0, 0, 10, 10, 10, 10, seed=3)
+        expected.generate()
+        expected = expected.solve("bfs")
+        self.assertEqual(m.solve("bfs"), expected)
+        cached = m.solve("bfs")
+        self.assertEqual(cached, expected)
+        self.assertEqual(cache.hits, 1)
+        # Results are copies, so changing one doesn't touch the cache
+        cached.path.clear()
+        self.assertEqual(m.solve("bfs"), expected)
+        # Other walls, other entry
+        m.grid.break_wall(0, 0, LEFT)
+        m.solve("bfs")
+        self.assertEqual(cache.misses, 3)
+
+    def test_cache_disk_tier(self):
+        directory = os.path.dirname(self._temp_path("cache"))
+        m = Maze(0, 0, 9, 11, 10, 10, seed=5, cache=MazeCache(directory=directory))
+        m.generate("kruskal")
+        result = m.solve("astar")
+        # A new cache, e.g. in another process, finds both on disk
+        cache = MazeCache(directory=directory)
+        loaded = Maze(0, 0, 9, 11, 10, 10, seed=5, cache=cache)
+        loaded.generate("kruskal")
+        self.assertEqual(loaded.grid.walls, m.grid.walls)
+        self.assertEqual(loaded.solve("astar"), result)
+        self.assertEqual((cache.hits, cache.disk_hits, cache.misses), (2, 2, 0))
+
+    def test_cache_corrupt_files_are_misses(self):
+        directory = os.path.dirname(self._temp_path("cache"))
+        cache = MazeCache(directory=directory)
+        m = Maze(0, 0, 9, 11, 10, 10, seed=6, cache=cache)
+        m.generate("kruskal")
+        result = m.solve("bfs")
+        walls_file = cache._file(MazeCache.walls_key(9, 11, 6, "kruskal"), ".maze")
+        solution_file = cache._file(MazeCache.solution_key(m.grid, "bfs"), ".json")
+        for maze_data, json_data in ((b"", b""), (b"MAZE", b'{"path": [[0'), (b"MAZE", b'{"path": 3}')):
+            with self.subTest(maze_data=maze_data, json_data=json_data):
+                with open(walls_file, "wb") as file:
+                    file.write(maze_data)
+                with open(solution_file, "wb") as file:
+                    file.write(json_data)
+                cache = MazeCache(directory=directory)
+                loaded = Maze(0, 0, 9, 11, 10, 10, seed=6, cache=cache)
+                loaded.generate("kruskal")
+                self.assertEqual(loaded.grid.walls, m.grid.walls)
+                self.assertEqual(loaded.solve("bfs"), result)
+                self.assertEqual((cache.hits, cache.misses), (0, 2))
+        # The misses wrote whole files back, and no temporary ones are left
+        cache = MazeCache(directory=directory)
+        Maze(0, 0, 9, 11, 10, 10, seed=6, cache=cache).generate("kruskal")
+        self.assertEqual(cache.disk_hits, 1)
+        self.assertFalse([name for name in os.listdir(directory) if name.endswith(".tmp")])
+
+    #endregion
+
+    #region Step event tests
+    def test_generate_steps_events(self):
+        m = Maze(0, 0, 6, 7, 10, 10, seed=42)
+        events = list(m.generate_steps())
+        carves = [event for event in events if isinstance(event, Carve)]
+        backtracks = [event for event in events if isinstance(event, Backtrack)]
+        self.assertEqual(carves[:2], [Carve(0, 0, UP), Carve(5, 6, DOWN)])
+        # A perfect maze carves one wall less than it has cells
+        self.assertEqual(len(carves), 2 + 6 * 7 - 1)
+        self.assertEqual(len(backtracks), 6 * 7)
+        self.assertEqual(backtracks[-1], Backtrack(0, 0))
+
+    def test_generate_steps_is_lazy(self):
+        m = Maze(0, 0, 5, 5, 10, 10, seed=1)
+        steps = m.generate_steps()
+        self.assertTrue(m._get_cell(0, 0).has_top_wall)
+        next(steps)
+        self.assertFalse(m._get_cell(0, 0).has_top_wall)
+
+    def test_solve_steps_events(self):
+        m = Maze(0, 0, 6, 7, 10, 10, seed=42)
+        m.generate()
+        steps = m.solve_steps("bfs")
+        events = []
+        try:
+            while True:
+                events.append(next(steps))
+        except StopIteration as done:
+            result = done.value
+        self.assertEqual(events[-1], Path(result.path))
+        self.assertEqual(sum(isinstance(event, Visit) for event in events), result.nodes_expanded)
+        moves = [event for event in events if isinstance(event, Move)]
+        self.assertEqual(len(moves), len(result.path) - 1)
+
+    def test_dfs_steps_undo_moves(self):
+        m = Maze(0, 0, 6, 7, 10, 10, seed=42)
+        m.generate()
+        events = list(m.solve_steps("dfs"))
+        forward = sum(isinstance(e, Move) and not e.undo for e in events)
+        undone = sum(isinstance(e, Move) and e.undo for e in events)
+        path = events[-1]
+        self.assertIsInstance(path, Path)
+        self.assertEqual(forward - undone, len(path.cells) - 1)
+
+    #endregion
+
+    #region Solver tests
+    def _assert_valid_path(self, m: Maze, path: list[tuple[int, int]]):
+        self.assertEqual(path[0], (0, 0))
+        self.assertEqual(path[-1], (m._num_rows - 1, m._num_cols - 1))
+        for (row, col), (new_row, new_col) in zip(path, path[1:]):
+            index = m._grid.index(new_row, new_col)
+            self.assertIn(index, m._grid.open_neighbors(m._grid.index(row, col)))
+
+    def test_solve_dfs(self):
+        m = Maze(0, 0, 15, 12, 10, 10, seed=5)
+        m.generate()
+        result = m.solve()
+        self.assertTrue(result)
+        self._assert_valid_path(m, result.path)
+        self.assertGreaterEqual(result.nodes_expanded, len(result.path) - 1)
+
+    def test_solvers_agree_on_perfect_maze(self):
+        m = Maze(0, 0, 25, 30, 10, 10, seed=11)
+        m.generate()
+        dfs_path = m.solve().path
+        for algorithm in SOLVERS:
+            result = m.solve(algorithm=algorithm)
+            self.assertEqual(result.algorithm, algorithm)
+            # A perfect maze has exactly one path between any two cells
+            self.assertEqual(result.path, dfs_path, algorithm)
+            self.assertGreater(result.nodes_expanded, 0)
+
+    def test_solvers_find_shortest_path_with_loops(self):
+        m = Maze(0, 0, 10, 10, 10, 10, seed=2)
+        m.generate()
+        # Open up every wall so there are many paths; shortest is 19 cells long
+        for row in range(10):
+            for col in range(10):
+                m._grid.break_wall(row, col, RIGHT)
+                m._grid.break_wall(row, col, DOWN)
+        for algorithm in ("bfs", "astar", "bidirectional", "dead_end_filling"):
+            result = m.solve(algorithm=algorithm)
+            self._assert_valid_path(m, result.path)
+            self.assertEqual(len(result.path), 19, algorithm)
+
+    def test_solve_large_maze_no_recursion(self):
+        m = Maze(0, 0, 1, 3000, 10, 10, seed=1)
+        m.generate()
+        self.assertEqual(len(m.solve().path), 3000)
+
+    def test_solve_no_path(self):
+        m = Maze(0, 0, 3, 3, 10, 10)
+        for algorithm in ["dfs", *SOLVERS]:
+            result = m.solve(algorithm=algorithm)
+            self.assertFalse(result)
+            self.assertEqual(result.path, [])
+
+    def test_solve_unknown_algorithm(self):
+        m = Maze(0, 0, 3, 3, 10, 10)
+        with self.assertRaises(ValueError):
+            m.solve(algorithm="teleport")
+
+    def test_distance_map_matches_bfs(self):
+        m = Maze(0, 0, 30, 25, 10, 10, seed=12)
+        m.generate()
+        distances = m.distance_map()
+        self.assertEqual(len(distances), 30 * 25)
+        self.assertEqual(distances[0], 0)
+        self.assertEqual(distances[-1], len(m.solve("bfs").path) - 1)
+        self.assertNotIn(-1, distances)
+
+    def test_distance_map_open_grid_and_unreachable(self):
+        g = Grid(20, 30, walls=0)
+        g.walls[g.index(19, 29)] = ALL_WALLS # Sealed off on its side only
+        g.walls[g.index(18, 29)] |= BOTTOM
+        g.walls[g.index(19, 28)] |= RIGHT
+        expected = [row + col for row in range(20) for col in range(30)]
+        expected[-1] = -1
+        for frontier in (1, 10**9): # All NumPy, all plain Python
+            with self.subTest(frontier=frontier):
+                old, solvers.NUMPY_FRONTIER = solvers.NUMPY_FRONTIER, frontier
+                try:
+                    self.assertEqual(list(solvers.distance_map(g, (0, 0))), expected)
+                finally:
+                    solvers.NUMPY_FRONTIER = old
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_solve_batch_matches_bfs(self):
+        mazes = []
+        for seed, algorithm in enumerate(["backtracker", "kruskal", "sidewinder", "eller"] * 3):
+            m = Maze(0, 0, 9, 12, 10, 10, seed=seed)
+            m.generate(algorithm)
+            mazes.append(m)
+        # A maze with loops: only the lengths are unique there
+        open_maze = Maze(0, 0, 9, 12, 10, 10, grid=Grid(9, 12, walls=0))
+        mazes.append(open_maze)
+        walls = solvers.stack_walls(m.grid for m in mazes)
+        self.assertEqual(walls.shape, (len(mazes), 9, 12))
+        result = solvers.solve_batch(walls, paths=True)
+        assert result.paths is not None
+        for m, length, path in zip(mazes, result.lengths.tolist(), result.paths):
+            expected = m.solve("bfs").path
+            self.assertEqual(length, len(expected))
+            self.assertEqual(path.shape, (length, 2))
+            if m is not open_maze:
+                self.assertEqual([tuple(cell) for cell in path.tolist()], expected)
+        self.assertIsNone(solvers.solve_batch(walls).paths)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_solve_batch_edge_cases(self):
+        walls = np.full((3, 4, 5), ALL_WALLS, dtype=np.uint8)
+        walls[1] = 0
+        result = solvers.solve_batch(walls, start=(1, 1), goal=(3, 4), paths=True)
+        self.assertEqual(result.lengths.tolist(), [0, 6, 0])
+        self.assertEqual(len(result.paths[0]), 0) # type: ignore
+        # Start and goal the same
+        result = solvers.solve_batch(walls, start=(2, 2), goal=(2, 2), paths=True)
+        self.assertEqual(result.lengths.tolist(), [1, 1, 1])
+        self.assertEqual(result.paths[2].tolist(), [[2, 2]]) # type: ignore
+        self.assertEqual(len(solvers.solve_batch(np.zeros((0, 4, 5))).lengths), 0)
+        with self.assertRaises(ValueError):
+            solvers.solve_batch(walls, goal=(4, 0))
+        with self.assertRaises(ValueError):
+            solvers.stack_walls([Grid(2, 3), Grid(3, 2)])
+
+    #endregion
+
+    #region Path index tests
+    def test_path_index_matches_bfs(self):
+        m = Maze(0, 0, 17, 23, 10, 10, seed=8)
+        m.generate()
+        index = m.path_index()
+        rng = random.Random(3)
+        pairs = [((rng.randrange(17), rng.randrange(23)), (rng.randrange(17), rng.randrange(23)))
+                 for _ in range(60)] + [((4, 4), (4, 4)), ((0, 0), (16, 22))]
+        for a, b in pairs:
+            steps = solvers.bfs(m.grid, a, b)
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as done:
+                    expected = done.value.path
+                    break
+            self.assertEqual(index.path(a, b), expected)
+            self.assertEqual(index.distance(a, b), len(expected) - 1)
+            self.assertEqual(index.next_step(a, b), expected[1] if len(expected) > 1 else a)
+        self.assertEqual(index.lca((5, 5), (0, 0)), (0, 0))
+        if np is not None:
+            starts, goals = np.array([a for a, _ in pairs]), np.array([b for _, b in pairs])
+            self.assertEqual(index.distances(starts, goals).tolist(),
+                             [index.distance(a, b) for a, b in pairs])
+            self.assertEqual([tuple(step) for step in index.next_steps(starts, goals).tolist()],
+                             [index.next_step(a, b) for a, b in pairs])
+
+    def test_path_index_without_numpy(self):
+        m = Maze(0, 0, 9, 9, 10, 10, seed=4)
+        m.generate("kruskal")
+        old, pathindex.numpy = pathindex.numpy, lambda: None
+        try:
+            index = PathIndex(m.grid, root=(4, 4))
+            self.assertEqual(list(index.distances([(0, 0), (8, 8)], [(8, 8), (8, 8)])),
+                             [len(m.solve("bfs").path) - 1, 0])
+            self.assertEqual(index.next_steps([(0, 0)], [(0, 0)]), [(0, 0)])
+        finally:
+            pathindex.numpy = old
+
+    def test_path_index_rejects_loops_and_unreachable(self):
+        with self.assertRaises(ValueError):
+            PathIndex(Grid(3, 3, walls=0))
+        g = Grid(2, 3)
+        g.break_wall(0, 0, RIGHT)
+        index = PathIndex(g)
+        self.assertEqual(index.distance((0, 0), (0, 1)), 1)
+        self.assertEqual(index.distance((0, 0), (1, 2)), -1)
+        self.assertIsNone(index.next_step((1, 2), (0, 0)))
+        self.assertEqual(index.path((1, 1), (1, 1)), [])
+        with self.assertRaises(ValueError):
+            index.distance((0, 0), (2, 0))
+        if np is not None:
+            self.assertEqual(index.distances([(0, 0), (0, 1)], [(1, 2), (0, 0)]).tolist(), [-1, 1])
+            self.assertEqual(index.next_steps([(0, 0)], [(1, 0)]).tolist(), [[-1, -1]])
+
+    #endregion
+
+    #region Renderer tests
+    def test_wall_runs_full_grid(self):
+        g = Grid(3, 4)
+        runs = wall_runs(g)
+        # One run per grid line: 4 horizontal, 5 vertical
+        self.assertEqual(len(runs), 4 + 5)
+        self.assertIn((0, 0, 0, 4), runs)
+        self.assertIn((0, 4, 3, 4), runs)
+
+    def test_wall_runs_split_on_break(self):
+        g = Grid(1, 3)
+        g.break_wall(0, 1, UP)
+        g.break_wall(0, 0, RIGHT)
+        runs = wall_runs(g)
+        self.assertIn((0, 0, 0, 1), runs)
+        self.assertIn((0, 2, 0, 3), runs)
+        self.assertNotIn((1, 1, 0, 1), runs)
+        self.assertIn((1, 0, 1, 3), runs)
+        # Vertical line 1 is gone, lines 0, 2 and 3 remain
+        self.assertEqual([run for run in runs if run[1] == run[3]],
+                         [(0, 0, 1, 0), (0, 2, 1, 2), (0, 3, 1, 3)])
+
+    def _wall_segments(self, win, size=10):
+        """Unit wall segments covered by the wall items of win, as (vertical, line, segment)."""
+        segments = set()
+        for tags, line, _ in win.items.values():
+            if "wall" not in tags:
+                continue
+            (x1, y1), (x2, y2) = (line.point1.x, line.point1.y), (line.point2.x, line.point2.y)
+            if y1 == y2:
+                segments.update((0, y1 // size, col) for col in range(x1 // size, x2 // size))
+            else:
+                segments.update((1, x1 // size, row) for row in range(y1 // size, y2 // size))
+        return segments
+
+    def _grid_segments(self, g):
+        segments = set()
+        for row1, col1, row2, col2 in wall_runs(g):
+            if row1 == row2:
+                segments.update((0, row1, col) for col in range(col1, col2))
+            else:
+                segments.update((1, col1, row) for row in range(row1, row2))
+        return segments
+
+    def test_renderer_draws_runs_in_one_batch(self):
+        win = FakeWindow()
+        g = Grid(20, 30)
+        MazeRenderer(win, g, 0, 0, 10, 10).draw_all() # type: ignore
+        self.assertEqual(win.batches, 1)
+        self.assertEqual(len(win.items), 21 + 31)
+
+    def test_renderer_splits_runs_instead_of_erasing(self):
+        win = FakeWindow()
+        g = Grid(5, 5)
+        renderer = MazeRenderer(win, g, 0, 0, 10, 10) # type: ignore
+        renderer.draw_all()
+        g.break_wall(2, 2, RIGHT)
+        renderer.mark_dirty(g.index(2, 2))
+        renderer.mark_dirty(g.index(2, 3))
+        renderer.flush()
+        # Vertical line 3 is split in two, nothing is drawn over it
+        self.assertEqual(len(win.items), 6 + 6 + 1)
+        self.assertEqual(renderer.item_count, len(win.items))
+        self.assertEqual(self._wall_segments(win), self._grid_segments(g))
+        batches = win.batches
+        renderer.flush() # Nothing left to draw
+        self.assertEqual(win.batches, batches)
+
+    def test_renderer_restores_walls(self):
+        win = FakeWindow()
+        g = Grid(3, 3)
+        renderer = MazeRenderer(win, g, 0, 0, 10, 10) # type: ignore
+        renderer.draw_all()
+        g.break_wall(1, 1, UP)
+        renderer.mark_dirty(g.index(1, 1))
+        renderer.flush()
+        g.walls[g.index(1, 1)] |= TOP
+        renderer.mark_dirty(g.index(1, 1))
+        renderer.flush()
+        self.assertEqual(self._wall_segments(win), self._grid_segments(g))
+
+    def test_maze_with_window_draws_in_bulk(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 10, 10, 10, 10, win, draw_delay=0) # type: ignore
+        self.assertEqual(len(win.items), 11 + 11)
+        m.generate()
+        # Once after the initial draw, then once per step and once at the end:
+        # entrance and exit, 99 carves and a backtrack out of every cell
+        self.assertEqual(win.redraws, 1 + 2 + 99 + 100 + 1)
+        self.assertEqual(self._wall_segments(win), self._grid_segments(m.grid))
+        # Never more items than merged runs, unlike drawing over removed walls
+        self.assertLessEqual(len(win.items), len(wall_runs(m.grid)) + 10)
+        m.solve()
+        moves = [item for item in win.items.values() if "move" in item[0]]
+        self.assertTrue(any(color == "red" for _, _, color in moves))
+
+    def test_renderer_reuses_move_items(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 12, 12, 10, 10, win, draw_delay=0, seed=7) # type: ignore
+        m.generate()
+        events = list(m.solve_steps("dfs"))
+        for event in events:
+            m.draw_step(event)
+        m.draw_pending()
+        moves = [item for item in win.items.values() if "move" in item[0]]
+        edges = {frozenset((m.grid.index(row, col), m.grid.index(row + D_ROW[d], col + D_COL[d])))
+                 for row, col, d, _ in (e for e in events if isinstance(e, Move))}
+        self.assertEqual(len(moves), len(edges))
+        self.assertTrue(any(isinstance(e, Move) and e.undo for e in events))
+        self.assertEqual(sum(color == "red" for _, _, color in moves), len(m.solve("bfs").path) - 1)
+
+    def test_new_maze_replaces_old_items(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 6, 6, 10, 10, win, draw_delay=0) # type: ignore
+        m.generate()
+        m.solve()
+        Maze(0, 0, 3, 3, 10, 10, win, draw_delay=0) # type: ignore
+        self.assertEqual(len(win.items), 4 + 4)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_wall_runs_numpy_matches_python(self):
+        for rows, cols in ((1, 1), (1, 6), (6, 1), (14, 9)):
+            m = Maze(0, 0, rows, cols, 10, 10, seed=5)
+            m.generate("kruskal")
+            fast = wall_runs(m.grid)
+            old, renderer.numpy = renderer.numpy, lambda: None
+            try:
+                self.assertEqual(fast, wall_runs(m.grid))
+            finally:
+                renderer.numpy = old
+
+    def test_svg_export(self):
+        m = Maze(0, 0, 9, 11, 10, 20, seed=3)
+        m.generate()
+        solution = m.solve("bfs").path
+        svg = ElementTree.fromstring(m.to_svg(solution))
+        self.assertEqual((svg.get("width"), svg.get("height")), ("114", "184"))
+        namespace = "{http://www.w3.org/2000/svg}"
+        data = svg.find(namespace + "path").get("d")
+        commands = re.findall(r"M(\d+) (\d+)([HV])(\d+)", data)
+        self.assertEqual(len(commands), len(wall_runs(m.grid)))
+        # The outer top wall starts right after the entrance
+        self.assertIn(("012", "002", "H", "112") if np is not None else ("12", "2", "H", "112"), commands)
+        points = svg.find(namespace + "polyline").get("points").split()
+        self.assertEqual(len(points), len(solution))
+        self.assertEqual(points[0], "7,12")
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_png_export(self):
+        m = Maze(0, 0, 5, 7, 10, 10, seed=3)
+        m.generate()
+        solution = m.solve("bfs").path
+        path = self._temp_path("maze.png")
+        m.save_png(path, solution, cell_size=4)
+        with open(path, "rb") as file:
+            data = file.read()
+        self.assertEqual(data[:8], b"\x89PNG\r\n\x1a\n")
+        width, height, depth, color_type = struct.unpack(">IIBB", data[16:26])
+        self.assertEqual((width, height, depth, color_type), (29, 21, 2, 3))
+        # Decode the 2-bit rows and compare with the rasterized image
+        start = data.index(b"IDAT") + 4
+        length = struct.unpack(">I", data[start - 8:start - 4])[0]
+        raw = zlib.decompress(data[start:start + length])
+        stride = (width + 3) // 4 + 1
+        pixels = [[(raw[y * stride + 1 + x // 4] >> (6 - 2 * (x % 4))) & 3 for x in range(width)]
+                  for y in range(height)]
+        image = images.rasterize(m.grid, 4, solution)
+        self.assertEqual(pixels, image.tolist())
+        self.assertEqual(image[0, 0], 1) # Corner
+        self.assertEqual(image[0, 2], 0) # Entrance gap
+        self.assertEqual(image[2, 2], 2) # Path starts at the first cell's center
+        self.assertEqual(image[0, 5], 1) # Top wall of the second cell
+
+    #endregion
+
+    #region Viewport tests
+    def _pgm_size(self, data: bytes) -> tuple[int, int]:
+        magic, width, height, _ = data.split(maxsplit=4)[:4]
+        self.assertEqual(magic, b"P5")
+        return int(width), int(height)
+
+    def test_sub_grid(self):
+        m = Maze(0, 0, 6, 7, 10, 10, seed=2)
+        m.generate()
+        part = sub_grid(m.grid, 1, 2, 4, 6)
+        self.assertEqual((part.num_rows, part.num_cols), (3, 4))
+        for row, col in itertools.product(range(3), range(4)):
+            self.assertEqual(part.walls[part.index(row, col)], m.grid.walls[m.grid.index(row + 1, col + 2)])
+
+    def test_viewport_lines_only_visible_cells(self):
+        m = Maze(0, 0, 100, 100, 10, 10, seed=3)
+        m.generate("sidewinder")
+        win = FakeWindow()
+        view = Viewport(win, m.grid, 200, 100, zoom=10) # type: ignore
+        view.scroll(300, 500)
+        self.assertEqual(view.visible_cells(), (50, 30, 60, 50))
+        view.render()
+        self.assertEqual(view.level, "lines")
+        self.assertEqual(view.item_count, len(win.items))
+        # Every wall run of the visible cells, and nothing else
+        expected = len(renderer.wall_runs(sub_grid(m.grid, 50, 30, 60, 50)))
+        self.assertEqual(len(win.items), expected)
+        for _, line, _ in win.items.values():
+            for point in (line.point1, line.point2):
+                self.assertTrue(0 <= point.x <= 200 and 0 <= point.y <= 100)
+        # Re-rendering replaces the items
+        view.render()
+        self.assertEqual(len(win.items), expected)
+
+    def test_viewport_replaces_animated_maze(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 6, 6, 10, 10, win, draw_delay=0, seed=2) # type: ignore
+        m.generate()
+        m.solve("dfs")
+        self.assertTrue(any("move" in tags for tags, _, _ in win.items.values()))
+        big = Maze(0, 0, 200, 200, 1, 1, seed=2)
+        big.generate("kruskal")
+        view = Viewport(win, big.grid, 160, 120) # type: ignore
+        view.fit()
+        view.render()
+        # Neither the old walls nor the old moves stay on the canvas
+        self.assertEqual(len(win.items), view.item_count if view.level == "lines" else 0)
+        self.assertFalse(any("move" in tags for tags, _, _ in win.items.values()))
+
+    def test_viewport_zoom_at_keeps_point(self):
+        m = Maze(0, 0, 50, 50, 10, 10)
+        view = Viewport(FakeWindow(), m.grid, 200, 200, zoom=8) # type: ignore
+        view.scroll(40, 40)
+        before = (view.left + 100 / view.zoom, view.top + 60 / view.zoom)
+        view.zoom_at(2, 100, 60)
+        self.assertEqual(view.zoom, 16)
+        after = (view.left + 100 / view.zoom, view.top + 60 / view.zoom)
+        self.assertAlmostEqual(before[0], after[0])
+        self.assertAlmostEqual(before[1], after[1])
+        view.zoom_at(1e9, 0, 0)
+        self.assertEqual(view.zoom, viewport.MAX_ZOOM)
+        # The maze can't be scrolled out of sight
+        view.scroll(-1e9, 1e9)
+        row1, col1, row2, col2 = view.visible_cells()
+        self.assertTrue(row1 < row2 and col1 < col2)
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_viewport_bitmap_when_zoomed_out(self):
+        m = Maze(0, 0, 1000, 800, 1, 1, seed=4)
+        m.generate("binary_tree")
+        win = FakeWindow()
+        view = Viewport(win, m.grid, 160, 120) # type: ignore
+        view.fit()
+        view.render()
+        self.assertEqual(view.level, "bitmap")
+        self.assertEqual(view.item_count, 1)
+        self.assertEqual(win.items, {})
+        assert win.image is not None
+        data, x, y = win.image
+        width, height = self._pgm_size(data)
+        self.assertTrue(0 < width <= 160 and 0 < height <= 120)
+        self.assertEqual(len(data.split(b"\n", 1)[1]), width * height)
+        # Close up again: exact walls as a bitmap, then as lines
+        view.zoom_at(25, 80, 60)
+        view.render()
+        self.assertEqual(view.level, "bitmap")
+        self.assertLessEqual(self._pgm_size(win.image[0])[0], 160 + view.zoom) # type: ignore
+        view.zoom_at(4, 80, 60)
+        view.render()
+        self.assertEqual(view.level, "lines")
+        self.assertIsNone(win.image)
+        self.assertLessEqual(len(win.items), 2 * 160 * 120 // 16)
+
+    #endregion
+
+    #region Scheduler tests
+    def test_scheduler_runs_steps_per_frame(self):
+        tk = FakeTk()
+        scheduler = FrameScheduler(tk) # type: ignore
+        done: list[bool] = []
+        frames: list[int] = []
+        steps = iter(range(10))
+        scheduler.start(steps, 4, on_frame=lambda: frames.append(1), on_done=lambda: done.append(True))
+        tk.run_frame()
+        self.assertEqual(next(steps), 4)
+        tk.run_frame()
+        tk.run_frame()
+        self.assertEqual(done, [True])
+        self.assertEqual(len(frames), 3)
+        self.assertFalse(scheduler.running)
+        self.assertEqual(tk.jobs, {})
+
+    def test_scheduler_fractional_speed(self):
+        tk = FakeTk()
+        scheduler = FrameScheduler(tk) # type: ignore
+        taken: list[int] = []
+        scheduler.start((taken.append(i) for i in range(3)), 0.5)
+        for _ in range(4):
+            tk.run_frame()
+        self.assertEqual(taken, [0, 1])
+
+    def test_scheduler_cancel(self):
+        tk = FakeTk()
+        scheduler = FrameScheduler(tk) # type: ignore
+        done: list[bool] = []
+        scheduler.start(iter(range(100)), 1, on_done=lambda: done.append(True))
+        tk.run_frame()
+        scheduler.cancel()
+        self.assertFalse(scheduler.running)
+        self.assertEqual(tk.jobs, {})
+        self.assertEqual(done, [])
+
+    def test_scheduler_errors_still_call_on_done(self):
+        def fail(*_):
+            raise KeyError("boom")
+        for on_step, on_frame in ((fail, None), (None, fail)):
+            with self.subTest(on_step=on_step, on_frame=on_frame):
+                tk = FakeTk()
+                scheduler = FrameScheduler(tk) # type: ignore
+                done: list[bool] = []
+                steps = BackgroundSteps(itertools.count(), batch_size=8, max_batches=2)
+                scheduler.start(steps, 1, on_step=on_step, on_frame=on_frame, on_done=lambda: done.append(True))
+                # Wait for the worker, so the first frame has a step to run
+                deadline = time.monotonic() + 5
+                while steps._queue.empty():
+                    self.assertLess(time.monotonic(), deadline)
+                    time.sleep(0.001)
+                with self.assertRaises(KeyError):
+                    tk.run_frame()
+                self.assertEqual(done, [True])
+                self.assertFalse(scheduler.running)
+                self.assertEqual(tk.jobs, {})
+                steps._thread.join(1)
+                self.assertFalse(steps._thread.is_alive())
+
+    def test_scheduler_drives_maze(self):
+        tk = FakeTk()
+        m = Maze(0, 0, 8, 8, 10, 10, seed=42)
+        FrameScheduler(tk).start(m.generate_steps(), 1000) # type: ignore
+        while tk.jobs:
+            tk.run_frame()
+        self.assertTrue(m.solve("bfs"))
+
+    def _drain(self, steps):
+        """Everything from a BackgroundSteps, waiting out PENDING."""
+        taken = []
+        deadline = time.monotonic() + 5
+        for step in steps:
+            if step is PENDING:
+                self.assertLess(time.monotonic(), deadline)
+                time.sleep(0.001)
+                continue
+            taken.append(step)
+        return taken
+
+    def test_background_steps_in_order(self):
+        steps = BackgroundSteps(iter(range(1000)), batch_size=64, max_batches=2)
+        self.assertEqual(self._drain(steps), list(range(1000)))
+        self.assertEqual(self._drain(steps), [])
+
+    def test_background_steps_raise_worker_errors(self):
+        def failing():
+            yield 1
+            raise KeyError("boom")
+        steps = BackgroundSteps(failing())
+        with self.assertRaises(KeyError):
+            self._drain(steps)
+
+    def test_background_steps_cancel_stops_worker(self):
+        produced = itertools.count()
+        steps = BackgroundSteps(produced, batch_size=8, max_batches=2)
+        self.assertTrue(self._drain(itertools.islice(steps, 10)))
+        steps.cancel()
+        steps._thread.join(1)
+        self.assertFalse(steps._thread.is_alive())
+        self.assertRaises(StopIteration, next, steps)
+        # The worker never ran far ahead of what was taken
+        self.assertLess(next(produced), 100)
+
+    def test_scheduler_drives_maze_from_worker_thread(self):
+        tk = FakeTk()
+        win = FakeWindow()
+        m = Maze(0, 0, 15, 15, 10, 10, win, draw_delay=0, seed=42) # type: ignore
+        done: list[bool] = []
+        scheduler = FrameScheduler(tk) # type: ignore
+        scheduler.start(BackgroundSteps(itertools.chain(m.generate_steps(), m.solve_steps("bfs"))), 50,
+                        on_step=m.draw_step, on_frame=m.draw_pending, on_done=lambda: done.append(True))
+        deadline = time.monotonic() + 5
+        while scheduler.running:
+            self.assertLess(time.monotonic(), deadline)
+            tk.run_frame()
+            time.sleep(0.001)
+        self.assertEqual(done, [True])
+        self.assertEqual(self._wall_segments(win), self._grid_segments(m.grid))
+        self.assertTrue(any("move" in tags for tags, _, _ in win.items.values()))
+
+    #endregion
+
+    #region Grid tests
+    def test_grid_starts_with_all_walls(self):
+        g = Grid(3, 4)
+        self.assertEqual(len(g.walls), 12)
+        self.assertTrue(all(walls == ALL_WALLS for walls in g.walls))
+        self.assertFalse(any(g.visited))
+
+    def test_grid_break_wall_both_sides(self):
+        g = Grid(2, 2)
+        g.break_wall(0, 0, RIGHT)
+        self.assertFalse(g.has_wall(0, 0, RIGHT))
+        self.assertFalse(g.has_wall(0, 1, LEFT))
+        self.assertEqual(g.walls[g.index(0, 1)], ALL_WALLS & ~LEFT)
+
+    def test_grid_break_outer_wall(self):
+        g = Grid(2, 2)
+        g.break_wall(1, 1, DOWN)
+        self.assertEqual(g.walls[g.index(1, 1)], ALL_WALLS & ~BOTTOM)
+
+    def test_maze_cells_share_grid(self):
+        m = Maze(0, 0, 3, 3, 10, 10)
+        m._grid.break_wall(1, 1, UP)
+        self.assertFalse(m._get_cell(1, 1).has_top_wall)
+        self.assertFalse(m._get_cell(0, 1).has_bottom_wall)
+        m._get_cell(2, 2).has_right_wall = False
+        self.assertEqual(m._grid.walls[m._grid.index(2, 2)], ALL_WALLS & ~RIGHT)
+
+    def test_grid_exits_and_offsets(self):
+        g = Grid(3, 4)
+        self.assertEqual(g.exits[g.index(0, 0)], DOWN | RIGHT)
+        self.assertEqual(g.exits[g.index(1, 1)], ALL_WALLS)
+        self.assertEqual(g.exits[g.index(2, 3)], UP | LEFT)
+        self.assertEqual([g.offsets[d] for d in DIRECTION_ORDER], [-4, 4, -1, 1])
+        self.assertEqual(Grid(1, 1).exits, bytearray([0]))
+
+    def test_grid_break_wall_at_edge_and_inner(self):
+        g = Grid(2, 2)
+        g.break_wall_at(0, UP) # Outer wall, no neighbor to touch
+        g.break_wall_at(0, RIGHT)
+        self.assertEqual(list(g.walls), [ALL_WALLS & ~(TOP | RIGHT), ALL_WALLS & ~LEFT, ALL_WALLS, ALL_WALLS])
+        self.assertEqual(g.open_neighbors(0), [1])
+
+    def test_direction_tables(self):
+        for direction in DIRECTION_ORDER:
+            self.assertEqual(OPPOSITE[OPPOSITE[direction]], direction)
+            self.assertEqual(D_ROW[direction] + D_ROW[OPPOSITE[direction]], 0)
+            self.assertEqual(D_COL[direction] + D_COL[OPPOSITE[direction]], 0)
+        self.assertEqual(MASK_DIRECTIONS[ALL_WALLS], DIRECTION_ORDER)
+
+    def test_cell_break_wall_standalone(self):
+        c = Cell(0, 0, 10, 10)
+        c.break_wall(UP)
+        c.break_wall(LEFT, inverse=True)
+        c.visited = True
+        self.assertIsNone(c._grid)
+        self.assertEqual(c._bits & ALL_WALLS, ALL_WALLS & ~(TOP | RIGHT))
+        self.assertTrue(c.visited and c.has_left_wall and not c.has_right_wall)
+        c.visited = False
+        self.assertFalse(c.visited)
+        self.assertEqual(c._bits, ALL_WALLS & ~(TOP | RIGHT))
+
+    #endregion
+
     #region Cell tests
     def test_cell_geometry(self):
         c = Cell(10, 20, 30, 40)
@@ -173,6 +1494,34 @@ class Tests(unittest.TestCase):
             c1.draw_move(c2)
         except Exception as e:
             self.fail(f"draw_move() failed in headless mode: {e}")
+
+    def test_cell_has_slots(self):
+        c = Cell(0, 0, 10, 10)
+        self.assertFalse(hasattr(c, "__dict__"))
+
+    def test_cell_draws_through_maze_renderer(self):
+        win = FakeWindow()
+        m = Maze(0, 0, 4, 4, 10, 10, win, draw_delay=0, seed=1) # type: ignore
+        m.generate()
+        items = dict(win.items)
+        cell = m._get_cell(1, 1)
+        cell.draw()
+        self.assertEqual(win.items, items)
+        # A removed wall is taken off the canvas, not painted over
+        cell.has_right_wall = False
+        m._get_cell(1, 2).has_left_wall = False
+        cell.draw()
+        self.assertEqual(win.lines, [])
+        self.assertEqual(self._wall_segments(win), self._grid_segments(m.grid))
+        # Moving there and back reuses one item
+        right = m._get_cell(1, 2)
+        cell.draw_move(right)
+        right.draw_move(cell, undo=True)
+        moves = [(tags, color) for tags, _, color in win.items.values() if "move" in tags]
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(moves[0][1], "gray")
+        with self.assertRaises(ValueError):
+            cell.draw_move(m._get_cell(3, 3))
             
     #endregion
 
@@ -0,0 +1,228 @@
+"""Browsing mazes far bigger than the canvas, with scrolling and zooming.
+
+A Viewport only ever draws what is inside the canvas. Close up it creates one
+line item per wall run of the visible cells. Once that would take too many
+items, or the cells get too small to make out, it switches to a single
+bitmap image of the visible part instead:
+  - with cells of 2 pixels or more, the exact walls, rasterized by NumPy
+  - below that, a downsampled level of a precomputed pyramid, in which every
+    pixel is the average wall density of a square block of cells
+So the work and the canvas items per frame stay bounded by the canvas size,
+however big the maze is. Bitmaps need NumPy; without it the zoom stops where
+the visible cells would still fit in line items.
+"""
+import math
+from typing import TYPE_CHECKING, Any
+from grid import ALL_WALLS, Grid
+from images import rasterize
+from line import Line
+from point import Point
+from renderer import MOVE_TAG, WALL_TAG, LineEdit, wall_runs
+from numpy_support import numpy
+
+if TYPE_CHECKING:
+    from window import Window
+
+# Below this many pixels per cell, walls are drawn as a bitmap
+MIN_LINE_ZOOM = 4.0
+# Most visible cells drawn as line items
+MAX_LINE_CELLS = 12_000
+# Zoom limits, in pixels per cell
+MAX_ZOOM = 64.0
+MIN_ZOOM = 1 / 256
+
+# Takes the lines of the last render() off the canvas, along with anything a
+# MazeRenderer left there, like the moves of an animated solve
+_CLEAR: list[LineEdit] = [("delete", WALL_TAG), ("delete", MOVE_TAG)]
+
+# Wall density per wall bitmask: 0 for no walls, 255 for all four
+_DENSITY = bytes(bin(mask & ALL_WALLS).count("1") * 255 // 4 for mask in range(256))
+
+def sub_grid(grid: Grid, row1: int, col1: int, row2: int, col2: int) -> Grid:
+    """The cells in rows [row1, row2) and columns [col1, col2) of grid as a
+    grid of their own, with a copy of their walls."""
+    walls, cols = grid.walls, grid.num_cols
+    part = bytearray().join(
+        bytes(walls[row * cols + col1:row * cols + col2]) for row in range(row1, row2)
+    ) if isinstance(walls, (bytes, bytearray)) else bytearray(
+        walls[row * cols + col] for row in range(row1, row2) for col in range(col1, col2)
+    )
+    return Grid.from_walls(row2 - row1, col2 - col1, part)
+
+def to_pgm(image: Any) -> bytes:
+    """A 2D uint8 array as a binary PGM image, which Tk's PhotoImage reads
+    without any extra packages."""
+    height, width = image.shape
+    return f"P5 {width} {height} 255\n".encode() + image.tobytes()
+
+class Viewport:
+    def __init__(self,
+                 win: "Window",
+                 grid: Grid,
+                 width: int, height: int,
+                 zoom: float = 20.0,
+                 wall_color: str = "black",
+                 max_line_cells: int = MAX_LINE_CELLS
+                 ) -> None:
+        """Shows the part of grid that fits in a width x height canvas.
+
+        Args:
+            win (Window): The window to draw in.
+            grid (Grid): The maze. It's read on every render(), so changes show
+                up on the next one.
+            width (int): Canvas width in pixels.
+            height (int): Canvas height in pixels.
+            zoom (float, optional): Pixels per cell. Defaults to 20.
+            wall_color (str, optional): Color of wall lines. Bitmaps are always
+                black on white. Defaults to "black".
+            max_line_cells (int, optional): Most visible cells to draw as line
+                items before switching to a bitmap. Defaults to MAX_LINE_CELLS.
+        """
+        self._win = win
+        self._grid = grid
+        self.width = width
+        self.height = height
+        self._wall_color = wall_color
+        self._max_line_cells = max_line_cells
+        # The cell coordinates at the canvas's top-left corner
+        self.left = 0.0
+        self.top = 0.0
+        self.zoom = self._clamp_zoom(zoom)
+        self._pyramid: list[Any] = []
+        self._items = 0
+        self._level = ""
+
+    @property
+    def level(self) -> str:
+        """How the last render() drew: "lines" or "bitmap", empty before the first"""
+        return self._level
+
+    @property
+    def item_count(self) -> int:
+        """Canvas items drawn by the last render()"""
+        return self._items
+
+    def _min_zoom(self) -> float:
+        if numpy() is not None:
+            return MIN_ZOOM
+        # Line items only, so keep the visible cells below the limit
+        return max(MIN_ZOOM, math.sqrt(self.width * self.height / self._max_line_cells))
+
+    def _clamp_zoom(self, zoom: float) -> float:
+        return min(MAX_ZOOM, max(self._min_zoom(), zoom))
+
+    def visible_cells(self) -> tuple[int, int, int, int]:
+        """(row1, col1, row2, col2): the rows [row1, row2) and columns
+        [col1, col2) at least partly on the canvas"""
+        grid = self._grid
+        row1 = min(grid.num_rows, max(0, math.floor(self.top)))
+        col1 = min(grid.num_cols, max(0, math.floor(self.left)))
+        row2 = min(grid.num_rows, max(row1, math.ceil(self.top + self.height / self.zoom)))
+        col2 = min(grid.num_cols, max(col1, math.ceil(self.left + self.width / self.zoom)))
+        return row1, col1, row2, col2
+
+    def scroll(self, dx: float, dy: float) -> None:
+        """Moves the view by dx, dy canvas pixels, e.g. a mouse drag. At least
+        one cell of the maze always stays on the canvas."""
+        grid = self._grid
+        self.left = min(grid.num_cols - 1.0, max(1.0 - self.width / self.zoom, self.left + dx / self.zoom))
+        self.top = min(grid.num_rows - 1.0, max(1.0 - self.height / self.zoom, self.top + dy / self.zoom))
+
+    def zoom_at(self, factor: float, x: float, y: float) -> None:
+        """Zooms by factor, keeping the point under canvas position x, y in
+        place, e.g. under the mouse pointer."""
+        zoom = self._clamp_zoom(self.zoom * factor)
+        self.left += x / self.zoom - x / zoom
+        self.top += y / self.zoom - y / zoom
+        self.zoom = zoom
+        self.scroll(0, 0)
+
+    def fit(self) -> None:
+        """Zooms and centers the whole maze on the canvas."""
+        grid = self._grid
+        if not len(grid):
+            return
+        self.zoom = self._clamp_zoom(min(self.width / grid.num_cols, self.height / grid.num_rows))
+        self.left = (grid.num_cols - self.width / self.zoom) / 2
+        self.top = (grid.num_rows - self.height / self.zoom) / 2
+
+    def refresh(self) -> None:
+        """Drops cached bitmap data after the walls changed, then render()s."""
+        self._pyramid = []
+        self.render()
+
+    def render(self) -> None:
+        """Redraws the visible part of the maze, replacing the last render()."""
+        row1, col1, row2, col2 = self.visible_cells()
+        cells = (row2 - row1) * (col2 - col1)
+        if numpy() is None or (self.zoom >= MIN_LINE_ZOOM and cells <= self._max_line_cells):
+            self._win.clear_image()
+            self._render_lines(row1, col1, row2, col2)
+            self._level = "lines"
+        else:
+            self._win.apply_line_edits(_CLEAR)
+            self._render_bitmap(row1, col1, row2, col2)
+            self._level = "bitmap"
+
+    def _point(self, row: int, col: int) -> Point:
+        return Point(round((col - self.left) * self.zoom), round((row - self.top) * self.zoom))
+
+    def _render_lines(self, row1: int, col1: int, row2: int, col2: int) -> None:
+        edits = list(_CLEAR)
+        if row1 < row2 and col1 < col2:
+            part = sub_grid(self._grid, row1, col1, row2, col2)
+            for number, (r1, c1, r2, c2) in enumerate(wall_runs(part)):
+                line = Line(self._point(row1 + r1, col1 + c1), self._point(row1 + r2, col1 + c2))
+                edits.append(("create", (f"v{number}", WALL_TAG), line, self._wall_color))
+        self._items = len(edits) - len(_CLEAR)
+        self._win.apply_line_edits(edits)
+
+    def _render_bitmap(self, row1: int, col1: int, row2: int, col2: int) -> None:
+        np = numpy()
+        if row1 == row2 or col1 == col2:
+            self._win.clear_image()
+            self._items = 0
+            return
+        if self.zoom >= 2:
+            # Exact walls, one pixel wide, at a whole number of pixels per cell
+            scale = float(int(self.zoom))
+            image = rasterize(sub_grid(self._grid, row1, col1, row2, col2), int(scale))
+            image = np.where(image == 1, np.uint8(0), np.uint8(255))
+        else:
+            pyramid = self._build_pyramid()
+            level = min(len(pyramid) - 1, max(0, math.floor(math.log2(1 / self.zoom))))
+            block = 2 ** level
+            scale = 1 / block
+            image = pyramid[level][row1 // block:-(-row2 // block), col1 // block:-(-col2 // block)]
+            # The first block may start before the first visible cell
+            row1, col1 = row1 // block * block, col1 // block * block
+        # Resample to the zoom, nearest neighbor
+        corner = self._point(row1, col1)
+        x, y = corner.x, corner.y
+        height = min(self.height - y, round(image.shape[0] / scale * self.zoom))
+        width = min(self.width - x, round(image.shape[1] / scale * self.zoom))
+        factor = scale / self.zoom
+        rows = np.minimum((np.arange(max(height, 1)) * factor).astype(np.int64), image.shape[0] - 1)
+        cols = np.minimum((np.arange(max(width, 1)) * factor).astype(np.int64), image.shape[1] - 1)
+        image = image[rows[:, None], cols]
+        self._win.show_image(to_pgm(np.ascontiguousarray(image)), x, y)
+        self._items = 1
+
+    def _build_pyramid(self) -> list[Any]:
+        """Brightness per cell (255 for no walls), then per 2x2 block of the
+        level before, and so on down to a single pixel. Built once."""
+        np = numpy()
+        if not self._pyramid:
+            grid = self._grid
+            walls = grid.walls if isinstance(grid.walls, (bytes, bytearray)) else bytes(grid.walls)
+            density = np.frombuffer(walls, dtype=np.uint8).reshape(grid.num_rows, grid.num_cols)
+            level = 255 - np.frombuffer(_DENSITY, dtype=np.uint8)[density]
+            self._pyramid = [level]
+            while level.shape[0] > 1 or level.shape[1] > 1:
+                # Pad odd sizes by repeating the last row or column
+                rows, cols = level.shape
+                padded = np.pad(level.astype(np.uint16), ((0, rows % 2), (0, cols % 2)), mode="edge")
+                level = ((padded[0::2, 0::2] + padded[1::2, 0::2] + padded[0::2, 1::2]
+                          + padded[1::2, 1::2]) // 4).astype(np.uint8)
+                self._pyramid.append(level)
+        return self._pyramid
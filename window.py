@@ -1,9 +1,21 @@
-from tkinter import LEFT, Button, Entry, Frame, Label, OptionMenu, StringVar, Tk, Canvas
-from typing import Callable
+"""The Tk window: input controls, the canvas and the animation loop.
+
+tkinter is only imported once a Window is built, so importing this module,
+or anything that refers to Window, works without Tcl/Tk installed.
+"""
+from typing import TYPE_CHECKING, Callable, Iterator, TypeVar
 from line import Line
+from scheduler import BackgroundSteps, FrameScheduler
+
+if TYPE_CHECKING:
+    from tkinter import Canvas, Event, PhotoImage
+    from viewport import Viewport
+
+T = TypeVar("T")
 
 class Window:
     def __init__(self, width: int, height: int) -> None:
+        from tkinter import LEFT, Button, Canvas, Entry, Frame, Label, OptionMenu, StringVar, Tk
         self.__root = Tk()
         self.__root.title("A simple maze solver")
         self.__root.protocol("WM_DELETE_WINDOW", self.close)
@@ -27,11 +39,12 @@ class Window:
         self.speed_menu = OptionMenu(self.__input_frame, self.speed_var, "Super-fast", "Fast", "Medium", "Slow")
         self.speed_menu.pack(side=LEFT)
 
+        # Steps per frame, at roughly 60 frames per second
         self.animation_speeds = {
-            "Super-fast": 0.001,
-            "Fast": 0.01,
-            "Medium": 0.05,
-            "Slow": 0.2,
+            "Super-fast": 200,
+            "Fast": 5,
+            "Medium": 0.5,
+            "Slow": 0.1,
         }
 
         self.generate_button = Button(self.__input_frame, text="Generate!", command=self._on_generate)
@@ -40,15 +53,29 @@ class Window:
         self.__canvas = Canvas(self.__root, width=width, height=height)
         self.bg_color = self.__canvas.cget("background")
         self.__canvas.pack()
+        # The bitmap shown by show_image(), kept alive here since Tk doesn't
+        self.__image: "PhotoImage | None" = None
+        
+        # Mouse controls for set_viewport(): drag to scroll, wheel to zoom
+        self.__viewport: "Viewport | None" = None
+        self.__drag_from: tuple[int, int] | None = None
+        self.__render_job: str | None = None
+        self.__canvas.bind("<ButtonPress-1>", self._on_press)
+        self.__canvas.bind("<B1-Motion>", self._on_drag)
+        self.__canvas.bind("<MouseWheel>", self._on_wheel)
+        self.__canvas.bind("<Button-4>", self._on_wheel)
+        self.__canvas.bind("<Button-5>", self._on_wheel)
         
         self.__running = False
         self._generate_callback = None
+        self.__scheduler = FrameScheduler(self.__root)
+        self.__background: BackgroundSteps | None = None
         
+        # The Generate button stays live during a run, clicking it restarts
         self._input_widgets = [
             self.rows_entry,
             self.cols_entry,
             self.speed_menu,
-            self.generate_button,
         ]
 
     def _set_inputs_enabled(self, enabled: bool) -> None:
@@ -61,32 +88,159 @@ class Window:
 
     def _on_generate(self) -> None:
         if self._generate_callback:
+            self.cancel_steps()
+            self.set_viewport(None)
             self._set_inputs_enabled(False)
             try:
                 rows = int(self.rows_entry.get())
                 cols = int(self.cols_entry.get())
                 self._generate_callback(rows, cols)
             finally:
-                self._set_inputs_enabled(True)
+                # If the callback started an animation, inputs come back when it ends
+                if not self.__scheduler.running:
+                    self._set_inputs_enabled(True)
+
+    def run_steps(self,
+                  steps: Iterator[T],
+                  on_step: Callable[[T], None] = None, # type: ignore
+                  on_frame: Callable[[], None] = None, # type: ignore
+                  background: bool = True
+                  ) -> None:
+        """Animate steps on the Tk event loop at the selected speed, without
+        blocking the window. Inputs are disabled until all steps have run,
+        apart from Generate, which cancels the run and starts over.
+
+        Args:
+            steps (Iterator[T]): The steps to run. Each next() is one step.
+            on_step (Callable[[T], None], optional): Called with every step,
+                e.g. to draw it. Defaults to None.
+            on_frame (Callable[[], None], optional): Called once per frame,
+                after that frame's steps. Defaults to None.
+            background (bool, optional): Compute the steps on a worker thread
+                (see scheduler.BackgroundSteps), so Tk only ever draws them.
+                on_step and on_frame still run on the Tk thread. Defaults to True.
+        """
+        self.cancel_steps()
+        if background:
+            steps = self.__background = BackgroundSteps(steps)
+        self._set_inputs_enabled(False)
+        self.__scheduler.start(steps, self.get_steps_per_frame(), on_step, on_frame,
+                               on_done=self._on_steps_done)
+
+    def _on_steps_done(self) -> None:
+        self.__background = None
+        self._set_inputs_enabled(True)
+
+    def cancel_steps(self) -> None:
+        """Stops the running animation and its worker thread, if any."""
+        self.__scheduler.cancel()
+        if self.__background is not None:
+            self.__background.cancel()
+            self.__background = None
+        self._set_inputs_enabled(True)
+
+    def set_viewport(self, viewport: "Viewport | None") -> None:
+        """Shows viewport and lets the mouse scroll and zoom it. None takes
+        it and its drawing off the canvas again."""
+        self.__viewport = viewport
+        self.__drag_from = None
+        if viewport is not None:
+            viewport.render()
+            return
+        self.clear_image()
+        if self.__render_job is not None:
+            self.__root.after_cancel(self.__render_job)
+            self.__render_job = None
 
-    def get_canvas(self) -> Canvas:
+    def _schedule_render(self) -> None:
+        """Renders the viewport once Tk is idle, so a burst of mouse events
+        costs a single render."""
+        if self.__render_job is None:
+            self.__render_job = self.__root.after_idle(self._render_viewport)
+
+    def _render_viewport(self) -> None:
+        self.__render_job = None
+        if self.__viewport is not None:
+            self.__viewport.render()
+
+    def _on_press(self, event: "Event") -> None:
+        self.__drag_from = (event.x, event.y)
+
+    def _on_drag(self, event: "Event") -> None:
+        if self.__viewport is None or self.__drag_from is None:
+            return
+        x, y = self.__drag_from
+        # Dragging moves the maze with the pointer, so the view goes the other way
+        self.__viewport.scroll(x - event.x, y - event.y)
+        self.__drag_from = (event.x, event.y)
+        self._schedule_render()
+
+    def _on_wheel(self, event: "Event") -> None:
+        if self.__viewport is None:
+            return
+        zoom_in = event.num == 4 or event.delta > 0
+        self.__viewport.zoom_at(1.25 if zoom_in else 0.8, event.x, event.y)
+        self._schedule_render()
+
+    def show_image(self, data: bytes, x: int, y: int) -> None:
+        """Shows a PGM or PPM image with its top-left corner at x, y, in place
+        of the last one."""
+        from tkinter import NW, PhotoImage
+        self.clear_image()
+        self.__image = PhotoImage(data=data, format="PPM")
+        self.__canvas.create_image(x, y, image=self.__image, anchor=NW, tags=("image",))
+
+    def clear_image(self) -> None:
+        """Removes the image shown by show_image(), if any."""
+        if self.__image is not None:
+            self.__canvas.delete("image")
+            self.__image = None
+
+    def get_canvas(self) -> "Canvas":
         return self.__canvas
     
-    def get_delay(self) -> float:
-        return self.animation_speeds.get(self.speed_var.get(), 0.05)
+    def get_steps_per_frame(self) -> float:
+        return self.animation_speeds.get(self.speed_var.get(), 0.5)
         
     def redraw(self) -> None:
         self.__root.update_idletasks()
         self.__root.update()
         
     def wait_for_close(self) -> None:
-        """Enter main loop and keep redrawing until the window is closed."""
+        """Enter the Tk main loop until the window is closed."""
         self.__running = True
-        while self.__running:
-            self.redraw()
+        self.__root.mainloop()
             
     def close(self) -> None:
-        self.__running = False
+        self.cancel_steps()
+        if self.__running:
+            self.__running = False
+            self.__root.quit()
         
     def draw_line(self, line: Line, fill_color: str) -> None:
-        line.draw(self.__canvas, fill_color)
\ No newline at end of file
+        line.draw(self.__canvas, fill_color)
+
+    def apply_line_edits(self, edits: list[tuple]) -> None:
+        """Creates, moves, recolors and deletes tagged line items, in order, in
+        a single round trip to Tk. See renderer.py for the edit tuples."""
+        if not edits:
+            return
+        canvas = str(self.__canvas)
+        commands: list[str] = []
+        for edit in edits:
+            match edit:
+                case ("create", tags, line, color):
+                    commands.append(
+                        f"{canvas} create line {line.point1.x} {line.point1.y} "
+                        f"{line.point2.x} {line.point2.y} -fill {{{color}}} -width {line.width} "
+                        f"-tags {{{' '.join(tags)}}}")
+                case ("coords", tag, line):
+                    commands.append(f"{canvas} coords {tag} {line.point1.x} {line.point1.y} "
+                                    f"{line.point2.x} {line.point2.y}")
+                case ("color", tag, color):
+                    commands.append(f"{canvas} itemconfigure {tag} -fill {{{color}}}")
+                case ("delete", tag):
+                    commands.append(f"{canvas} delete {tag}")
+                case _:
+                    raise ValueError(f"Unknown line edit: {edit}")
+        self.__canvas.tk.eval("\n".join(commands))
\ No newline at end of file